@@ -1,14 +1,59 @@
 """ADB backend for compiled scenario execution."""
 
+import base64
+import math
 import os
+import re
+import shlex
 import subprocess
+import tempfile
 import time
+from collections import deque
+
+from .hierarchy_client import (
+    DEFAULT_DEVICE_PORT,
+    HierarchyClient,
+    HierarchyDump,
+    HierarchyError,
+)
+
+DEFAULT_TIMEOUT = 30
+
+# A hierarchy returned alongside a server screenshot is reused by the
+# next dump_uitree() call if it happens within this many seconds.
+HIERARCHY_REUSE_SEC = 0.5
+
+IMAGE_EXTENSIONS = {"png": ".png", "jpeg": ".jpg", "jpg": ".jpg", "webp": ".webp"}
+
+# Latency samples kept per command kind (bounded for long-running loops).
+LATENCY_SAMPLES = 500
+
+SCROLL_DIRECTIONS = ("up", "down", "left", "right")
+
+# Helper IME (ADBKeyBoard) that types text received by broadcast.
+HELPER_IME = "com.android.adbkeyboard/.AdbIME"
+TEXT_INPUT_MODES = ("auto", "input", "ime")
+# In auto mode, ASCII text at least this long also goes through the IME.
+IME_MIN_LENGTH = 16
 
 
 class ADBError(Exception):
     """Raised when an ADB command fails."""
 
 
+def percentile(ordered: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return 0.0
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def _parse_ns(value: str) -> int | None:
+    """Parse a `date +%s%N` value; None if %N is unsupported."""
+    return int(value) if value.isdigit() and len(value) > 12 else None
+
+
 class ADBBackend:
     """Wrapper for ADB commands used by the compiled runner."""
 
@@ -17,6 +62,27 @@ class ADBBackend:
         self._base_cmd = self._build_base_cmd()
         self.screen_width = 0
         self.screen_height = 0
+        self.default_timeout: float = DEFAULT_TIMEOUT
+        # Per command kind timeouts (e.g. {"shell uiautomator": 12.5})
+        self.timeouts: dict[str, float] = {}
+        self.latencies: dict[str, deque] = {}
+        self.hierarchy: HierarchyClient | None = None
+        self.hierarchy_screenshots = False
+        self._pending_xml: tuple[float, str] | None = None
+        # Resolved launcher activity per package ("pkg/.Activity")
+        self._launch_activities: dict[str, str] = {}
+        self.text_input_mode = "auto"
+        self._ime_installed: bool | None = None
+        # IME selected before the helper IME was activated
+        self._original_ime: str | None = None
+        self._ime_active = False
+        # utils.trace.Track that records every command as a span, if set
+        self.tracer = None
+        # Unique part of this backend's device file names: several
+        # backends may work on the same device concurrently.
+        tag = f"{os.getpid()}_{os.urandom(3).hex()}"
+        self._device_screenshot = f"/sdcard/_uiai_screenshot_{tag}.png"
+        self._device_uitree = f"/sdcard/_uiai_ui_{tag}.xml"
 
     def _build_base_cmd(self) -> list[str]:
         cmd = ["adb"]
@@ -24,28 +90,128 @@ class ADBBackend:
             cmd.extend(["-s", self.device_serial])
         return cmd
 
+    @staticmethod
+    def command_kind(args: list[str]) -> str:
+        """Classify ADB args into a command kind for latency tracking.
+
+        e.g. ['shell', 'input', 'tap', '1', '2'] -> 'shell input'
+        """
+        if not args:
+            return ""
+        if args[0] in ("shell", "exec-out") and len(args) > 1:
+            if " " in args[1]:
+                return f"{args[0]} script"
+            return f"{args[0]} {args[1]}"
+        return args[0]
+
     def _run(
-        self, args: list[str], timeout: int = 30, check: bool = True
+        self,
+        args: list[str],
+        timeout: float | None = None,
+        check: bool = True,
+        binary: bool = False,
     ) -> subprocess.CompletedProcess:
-        """Run an ADB command."""
+        """Run an ADB command.
+
+        When no timeout is given, the per-kind timeout from `timeouts`
+        is used, falling back to `default_timeout`. With `binary`, stdout
+        and stderr are returned as bytes.
+        """
         cmd = self._base_cmd + args
+        kind = self.command_kind(args)
+        if timeout is None:
+            timeout = self.timeouts.get(kind, self.default_timeout)
+        start = time.monotonic()
+        trace_start = time.perf_counter()
         try:
             result = subprocess.run(
                 cmd,
                 capture_output=True,
-                text=True,
+                text=not binary,
                 timeout=timeout,
                 check=False,
             )
+            self._record_latency(kind, time.monotonic() - start)
+            self._trace(kind, trace_start, args, result.returncode)
             if check and result.returncode != 0:
+                stderr = result.stderr
+                if isinstance(stderr, bytes):
+                    stderr = stderr.decode("utf-8", errors="replace")
                 raise ADBError(
                     f"ADB command failed: {' '.join(cmd)}\n"
-                    f"stderr: {result.stderr.strip()}"
+                    f"stderr: {stderr.strip()}"
                 )
             return result
         except subprocess.TimeoutExpired as e:
+            # Sample the timeout itself, so tuned timeouts can grow.
+            self._record_latency(kind, time.monotonic() - start)
+            self._trace(kind, trace_start, args, None)
             raise ADBError(f"ADB command timed out: {' '.join(cmd)}") from e
 
+    def _trace(
+        self, kind: str, start: float, args: list[str], returncode: int | None
+    ) -> None:
+        """Record a finished command on the trace track, if tracing."""
+        if self.tracer is None:
+            return
+        command = " ".join(args)
+        self.tracer.complete(
+            kind or "adb",
+            "adb",
+            start,
+            time.perf_counter(),
+            {
+                "command": command if len(command) <= 200 else command[:200] + "...",
+                "returncode": returncode if returncode is not None else "timeout",
+            },
+        )
+
+    def _record_latency(self, kind: str, elapsed_sec: float) -> None:
+        samples = self.latencies.get(kind)
+        if samples is None:
+            samples = self.latencies[kind] = deque(maxlen=LATENCY_SAMPLES)
+        samples.append(elapsed_sec * 1000)
+
+    def latency_stats(self) -> dict:
+        """Summarize recorded command latencies per command kind.
+
+        Returns:
+            Dict of kind -> {count, p50_ms, p95_ms, p99_ms, max_ms}.
+        """
+        stats = {}
+        for kind, samples in sorted(self.latencies.items()):
+            ordered = sorted(samples)
+            if not ordered:
+                continue
+            stats[kind] = {
+                "count": len(ordered),
+                "p50_ms": round(percentile(ordered, 50), 1),
+                "p95_ms": round(percentile(ordered, 95), 1),
+                "p99_ms": round(percentile(ordered, 99), 1),
+                "max_ms": round(ordered[-1], 1),
+            }
+        return stats
+
+    @staticmethod
+    def list_devices() -> list[str]:
+        """List serials of all devices in the 'device' state."""
+        try:
+            result = subprocess.run(
+                ["adb", "devices"],
+                capture_output=True,
+                text=True,
+                timeout=DEFAULT_TIMEOUT,
+                check=False,
+            )
+        except subprocess.TimeoutExpired as e:
+            raise ADBError("ADB command timed out: adb devices") from e
+        serials = []
+        for line in result.stdout.strip().split("\n")[1:]:
+            parts = line.strip().split("\t")
+            if len(parts) == 2 and parts[1] == "device":
+                serials.append(parts[0])
+        return serials
+
     def check_connection(self) -> bool:
         """Check if a device is connected."""
         result = self._run(["devices"], check=False)
@@ -57,6 +223,15 @@ class ADBBackend:
                     return True
         return False
 
+    def wait_for_device(self, timeout: float | None = None) -> None:
+        """Block until the device is back online (e.g. after a snapshot load)."""
+        self._run(["wait-for-device"], timeout=timeout)
+
+    def get_device_model(self) -> str:
+        """Get the device model name (ro.product.model)."""
+        result = self._run(["shell", "getprop", "ro.product.model"], check=False)
+        return result.stdout.strip()
+
     def get_screen_size(self) -> tuple[int, int]:
         """Get device screen size."""
         result = self._run(["shell", "wm", "size"])
@@ -69,14 +244,73 @@ class ADBBackend:
                 return self.screen_width, self.screen_height
         raise ADBError("Could not determine screen size")
 
-    def launch_app(self, package: str) -> None:
-        """Launch an app using monkey."""
+    def resolve_launch_activity(self, package: str) -> str | None:
+        """Resolve (and cache) the launcher activity component of a package."""
+        if package in self._launch_activities:
+            return self._launch_activities[package]
+        result = self._run([
+            "shell", "cmd", "package", "resolve-activity", "--brief",
+            "-c", "android.intent.category.LAUNCHER", package,
+        ], check=False)
+        lines = [line.strip() for line in result.stdout.strip().split("\n")]
+        component = lines[-1] if lines and "/" in lines[-1] else None
+        if component:
+            self._launch_activities[package] = component
+        return component
+
+    @staticmethod
+    def parse_launch_output(output: str) -> dict:
+        """Parse `am start -W` output into launch timings."""
+        fields = {}
+        for line in output.strip().split("\n"):
+            key, sep, value = line.partition(":")
+            if sep:
+                fields[key.strip()] = value.strip()
+        launch = {}
+        if "Status" in fields:
+            launch["status"] = fields["Status"]
+        if "LaunchState" in fields:
+            launch["launch_state"] = fields["LaunchState"]
+        if "Activity" in fields:
+            launch["activity"] = fields["Activity"]
+        for key, name in (
+            ("TotalTime", "total_time_ms"),
+            ("WaitTime", "wait_time_ms"),
+        ):
+            if fields.get(key, "").isdigit():
+                launch[name] = int(fields[key])
+        return launch
+
+    def launch_app(self, package: str) -> dict:
+        """Launch an app and wait until its first frame is drawn.
+
+        The launcher activity is resolved once per package and started
+        with `am start -W`, which blocks until the launch completes.
+        Falls back to monkey if the activity cannot be resolved or
+        started.
+
+        Returns:
+            Launch info: `method` ('am_start' or 'monkey') and, for
+            am_start, `component`, `status`, `launch_state` (COLD, WARM
+            or HOT), `total_time_ms` and `wait_time_ms` when reported.
+        """
+        component = self.resolve_launch_activity(package)
+        if component:
+            result = self._run(
+                ["shell", "am", "start", "-W", "-n", component], check=False
+            )
+            launch = self.parse_launch_output(result.stdout)
+            if result.returncode == 0 and "Error" not in result.stdout:
+                return {"method": "am_start", "component": component, **launch}
+            self._launch_activities.pop(package, None)
+
         self._run([
             "shell", "monkey",
             "-p", package,
             "-c", "android.intent.category.LAUNCHER",
             "1",
         ])
+        return {"method": "monkey"}
 
     def stop_app(self, package: str) -> None:
         """Force stop an app."""
@@ -86,9 +320,68 @@ class ADBBackend:
         """Clear app data."""
         self._run(["shell", "pm", "clear", package])
 
+    def get_package_build(self, package: str) -> str | None:
+        """Identify the installed build of a package (None if not installed).
+
+        Combines versionCode, versionName and lastUpdateTime from
+        `dumpsys package`, so reinstalling the same version also counts
+        as a new build.
+        """
+        result = self._run(["shell", "dumpsys", "package", package], check=False)
+        fields = {}
+        for key in ("versionCode", "versionName", "lastUpdateTime"):
+            match = re.search(rf"\b{key}=([^\s]+(?: [\d:]+)?)", result.stdout)
+            if match:
+                fields[key] = match.group(1)
+        if not fields:
+            return None
+        return " ".join(f"{k}={v}" for k, v in fields.items())
+
+    def get_setting(self, namespace: str, key: str) -> str | None:
+        """Read an Android setting (None if unset)."""
+        result = self._run(["shell", "settings", "get", namespace, key])
+        value = result.stdout.strip()
+        return None if value in ("", "null") else value
+
+    def put_setting(self, namespace: str, key: str, value: str | None) -> None:
+        """Write an Android setting (None deletes it)."""
+        if value is None:
+            self._run(["shell", "settings", "delete", namespace, key])
+        else:
+            self._run(["shell", "settings", "put", namespace, key, value])
+
+    def dismiss_keyguard(self) -> None:
+        """Wake the screen and dismiss a non-secure keyguard."""
+        self._run(["shell", "input", "keyevent", "KEYCODE_WAKEUP"])
+        self._run(["shell", "wm", "dismiss-keyguard"], check=False)
+
+    @staticmethod
+    def tap_command(x: int, y: int) -> list[str]:
+        """Device shell command for a tap."""
+        return ["input", "tap", str(x), str(y)]
+
+    @staticmethod
+    def swipe_command(
+        x1: int,
+        y1: int,
+        x2: int,
+        y2: int,
+        duration_ms: int = 300,
+    ) -> list[str]:
+        """Device shell command for a swipe."""
+        return [
+            "input", "swipe",
+            str(x1), str(y1), str(x2), str(y2), str(duration_ms),
+        ]
+
+    @staticmethod
+    def keyevent_command(keycode: int) -> list[str]:
+        """Device shell command for a key event."""
+        return ["input", "keyevent", str(keycode)]
+
     def tap(self, x: int, y: int) -> None:
         """Tap at coordinates."""
-        self._run(["shell", "input", "tap", str(x), str(y)])
+        self._run(["shell", *self.tap_command(x, y)])
 
     def swipe(
         self,
@@ -99,16 +392,83 @@ class ADBBackend:
         duration_ms: int = 300,
     ) -> None:
         """Swipe from (x1,y1) to (x2,y2)."""
-        self._run([
-            "shell", "input", "swipe",
-            str(x1), str(y1), str(x2), str(y2), str(duration_ms),
-        ])
+        self._run(["shell", *self.swipe_command(x1, y1, x2, y2, duration_ms)])
+
+    def helper_ime_installed(self) -> bool:
+        """Check (once) whether the helper IME is installed."""
+        if self._ime_installed is None:
+            result = self._run(["shell", "ime", "list", "-a", "-s"], check=False)
+            self._ime_installed = HELPER_IME in result.stdout.split()
+        return self._ime_installed
 
-    def input_text(self, text: str) -> None:
+    def text_input_method(self, text: str) -> str:
+        """Choose 'ime' or 'input' for typing text in the current mode.
+
+        Raises:
+            ADBError: In 'ime' mode when the helper IME is not installed.
+        """
+        if self.text_input_mode == "input":
+            return "input"
+        if self.text_input_mode == "ime":
+            if not self.helper_ime_installed():
+                raise ADBError(f"Helper IME {HELPER_IME} is not installed")
+            return "ime"
+        if (not text.isascii() or len(text) >= IME_MIN_LENGTH) and (
+            self.helper_ime_installed()
+        ):
+            return "ime"
+        return "input"
+
+    @property
+    def ime_active(self) -> bool:
+        """Whether activate_ime() switched to the helper IME."""
+        return self._ime_active
+
+    def activate_ime(self) -> None:
+        """Switch to the helper IME, remembering the user's IME."""
+        if self._ime_active:
+            return
+        self._original_ime = self.get_setting("secure", "default_input_method")
+        self._run(["shell", "ime", "enable", HELPER_IME], check=False)
+        self._run(["shell", "ime", "set", HELPER_IME])
+        self._ime_active = True
+
+    def restore_ime(self) -> None:
+        """Switch back to the IME that was selected before activate_ime()."""
+        if not self._ime_active:
+            return
+        self._ime_active = False
+        if self._original_ime and self._original_ime != HELPER_IME:
+            self._run(["shell", "ime", "set", self._original_ime], check=False)
+
+    def clear_text(self) -> None:
+        """Clear the focused text field."""
+        if self._ime_active:
+            self._run(["shell", "am", "broadcast", "-a", "ADB_CLEAR_TEXT"])
+            return
+        self.keyevent(123)  # MOVE_END
+        for _ in range(100):
+            self.keyevent(67)  # DEL
+
+    def input_text(self, text: str) -> str:
         """Input text via ADB.
 
-        Handles special characters by escaping them.
+        Non-ASCII or long text is sent in one broadcast to the helper IME
+        as base64 (see text_input_method); otherwise `input text` is used,
+        escaping special characters.
+
+        Returns:
+            Method used: 'ime' or 'input'.
         """
+        if self.text_input_method(text) == "ime":
+            self.activate_ime()
+            payload = base64.b64encode(text.encode("utf-8")).decode("ascii")
+            self._run([
+                "shell", "am", "broadcast",
+                "-a", "ADB_INPUT_B64", "--es", "msg", payload,
+            ])
+            return "ime"
+
         escaped = text.replace("\\", "\\\\")
         escaped = escaped.replace(" ", "%s")
         escaped = escaped.replace("&", "\\&")
@@ -121,29 +481,147 @@ class ADBBackend:
         escaped = escaped.replace("|", "\\|")
         escaped = escaped.replace(";", "\\;")
         self._run(["shell", "input", "text", escaped])
+        return "input"
 
     def keyevent(self, keycode: int) -> None:
         """Send a key event."""
-        self._run(["shell", "input", "keyevent", str(keycode)])
+        self._run(["shell", *self.keyevent_command(keycode)])
+
+    def use_hierarchy_server(
+        self,
+        device_port: int = DEFAULT_DEVICE_PORT,
+        screenshots: bool = False,
+    ) -> bool:
+        """Route UITree dumps through a persistent on-device hierarchy server.
+
+        Forwards a free local port to `device_port` and pings the server.
+        If the service is not running, the forward is removed and dumps
+        keep using `uiautomator dump`.
+
+        Args:
+            device_port: Port the on-device service listens on.
+            screenshots: Also take screenshots through the server
+                (compressed; saved with the returned image extension).
+
+        Returns:
+            True if the server is reachable and will be used.
+        """
+        result = self._run(
+            ["forward", "tcp:0", f"tcp:{device_port}"], check=False
+        )
+        local_port = result.stdout.strip()
+        if result.returncode != 0 or not local_port.isdigit():
+            return False
+
+        client = HierarchyClient(
+            "127.0.0.1", int(local_port), timeout=self.default_timeout
+        )
+        if not client.ping():
+            client.close()
+            self._run(["forward", "--remove", f"tcp:{local_port}"], check=False)
+            return False
+
+        self.hierarchy = client
+        self.hierarchy_screenshots = screenshots
+        return True
+
+    def close_hierarchy_server(self) -> None:
+        """Stop using the hierarchy server and remove the port forward."""
+        if self.hierarchy is None:
+            return
+        port = self.hierarchy.port
+        self.hierarchy.close()
+        self.hierarchy = None
+        self._pending_xml = None
+        self._run(["forward", "--remove", f"tcp:{port}"], check=False)
+
+    def _hierarchy_dump(self, screenshot: bool) -> HierarchyDump | None:
+        """Dump through the hierarchy server; None (and disable) on failure."""
+        if self.hierarchy is None:
+            return None
+        start = time.monotonic()
+        trace_start = time.perf_counter()
+        try:
+            dump = self.hierarchy.dump(screenshot=screenshot)
+        except HierarchyError as e:
+            print(f"WARNING: {e}; falling back to uiautomator dump")
+            self.close_hierarchy_server()
+            return None
+        self._record_latency("hierarchy dump", time.monotonic() - start)
+        if self.tracer is not None:
+            self.tracer.complete(
+                "hierarchy dump",
+                "adb",
+                trace_start,
+                time.perf_counter(),
+                {"screenshot": screenshot},
+            )
+        return dump
+
+    def screenshot_bytes(self) -> tuple[bytes, str]:
+        """Capture a screenshot into memory.
 
-    def screenshot(self, local_path: str) -> None:
-        """Capture screenshot to local file."""
+        Returns:
+            (image bytes, file extension). Screenshots taken through the
+            hierarchy server keep their compressed format.
+        """
+        if self.hierarchy is not None and self.hierarchy_screenshots:
+            dump = self._hierarchy_dump(screenshot=True)
+            if dump is not None and dump.image:
+                # The hierarchy came for free; reuse it for an immediate dump.
+                self._pending_xml = (time.monotonic(), dump.xml.strip())
+                return dump.image, IMAGE_EXTENSIONS.get(dump.image_format, ".png")
+
+        result = self._run(
+            ["exec-out", "screencap", "-p"], check=False, binary=True
+        )
+        if result.returncode == 0 and result.stdout:
+            return result.stdout, ".png"
+
+        # Fallback: capture on device then pull
+        fd, tmp_path = tempfile.mkstemp(suffix=".png")
+        os.close(fd)
+        try:
+            self._run(["shell", "screencap", self._device_screenshot])
+            self._run(["pull", self._device_screenshot, tmp_path])
+            self._run(["shell", "rm", self._device_screenshot], check=False)
+            with open(tmp_path, "rb") as f:
+                return f.read(), ".png"
+        finally:
+            os.remove(tmp_path)
+
+    def screenshot(self, local_path: str) -> str:
+        """Capture screenshot to local file.
+
+        Returns:
+            Path actually written (the extension follows the image
+            format, see screenshot_bytes()).
+        """
+        data, ext = self.screenshot_bytes()
+        local_path = os.path.splitext(local_path)[0] + ext
         os.makedirs(os.path.dirname(local_path) or ".", exist_ok=True)
-        result = self._run(["exec-out", "screencap", "-p"], check=False)
-        if result.returncode == 0:
-            with open(local_path, "wb") as f:
-                f.write(result.stdout.encode("latin-1") if isinstance(result.stdout, str) else result.stdout)
-        else:
-            # Fallback: capture on device then pull
-            self._run(["shell", "screencap", "/sdcard/_uiai_screenshot.png"])
-            self._run(["pull", "/sdcard/_uiai_screenshot.png", local_path])
-            self._run(["shell", "rm", "/sdcard/_uiai_screenshot.png"], check=False)
+        with open(local_path, "wb") as f:
+            f.write(data)
+        return local_path
 
     def dump_uitree(self) -> str:
-        """Dump UITree XML and return as string."""
-        self._run(["shell", "uiautomator", "dump", "/sdcard/_uiai_ui.xml"])
-        result = self._run(["shell", "cat", "/sdcard/_uiai_ui.xml"])
-        self._run(["shell", "rm", "/sdcard/_uiai_ui.xml"], check=False)
+        """Dump UITree XML and return as string.
+
+        Uses the hierarchy server when enabled (see use_hierarchy_server()),
+        otherwise `uiautomator dump`.
+        """
+        if self._pending_xml is not None:
+            taken_at, xml_content = self._pending_xml
+            self._pending_xml = None
+            if time.monotonic() - taken_at <= HIERARCHY_REUSE_SEC:
+                return xml_content
+        dump = self._hierarchy_dump(screenshot=False)
+        if dump is not None:
+            return dump.xml.strip()
+
+        self._run(["shell", "uiautomator", "dump", self._device_uitree])
+        result = self._run(["shell", "cat", self._device_uitree])
+        self._run(["shell", "rm", self._device_uitree], check=False)
         return result.stdout.strip()
 
     def save_uitree(self, local_path: str) -> str:
@@ -167,6 +645,15 @@ class ADBBackend:
             distance: Scroll distance in pixels.
             duration_ms: Swipe duration.
         """
+        self._run(["shell", *self.scroll_command(direction, distance, duration_ms)])
+
+    def scroll_command(
+        self,
+        direction: str,
+        distance: int = 500,
+        duration_ms: int = 300,
+    ) -> list[str]:
+        """Device shell command for a scroll (see scroll())."""
         if not self.screen_width:
             self.get_screen_size()
 
@@ -174,15 +661,75 @@ class ADBBackend:
         cy = self.screen_height // 2
 
         if direction == "down":
-            self.swipe(cx, cy + distance // 2, cx, cy - distance // 2, duration_ms)
-        elif direction == "up":
-            self.swipe(cx, cy - distance // 2, cx, cy + distance // 2, duration_ms)
-        elif direction == "left":
-            self.swipe(cx + distance // 2, cy, cx - distance // 2, cy, duration_ms)
-        elif direction == "right":
-            self.swipe(cx - distance // 2, cy, cx + distance // 2, cy, duration_ms)
-        else:
-            raise ADBError(f"Unknown scroll direction: {direction}")
+            return self.swipe_command(
+                cx, cy + distance // 2, cx, cy - distance // 2, duration_ms
+            )
+        if direction == "up":
+            return self.swipe_command(
+                cx, cy - distance // 2, cx, cy + distance // 2, duration_ms
+            )
+        if direction == "left":
+            return self.swipe_command(
+                cx + distance // 2, cy, cx - distance // 2, cy, duration_ms
+            )
+        if direction == "right":
+            return self.swipe_command(
+                cx - distance // 2, cy, cx + distance // 2, cy, duration_ms
+            )
+        raise ADBError(f"Unknown scroll direction: {direction}")
+
+    def run_script(
+        self, commands: list[list[str]], timeout: float | None = None
+    ) -> list[dict]:
+        """Run several device shell commands in a single round trip.
+
+        Each command is wrapped with device-side timestamps. Execution
+        stops at the first command that exits non-zero.
+
+        Args:
+            commands: Device shell commands (e.g. from tap_command()).
+                An empty list is a no-op marker, useful for timing.
+            timeout: Timeout for the whole script.
+
+        Returns:
+            One dict per command: {executed, returncode, start_ns, end_ns}.
+            Timestamps are None if the device `date` lacks %N support.
+        """
+        lines = []
+        for i, command in enumerate(commands):
+            body = " ".join(shlex.quote(arg) for arg in command) or "true"
+            lines.append(
+                f"echo @S {i} $(date +%s%N); {body}; rc=$?; "
+                f"echo @E {i} $rc $(date +%s%N); "
+                f"[ $rc -eq 0 ] || exit $rc"
+            )
+        if timeout is None:
+            timeout = self.timeouts.get("shell script", self.default_timeout)
+        result = self._run(
+            ["shell", "; ".join(lines)], timeout=timeout, check=False
+        )
+
+        records = [
+            {
+                "executed": False,
+                "returncode": None,
+                "start_ns": None,
+                "end_ns": None,
+            }
+            for _ in commands
+        ]
+        for line in result.stdout.splitlines():
+            parts = line.split()
+            if len(parts) < 3 or parts[0] not in ("@S", "@E"):
+                continue
+            i = int(parts[1])
+            if parts[0] == "@S":
+                records[i]["executed"] = True
+                records[i]["start_ns"] = _parse_ns(parts[2])
+            elif len(parts) >= 4:
+                records[i]["returncode"] = int(parts[2])
+                records[i]["end_ns"] = _parse_ns(parts[3])
+        return records
 
     def wait(self, seconds: float) -> None:
         """Wait for specified seconds."""
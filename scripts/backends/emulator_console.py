@@ -0,0 +1,141 @@
+"""Emulator console control for state snapshots.
+
+`EmulatorConsole` is the interface the snapshot manager uses. The real
+implementation, `AdbEmuConsole`, sends console commands through
+`adb -s emulator-NNNN emu ...`, which handles the console port and auth
+token. `FakeEmulatorConsole` keeps snapshots in memory and can stand in
+for an emulator in tests.
+"""
+
+import re
+from abc import ABC, abstractmethod
+
+from .adb_backend import ADBBackend, ADBError
+
+# Saving or loading a snapshot of a large AVD can take a while.
+SNAPSHOT_TIMEOUT = 120.0
+
+_EMULATOR_SERIAL_RE = re.compile(r"^emulator-\d+$")
+
+
+class EmulatorConsoleError(Exception):
+    """Raised when an emulator console command fails."""
+
+
+def is_emulator(adb: ADBBackend) -> bool:
+    """Whether the device is a local emulator reachable by `adb emu`."""
+    return bool(adb.device_serial and _EMULATOR_SERIAL_RE.match(adb.device_serial))
+
+
+class EmulatorConsole(ABC):
+    """Snapshot operations of one emulator instance."""
+
+    @abstractmethod
+    def avd_name(self) -> str:
+        """Name of the emulator's AVD."""
+
+    @abstractmethod
+    def list_snapshots(self) -> list[str]:
+        """Names of the snapshots of the AVD."""
+
+    @abstractmethod
+    def save_snapshot(self, name: str) -> None:
+        """Save the current emulator state as a snapshot."""
+
+    @abstractmethod
+    def load_snapshot(self, name: str) -> None:
+        """Restore the emulator state from a snapshot."""
+
+    @abstractmethod
+    def delete_snapshot(self, name: str) -> None:
+        """Delete a snapshot."""
+
+
+class AdbEmuConsole(EmulatorConsole):
+    """Emulator console reached through `adb emu`."""
+
+    def __init__(self, adb: ADBBackend):
+        if not is_emulator(adb):
+            raise EmulatorConsoleError(
+                f"Not an emulator serial: {adb.device_serial or 'default'}"
+            )
+        self.adb = adb
+        self._avd_name: str | None = None
+
+    def command(self, *args: str, timeout: float | None = None) -> list[str]:
+        """Run a console command and return its output lines (without OK)."""
+        try:
+            result = self.adb._run(["emu", *args], timeout=timeout)
+        except ADBError as e:
+            raise EmulatorConsoleError(str(e)) from e
+        lines = [line.rstrip() for line in result.stdout.splitlines()]
+        for line in lines:
+            if line.startswith("KO"):
+                raise EmulatorConsoleError(
+                    f"Console command failed: {' '.join(args)}: {line[2:].strip(': ')}"
+                )
+        return [line for line in lines if line and line != "OK"]
+
+    def avd_name(self) -> str:
+        if self._avd_name is None:
+            lines = self.command("avd", "name")
+            self._avd_name = lines[0].strip() if lines else ""
+        return self._avd_name
+
+    def list_snapshots(self) -> list[str]:
+        """Snapshot tags from `avd snapshot list`.
+
+        Output rows look like `--        <tag>   <vm size>  <date> ...`.
+        """
+        names = []
+        for line in self.command("avd", "snapshot", "list"):
+            parts = line.split()
+            if len(parts) >= 2 and parts[0] == "--":
+                names.append(parts[1])
+        return names
+
+    def save_snapshot(self, name: str) -> None:
+        self.command("avd", "snapshot", "save", name, timeout=SNAPSHOT_TIMEOUT)
+
+    def load_snapshot(self, name: str) -> None:
+        self.command("avd", "snapshot", "load", name, timeout=SNAPSHOT_TIMEOUT)
+
+    def delete_snapshot(self, name: str) -> None:
+        self.command("avd", "snapshot", "delete", name, timeout=SNAPSHOT_TIMEOUT)
+
+
+class FakeEmulatorConsole(EmulatorConsole):
+    """In-memory console for tests.
+
+    Snapshots store the value returned by `capture()`; loading one passes
+    it to `restore()`, so a test can model the device state it cares
+    about (e.g. a dict of screens). Every command is appended to `calls`.
+    """
+
+    def __init__(self, avd: str = "fake_avd", capture=None, restore=None):
+        self.avd = avd
+        self.capture = capture or (lambda: None)
+        self.restore = restore or (lambda state: None)
+        self.snapshots: dict[str, object] = {}
+        self.calls: list[tuple[str, ...]] = []
+
+    def avd_name(self) -> str:
+        return self.avd
+
+    def list_snapshots(self) -> list[str]:
+        self.calls.append(("list",))
+        return list(self.snapshots)
+
+    def save_snapshot(self, name: str) -> None:
+        self.calls.append(("save", name))
+        self.snapshots[name] = self.capture()
+
+    def load_snapshot(self, name: str) -> None:
+        self.calls.append(("load", name))
+        if name not in self.snapshots:
+            raise EmulatorConsoleError(f"No such snapshot: {name}")
+        self.restore(self.snapshots[name])
+
+    def delete_snapshot(self, name: str) -> None:
+        self.calls.append(("delete", name))
+        self.snapshots.pop(name, None)
@@ -0,0 +1,259 @@
+"""Client for a persistent on-device hierarchy server.
+
+`uiautomator dump` starts a new instrumentation for every call. A
+long-lived on-device service can instead keep the accessibility
+connection open and answer requests over a socket reached through
+`adb forward`.
+
+Protocol (one request/response pair at a time on a TCP connection):
+
+    request:  one JSON line, e.g. {"cmd": "dump", "screenshot": true}
+    response: one JSON header line, then the payload bytes
+              {"status": "ok", "xml_bytes": N, "image_bytes": M,
+               "image_format": "jpeg"}
+              <N bytes UTF-8 window hierarchy XML><M bytes image>
+
+Commands are `ping` (header only, no payload) and `dump`. Errors are
+reported as {"status": "error", "message": "..."} with no payload.
+
+`RecordedHierarchyServer` is a local stand-in that serves recorded XML
+with the same protocol, for exercising the client without a device.
+"""
+
+import json
+import socket
+import socketserver
+import threading
+from dataclasses import dataclass
+
+DEFAULT_DEVICE_PORT = 9008
+PROTOCOL_VERSION = 1
+
+
+class HierarchyError(Exception):
+    """Raised when the hierarchy server cannot be reached or fails."""
+
+
+class _ServerError(HierarchyError):
+    """Error reported by the server itself (not worth retrying)."""
+
+
+@dataclass
+class HierarchyDump:
+    """Response of a `dump` request."""
+
+    xml: str
+    image: bytes = b""
+    image_format: str = ""
+
+
+class HierarchyClient:
+    """Request/response client for the hierarchy server protocol."""
+
+    def __init__(self, host: str, port: int, timeout: float = 10.0):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._sock: socket.socket | None = None
+        self._reader = None
+
+    def close(self) -> None:
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def __enter__(self) -> "HierarchyClient":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _connect(self) -> None:
+        try:
+            self._sock = socket.create_connection(
+                (self.host, self.port), timeout=self.timeout
+            )
+        except OSError as e:
+            raise HierarchyError(
+                f"Cannot connect to hierarchy server at "
+                f"{self.host}:{self.port}: {e}"
+            ) from e
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._reader = self._sock.makefile("rb")
+
+    def _request(self, request: dict) -> tuple[dict, bytes]:
+        """Send a request, reconnecting once on a dropped connection."""
+        for attempt in range(2):
+            try:
+                if self._sock is None:
+                    self._connect()
+                return self._exchange(request)
+            except _ServerError:
+                raise
+            except (OSError, HierarchyError) as e:
+                self.close()
+                if attempt == 0:
+                    continue
+                if isinstance(e, HierarchyError):
+                    raise
+                raise HierarchyError(f"Hierarchy request failed: {e}") from e
+        raise HierarchyError("Hierarchy request failed")
+
+    def _exchange(self, request: dict) -> tuple[dict, bytes]:
+        line = json.dumps(request).encode("utf-8") + b"\n"
+        self._sock.sendall(line)
+        header_line = self._reader.readline()
+        if not header_line:
+            raise HierarchyError("Hierarchy server closed the connection")
+        try:
+            header = json.loads(header_line)
+        except json.JSONDecodeError as e:
+            raise HierarchyError(f"Malformed response header: {header_line!r}") from e
+        if header.get("status") != "ok":
+            raise _ServerError(
+                f"Hierarchy server error: {header.get('message', header)}"
+            )
+        size = int(header.get("xml_bytes", 0)) + int(header.get("image_bytes", 0))
+        payload = self._reader.read(size) if size else b""
+        if len(payload) != size:
+            raise HierarchyError(
+                f"Truncated response: expected {size} bytes, got {len(payload)}"
+            )
+        return header, payload
+
+    def ping(self) -> bool:
+        """Check that the server answers. Never raises."""
+        try:
+            self._request({"cmd": "ping"})
+            return True
+        except HierarchyError:
+            return False
+
+    def dump(
+        self,
+        screenshot: bool = False,
+        image_format: str = "jpeg",
+        quality: int = 80,
+    ) -> HierarchyDump:
+        """Fetch the window hierarchy, optionally with a screenshot.
+
+        Args:
+            screenshot: Also return a compressed screenshot.
+            image_format: Requested image format ('jpeg', 'webp', 'png').
+            quality: Compression quality for lossy formats.
+
+        Returns:
+            HierarchyDump with XML and optional image bytes.
+        """
+        request = {"cmd": "dump", "screenshot": screenshot}
+        if screenshot:
+            request["image_format"] = image_format
+            request["quality"] = quality
+        header, payload = self._request(request)
+        xml_size = int(header.get("xml_bytes", 0))
+        return HierarchyDump(
+            xml=payload[:xml_size].decode("utf-8"),
+            image=payload[xml_size:],
+            image_format=header.get("image_format", "") if screenshot else "",
+        )
+
+
+class _RecordedHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        server: "RecordedHierarchyServer" = self.server  # type: ignore[assignment]
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            try:
+                request = json.loads(line)
+            except json.JSONDecodeError:
+                self._send({"status": "error", "message": "bad request"})
+                continue
+            server.requests.append(request)
+            cmd = request.get("cmd")
+            if cmd == "ping":
+                self._send({"status": "ok", "version": PROTOCOL_VERSION})
+            elif cmd == "dump":
+                xml = server.next_xml().encode("utf-8")
+                image = server.image if request.get("screenshot") else b""
+                header = {
+                    "status": "ok",
+                    "xml_bytes": len(xml),
+                    "image_bytes": len(image),
+                }
+                if image:
+                    header["image_format"] = server.image_format
+                self._send(header, xml + image)
+            else:
+                self._send({"status": "error", "message": f"unknown cmd {cmd}"})
+
+    def _send(self, header: dict, payload: bytes = b"") -> None:
+        self.wfile.write(json.dumps(header).encode("utf-8") + b"\n" + payload)
+        self.wfile.flush()
+
+
+class RecordedHierarchyServer(socketserver.ThreadingTCPServer):
+    """Local stand-in server that replays recorded hierarchy XML.
+
+    Each `dump` returns the next recorded XML; the last one repeats once
+    the recording is exhausted.
+
+    Example:
+        with RecordedHierarchyServer([xml1, xml2]) as server:
+            client = HierarchyClient("127.0.0.1", server.port)
+            client.dump().xml
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(
+        self,
+        xml_pages: list[str],
+        image: bytes = b"",
+        image_format: str = "png",
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        if not xml_pages:
+            raise ValueError("At least one recorded XML page is required")
+        super().__init__((host, port), _RecordedHandler)
+        self.xml_pages = list(xml_pages)
+        self.image = image
+        self.image_format = image_format
+        self.requests: list[dict] = []
+        self._position = 0
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    @classmethod
+    def from_files(cls, paths: list[str], **kwargs) -> "RecordedHierarchyServer":
+        """Create a server from recorded `step_XX_uitree.xml` files."""
+        pages = []
+        for path in paths:
+            with open(path, "r", encoding="utf-8") as f:
+                pages.append(f.read())
+        return cls(pages, **kwargs)
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def next_xml(self) -> str:
+        with self._lock:
+            xml = self.xml_pages[min(self._position, len(self.xml_pages) - 1)]
+            self._position += 1
+            return xml
+
+    def __enter__(self) -> "RecordedHierarchyServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.shutdown()
+        self.server_close()
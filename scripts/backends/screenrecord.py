@@ -0,0 +1,193 @@
+"""Continuous `screenrecord` capture with host-side frame extraction.
+
+`ScreenRecorder` keeps `adb shell screenrecord` running in the
+background for a whole scenario. The device stops a recording when its
+time limit is reached, so a monitor thread immediately starts the next
+segment. Each segment remembers the host monotonic time it started at,
+which maps any host timestamp to (segment, offset) afterwards.
+
+Frames are extracted on the host with ffmpeg, in parallel.
+"""
+
+import os
+import shutil
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from .adb_backend import ADBBackend, ADBError
+
+# Android caps a single screenrecord run at 180 seconds.
+DEFAULT_TIME_LIMIT = 180
+DEFAULT_BIT_RATE = 4_000_000
+
+# Approximate delay between starting screenrecord and its first frame.
+STARTUP_LATENCY_SEC = 0.3
+
+
+@dataclass
+class Segment:
+    """One screenrecord run."""
+
+    device_path: str
+    started_at: float
+    ended_at: float | None = None
+    local_path: str = ""
+
+
+class ScreenRecorder:
+    """Background screen recording of one device, rotating segments."""
+
+    def __init__(
+        self,
+        adb: ADBBackend,
+        time_limit: int = DEFAULT_TIME_LIMIT,
+        bit_rate: int = DEFAULT_BIT_RATE,
+        device_dir: str = "/sdcard",
+    ):
+        self.adb = adb
+        self.time_limit = time_limit
+        self.bit_rate = bit_rate
+        self.device_dir = device_dir
+        self.segments: list[Segment] = []
+        self._process: subprocess.Popen | None = None
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._monitor: threading.Thread | None = None
+        # Unique part of this recorder's device file names: other runners
+        # may record the same device.
+        self.tag = f"{os.getpid()}_{os.urandom(3).hex()}"
+
+    def start(self) -> None:
+        """Start recording (the first segment) and the rotation monitor."""
+        self._stopping.clear()
+        with self._lock:
+            self._start_segment()
+        self._monitor = threading.Thread(target=self._rotate, daemon=True)
+        self._monitor.start()
+
+    def _start_segment(self) -> None:
+        """Start the next segment (call with self._lock held)."""
+        number = len(self.segments) + 1
+        device_path = f"{self.device_dir}/_uiai_rec_{self.tag}_{number:03d}.mp4"
+        cmd = self.adb._base_cmd + [
+            "shell", "screenrecord",
+            "--time-limit", str(self.time_limit),
+            "--bit-rate", str(self.bit_rate),
+            device_path,
+        ]
+        self._process = subprocess.Popen(
+            cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        self.segments.append(
+            Segment(device_path, time.monotonic() + STARTUP_LATENCY_SEC)
+        )
+
+    def _rotate(self) -> None:
+        while True:
+            process = self._process
+            if process is None:
+                return
+            process.wait()
+            with self._lock:
+                self.segments[-1].ended_at = time.monotonic()
+                # stop() sets _stopping under the lock, so no segment
+                # starts once it has begun.
+                if self._stopping.is_set():
+                    return
+                self._start_segment()
+
+    def stop(self) -> None:
+        """Stop recording; SIGINT lets screenrecord finalize the file.
+
+        Only this recorder's screenrecord is signalled (matched by its
+        device file names).
+        """
+        with self._lock:
+            self._stopping.set()
+            process = self._process
+        # "[_]" keeps the pattern from matching pkill's own command line.
+        self.adb._run(
+            ["shell", "pkill", "-INT", "-f", f"[_]uiai_rec_{self.tag}_"],
+            check=False,
+        )
+        if process is not None:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        if self._monitor is not None:
+            self._monitor.join(timeout=10)
+        if self.segments and self.segments[-1].ended_at is None:
+            self.segments[-1].ended_at = time.monotonic()
+
+    def pull(self, local_dir: str) -> list[Segment]:
+        """Pull all segments to local_dir and delete them from the device."""
+        os.makedirs(local_dir, exist_ok=True)
+        for segment in self.segments:
+            local_path = os.path.join(
+                local_dir, os.path.basename(segment.device_path).lstrip("_")
+            )
+            try:
+                self.adb._run(["pull", segment.device_path, local_path])
+                segment.local_path = local_path
+            except ADBError as e:
+                print(f"WARNING: Could not pull {segment.device_path}: {e}")
+            self.adb._run(["shell", "rm", segment.device_path], check=False)
+        return self.segments
+
+    def locate(self, timestamp: float) -> tuple[Segment, float] | None:
+        """Map a host monotonic timestamp to (segment, offset seconds)."""
+        for segment in self.segments:
+            end = segment.ended_at if segment.ended_at is not None else float("inf")
+            if segment.started_at <= timestamp <= end:
+                return segment, timestamp - segment.started_at
+        # Between segments (rotation gap) or before the first frame:
+        # use the closest earlier segment's last frame.
+        earlier = [s for s in self.segments if s.started_at <= timestamp]
+        if earlier:
+            segment = earlier[-1]
+            end = segment.ended_at or timestamp
+            return segment, max(0.0, end - segment.started_at)
+        if self.segments:
+            return self.segments[0], 0.0
+        return None
+
+
+def extract_frame(video_path: str, offset_sec: float, output_path: str) -> bool:
+    """Extract a single frame at offset_sec with ffmpeg."""
+    result = subprocess.run(
+        [
+            "ffmpeg", "-v", "error",
+            "-ss", f"{offset_sec:.3f}",
+            "-i", video_path,
+            "-frames:v", "1",
+            "-y", output_path,
+        ],
+        capture_output=True,
+        check=False,
+    )
+    return result.returncode == 0 and os.path.exists(output_path)
+
+
+def extract_frames(
+    requests: list[tuple[str, float, str]], workers: int | None = None
+) -> list[bool]:
+    """Extract many frames in parallel.
+
+    Args:
+        requests: (video path, offset seconds, output path) tuples.
+        workers: Thread count (default: CPU count).
+
+    Returns:
+        Success flag per request, in order.
+    """
+    if not requests:
+        return []
+    if shutil.which("ffmpeg") is None:
+        print("WARNING: ffmpeg not found; frames not extracted from recordings")
+        return [False] * len(requests)
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        return list(pool.map(lambda r: extract_frame(*r), requests))
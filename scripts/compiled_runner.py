@@ -12,7 +12,53 @@ Options:
     --output-dir <path>   Output directory for results
     --skip-ai             Skip AI checkpoint steps (mark as skipped)
     --variables KEY=VAL   Override variables (repeatable)
-    --recompile           Force recompilation from source YAML
+    --recompile           Recompile from the source YAML before running
+                          (keeps metadata of unchanged steps)
+    --result-dir <path>   With --recompile, take element metadata and UITree
+                          checks from this AI run's result.json
+    --history-db <path>   Ingest result.json into run history DB after the run
+    --tune-from <path>    Tune waits and ADB timeouts from a run history DB
+    --fuse-actions        Batch consecutive non-observing actions into one
+                          device script (evidence only at group boundaries)
+    --fuse-taps           Also fuse taps at compile-time element bounds
+    --hierarchy-server [PORT]
+                          Dump UITrees via a persistent on-device hierarchy
+                          server (falls back to uiautomator dump)
+    --server-screenshots  Also take compressed screenshots via that server
+    --loop <n>            Soak mode: run the scenario n times
+    --loop-duration <sec> Soak mode: keep iterating for this many seconds
+    --keep-last <n>       Soak mode: passing iterations whose evidence is kept
+    --verbose             Soak mode: also print per-step progress
+    --evidence <level>    Evidence to write: all (default), failures, none,
+                          or video (background screenrecord)
+    --evidence-context <n>
+                          With 'failures', also write the n preceding steps
+    --no-uitree-diff      Do not record structural UITree diffs per step
+    --device-prep [ITEMS] Prepare the device for speed before running:
+                          animations, stay_awake, keyguard (default: all)
+    --keep-device-prep    Do not restore the original device settings
+    --text-input <mode>   Text entry: auto (default; helper IME for non-ASCII
+                          or long text when installed), input, or ime
+    --ai-uitree-budget <n>
+                          Token budget of the compact UITree written for
+                          ai_required steps (default: no limit)
+    --ai-image-edge <px>  Long edge of the downscaled screenshot variants
+                          written for ai_required steps (default: 1024;
+                          0 disables them)
+    --ai-image-format <f> Variant encoding: jpeg (default) or webp
+    --ai-image-crop       Also write variants cropped to the target element
+                          (or the main scrollable list)
+    --fail-fast <policy>  After a failed step: off (default; run every step),
+                          abort (skip all remaining steps), section (skip
+                          the rest of the failed section) or dependents
+                          (also skip sections whose depends_on reaches it)
+    --trace [PATH]        Write a Chrome trace-event timeline of the run
+                          (step phases and ADB commands) for Perfetto or
+                          chrome://tracing (default: <output-dir>/trace.json;
+                          soak mode writes one per iteration directory)
+    --snapshot-after <id> Emulators only: snapshot the state after this
+                          section and restore it instead of re-running the
+                          steps up to it on later runs (repeatable)
 """
 
 import argparse
@@ -20,31 +66,81 @@ import hashlib
 import json
 import os
 import re
+import shutil
 import sys
 import time
+import xml.etree.ElementTree as ET
+from collections import deque
+from contextlib import nullcontext
 from datetime import datetime, timezone
 from pathlib import Path
+from typing import Iterable, Iterator
 
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent))
 
-from backends.adb_backend import ADBBackend, ADBError
+from backends.adb_backend import (
+    SCROLL_DIRECTIONS,
+    TEXT_INPUT_MODES,
+    ADBBackend,
+    ADBError,
+)
+from backends.emulator_console import (
+    AdbEmuConsole,
+    EmulatorConsole,
+    EmulatorConsoleError,
+    is_emulator,
+)
+from backends.hierarchy_client import DEFAULT_DEVICE_PORT
+from device_prep import DevicePrep, parse_prep_items
+from evidence import EVIDENCE_LEVELS, EvidenceRecorder
+from snapshots import SnapshotManager
+from utils.image_variants import (
+    IMAGE_FORMATS,
+    VariantPool,
+    crop_region,
+    largest_scroll_container,
+)
+from utils.selector import CheckMatcher, SelectorError
+from utils.trace import Tracer, Track
+from utils.uitree_diff import HashedNode, hash_tree, summarize_diff
 from utils.uitree_parser import (
-    class_exists,
-    count_elements,
+    compact_uitree,
     find_by_text,
     find_edit_text,
+    get_center,
+    parse_bounds,
     parse_uitree,
     resolve_element,
-    resource_id_exists,
     text_exists,
 )
 
 
+FAIL_FAST_POLICIES = ("off", "abort", "section", "dependents")
+
+
 class CompiledRunnerError(Exception):
     """Raised when the compiled runner encounters an error."""
 
 
+def summarize_steps(results: list[dict]) -> dict:
+    """Count step statuses for the result.json summary."""
+    passed = sum(1 for r in results if r["status"] == "passed")
+    failed = sum(1 for r in results if r["status"] == "failed")
+    skipped = sum(1 for r in results if r["status"] == "skipped")
+    ai_required = sum(1 for r in results if r["status"] == "ai_required")
+    total = len(results)
+
+    return {
+        "total_steps": total,
+        "passed": passed,
+        "failed": failed,
+        "skipped": skipped,
+        "ai_required": ai_required,
+        "pass_rate": round(passed / total * 100, 1) if total > 0 else 0,
+    }
+
+
 class CompiledRunner:
     """Executes a compiled JSON IR scenario."""
 
@@ -55,19 +151,97 @@ class CompiledRunner:
         output_dir: str | None = None,
         skip_ai: bool = False,
         variable_overrides: dict | None = None,
+        tuning_db: str | None = None,
+        compiled: dict | None = None,
+        fuse_actions: bool = False,
+        fuse_taps: bool = False,
+        max_fused_wait: float = 2.0,
+        hierarchy_port: int | None = None,
+        server_screenshots: bool = False,
+        verbose: bool = True,
+        evidence_level: str = "all",
+        evidence_context: int = 3,
+        uitree_diff: bool = True,
+        device_prep: list[str] | None = None,
+        restore_device: bool = True,
+        text_input: str = "auto",
+        snapshot_after: list[str] | None = None,
+        snapshot_console: EmulatorConsole | None = None,
+        ai_uitree_budget: int | None = None,
+        ai_image_edge: int = 1024,
+        ai_image_format: str = "jpeg",
+        ai_image_crop: bool = False,
+        fail_fast: str | None = None,
+        trace_path: str | None = None,
+        tracer: Tracer | None = None,
     ):
         self.compiled_path = compiled_path
         self.skip_ai = skip_ai
         self.variable_overrides = variable_overrides or {}
-
-        with open(compiled_path, "r", encoding="utf-8") as f:
-            self.compiled = json.load(f)
+        self.tuning_db = tuning_db
+        self.tuning = None
+        self.device_model = ""
+        self.fuse_actions = fuse_actions
+        self.fuse_taps = fuse_taps
+        self.max_fused_wait = max_fused_wait
+        self.hierarchy_port = hierarchy_port
+        self.server_screenshots = server_screenshots
+        self.verbose = verbose
+        self.evidence_level = evidence_level
+        self.evidence_context = evidence_context
+        self.evidence: EvidenceRecorder | None = None
+        self.uitree_diff = uitree_diff
+        self.device_prep = device_prep
+        self.restore_device = restore_device
+        self.prep: DevicePrep | None = None
+        self.ai_uitree_budget = ai_uitree_budget
+        self.ai_image_edge = ai_image_edge
+        self.ai_image_format = ai_image_format
+        self.ai_image_crop = ai_image_crop
+        self.ai_images: VariantPool | None = None
+        # (step result, crop box) whose screenshots are not on disk yet
+        self._ai_image_queue: list[tuple[dict, tuple | None]] = []
+        self.snapshot_after = snapshot_after or []
+        self.snapshot_console = snapshot_console
+        self.snapshots: SnapshotManager | None = None
+        self._snapshot_run: dict = {}
+        # (step result, hashed tree) of the last step that dumped a UITree
+        self._last_tree: tuple[dict, HashedNode] | None = None
+
+        if compiled is None:
+            with open(compiled_path, "r", encoding="utf-8") as f:
+                compiled = json.load(f)
+        self.compiled = compiled
+        self.fail_fast = fail_fast or compiled.get("fail_fast", "off")
+        if self.fail_fast not in FAIL_FAST_POLICIES:
+            raise CompiledRunnerError(
+                f"Unknown fail-fast policy: {self.fail_fast} "
+                f"(choose from {', '.join(FAIL_FAST_POLICIES)})"
+            )
+        # Section -> "step N failed" for sections with a failed step
+        self._failed_sections: dict[str, str] = {}
+        self._depends_on = {
+            step.get("section", ""): step["depends_on"]
+            for step in compiled.get("steps", [])
+            if step.get("depends_on")
+        }
 
         self.adb = ADBBackend(device)
+        self.adb.text_input_mode = text_input
         self.output_dir = output_dir or self._default_output_dir()
+        # A shared tracer (e.g. one per sharded run) is exported by its owner.
+        self.trace_path = trace_path
+        self.tracer = tracer or (Tracer() if trace_path is not None else None)
+        self._owns_tracer = tracer is None and self.tracer is not None
+        self.track: Track | None = None
+        if self.tracer is not None:
+            self.track = self.tracer.track(self.adb.device_serial or "default")
+            self.adb.tracer = self.track
         self.variables = self._resolve_variables()
         self.results: list[dict] = []
         self.start_time: str = ""
+        # uitree_verify matchers by step index (reused across loop runs)
+        self._matchers: dict[int, CheckMatcher] = {}
 
     def _default_output_dir(self) -> str:
         ts = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -91,8 +265,29 @@ class CompiledRunner:
 
         return re.sub(r"(?<!\\)\(([a-zA-Z_][a-zA-Z0-9_]*)\)", replacer, text)
 
+    def _check_matcher(self, step_index: int, compiled: dict) -> CheckMatcher:
+        """Return the cached single-pass matcher of a uitree_verify step."""
+        matcher = self._matchers.get(step_index)
+        if matcher is None:
+            checks = []
+            for check in compiled.get("checks", []):
+                if check.get("type") in ("text_visible", "text_not_visible"):
+                    check = {
+                        **check,
+                        "value": self._interpolate(check.get("value", "")),
+                    }
+                checks.append(check)
+            matcher = CheckMatcher(checks)
+            self._matchers[step_index] = matcher
+        return matcher
+
     def check_staleness(self) -> bool:
-        """Check if compiled.json is stale (source YAML changed)."""
+        """Check if compiled.json is stale (source YAML changed).
+
+        With section hashes, reports which sections changed; edits that
+        leave every section and the variables unchanged (comments,
+        formatting) are not stale.
+        """
         source_path = self.compiled.get("source", "")
         expected_hash = self.compiled.get("source_hash", "")
 
@@ -102,7 +297,16 @@ class CompiledRunner:
         with open(source_path, "rb") as f:
             actual_hash = "sha256:" + hashlib.sha256(f.read()).hexdigest()
 
-        if expected_hash and actual_hash != expected_hash:
+        if not expected_hash or actual_hash == expected_hash:
+            return False
+
+        from compiler import CompilerError, load_scenario, stale_sections
+
+        try:
+            stale = stale_sections(load_scenario(source_path), self.compiled)
+        except CompilerError:
+            stale = None
+        if stale is None:
             print(
                 f"WARNING: Source YAML has changed since compilation.\n"
                 f"  Expected: {expected_hash}\n"
@@ -110,39 +314,608 @@ class CompiledRunner:
                 f"  Consider recompiling with --recompile"
             )
             return True
-        return False
 
-    def run(self) -> dict:
-        """Execute all compiled steps."""
-        os.makedirs(self.output_dir, exist_ok=True)
+        lines = [
+            f"  {label}: {', '.join(stale[key])}"
+            for key, label in (
+                ("changed", "Changed sections"),
+                ("added", "Added sections"),
+                ("removed", "Removed sections"),
+                ("dependents", "Replays of changed sections"),
+            )
+            if stale[key]
+        ]
+        if stale.get("reordered"):
+            lines.append("  Section order changed")
+        if stale["variables_changed"]:
+            lines.append("  Variables block changed")
+        if not lines:
+            # Comments or formatting only: every compiled step is current.
+            return False
+        print(
+            "WARNING: Source YAML has changed since compilation.\n"
+            + "\n".join(lines)
+            + "\n  Consider recompiling with --recompile (only these sections are rebuilt)"
+        )
+        return True
 
+    def _prepare(self) -> None:
+        """Check the device and load per-run settings (once per runner)."""
         if not self.adb.check_connection():
             raise CompiledRunnerError("No ADB device connected")
 
         self.adb.get_screen_size()
+        self.device_model = self.adb.get_device_model()
         self.check_staleness()
+        if self.tuning_db:
+            self._load_tuning()
+        if self.hierarchy_port:
+            if self.adb.use_hierarchy_server(
+                self.hierarchy_port, self.server_screenshots
+            ):
+                print(f"Hierarchy server: connected (device port {self.hierarchy_port})")
+            else:
+                print("Hierarchy server: not available, using uiautomator dump")
+        if self.device_prep:
+            self.prep = DevicePrep(
+                self.adb, self.device_prep, restore_on_exit=self.restore_device
+            )
+            report = self.prep.apply()
+            print(
+                f"Device prep: {', '.join(report['items'])} "
+                f"({report['duration_ms']}ms"
+                + (
+                    ", recovered originals"
+                    if report["recovered_from_previous_run"] else ""
+                )
+                + ")"
+            )
+        if self.snapshot_after:
+            self._prepare_snapshots()
+
+    def _prepare_snapshots(self) -> None:
+        """Set up the snapshot manager (emulators or an injected console)."""
+        console = self.snapshot_console
+        if console is None:
+            if not is_emulator(self.adb):
+                print("Snapshots: device is not an emulator, disabled")
+                return
+            console = AdbEmuConsole(self.adb)
+        sections = {step.get("section") for step in self.compiled.get("steps", [])}
+        unknown = [s for s in self.snapshot_after if s not in sections]
+        if unknown:
+            print(f"WARNING: Unknown snapshot sections: {', '.join(unknown)}")
+        app = self.compiled.get("app", "")
+        package = app.get("android", "") if isinstance(app, dict) else app
+        try:
+            self.snapshots = SnapshotManager(
+                console, self.adb, package, self.variables
+            )
+            invalidated = self.snapshots.invalidate_stale()
+        except (EmulatorConsoleError, ADBError) as e:
+            print(f"WARNING: Snapshots disabled: {e}")
+            self.snapshots = None
+            return
+        print(
+            f"Snapshots: {console.avd_name()} after {', '.join(self.snapshot_after)}"
+            + (
+                f" ({len(invalidated)} invalidated by a new app build)"
+                if invalidated else ""
+            )
+        )
+
+    def _snapshot_points(self, steps: list[dict]) -> dict[int, str]:
+        """Positions of the last step of each snapshot section."""
+        points = {}
+        for i, step in enumerate(steps):
+            section = step.get("section", "")
+            is_last = i + 1 == len(steps) or steps[i + 1].get("section") != section
+            if section in self.snapshot_after and is_last:
+                points[i] = section
+        return points
+
+    def _restore_snapshot(self, steps: list[dict], points: dict[int, str]) -> int:
+        """Restore the furthest available snapshot.
+
+        Steps covered by it are recorded as skipped.
+
+        Returns:
+            Position of the first step still to execute.
+        """
+        for position in sorted(points, reverse=True):
+            covered = steps[:position + 1]
+            started = time.monotonic()
+            try:
+                name = self.snapshots.find(covered)
+                if name is None:
+                    continue
+                # The helper IME selection is part of the restored state.
+                self.adb.restore_ime()
+                self.snapshots.restore(name)
+            except (EmulatorConsoleError, ADBError) as e:
+                print(f"WARNING: Snapshot restore failed, running all steps: {e}")
+                return 0
+            if self.hierarchy_port:
+                self.adb.close_hierarchy_server()
+                self.adb.use_hierarchy_server(
+                    self.hierarchy_port, self.server_screenshots
+                )
+            if self.prep is not None:
+                self.prep.reapply()
+
+            for step in covered:
+                step_result = self._new_step_result(step, 0, None)
+                step_result["status"] = "skipped"
+                step_result["execution"]["method"] = "snapshot"
+                step_result["execution"]["snapshot"] = name
+                self.results.append(step_result)
+            duration_ms = int((time.monotonic() - started) * 1000)
+            self._snapshot_run["restored"] = {
+                "name": name,
+                "section": points[position],
+                "skipped_steps": len(covered),
+                "duration_ms": duration_ms,
+            }
+            self._log(
+                f"Restored snapshot {name} (after {points[position]}): "
+                f"{len(covered)} steps skipped in {duration_ms}ms"
+            )
+            self._log("")
+            return position + 1
+        return 0
+
+    def _save_snapshots(
+        self, steps: list[dict], points: dict[int, str], start: int, end: int
+    ) -> None:
+        """Snapshot the sections that ended in steps[start:end]."""
+        for position in sorted(p for p in points if start <= p < end):
+            # Only a state every action actually reached is worth keeping.
+            reached = all(
+                r["status"] == "passed"
+                or r["execution"].get("method") == "snapshot"
+                or (r["action_type"] == "then" and r["status"] != "failed")
+                for r in self.results
+            )
+            if not reached:
+                return
+            covered = steps[:position + 1]
+            ime_active = self.adb.ime_active
+            try:
+                if self.snapshots.find(covered):
+                    continue
+                # Snapshots keep the user's IME: a later run that restores
+                # one has no record of the helper IME to switch back from.
+                self.adb.restore_ime()
+                try:
+                    name = self.snapshots.save(
+                        covered, points[position], self.compiled.get("source", "")
+                    )
+                finally:
+                    if ime_active:
+                        self.adb.activate_ime()
+            except (EmulatorConsoleError, ADBError) as e:
+                print(f"WARNING: Could not save snapshot: {e}")
+                return
+            self._snapshot_run.setdefault("saved", []).append(
+                {"name": name, "section": points[position]}
+            )
+            self._log(f"  -> snapshot {name} saved (after {points[position]})")
+
+    def _record_failures(self, executed: list[dict]) -> None:
+        """Note the sections of the just executed steps that failed.
+
+        A failed replay also fails the sections it replays, and a shard
+        setup replay the section it `leads_to`: the state they lead to was
+        not reached.
+        """
+        for step, step_result in zip(executed, self.results[-len(executed):]):
+            if step_result["status"] != "failed":
+                continue
+            failure = f"step {step_result['index']} failed"
+            sections = [step_result["section"]]
+            if step.get("type") == "replay":
+                sections += [
+                    s.get("section", "")
+                    for s in step.get("compiled", {}).get("expanded_steps", [])
+                ]
+                if step.get("leads_to"):
+                    self._failed_sections.setdefault(
+                        step["leads_to"], f"{step['original']} failed"
+                    )
+            for section in sections:
+                self._failed_sections.setdefault(section, failure)
+
+    def _fail_fast_reason(self, step: dict) -> str | None:
+        """Why the fail-fast policy skips a step, or None to run it."""
+        if self.fail_fast == "off" or not self._failed_sections:
+            return None
+        if self.fail_fast == "abort":
+            section, failure = next(iter(self._failed_sections.items()))
+            return f"Scenario aborted: {failure} in {section}"
+        section = step.get("section", "")
+        if section in self._failed_sections:
+            return f"Section failed: {self._failed_sections[section]}"
+        if self.fail_fast == "dependents":
+            pending = list(self._depends_on.get(section, []))
+            seen = set()
+            while pending:
+                dependency = pending.pop(0)
+                if dependency in seen:
+                    continue
+                seen.add(dependency)
+                if dependency in self._failed_sections:
+                    return (
+                        f"Depends on failed section {dependency} "
+                        f"({self._failed_sections[dependency]})"
+                    )
+                pending.extend(self._depends_on.get(dependency, []))
+        return None
+
+    def _skip_step(self, step: dict, reason: str) -> None:
+        """Record a step skipped by the fail-fast policy."""
+        step_result = self._new_step_result(step, 0, None)
+        step_result["status"] = "skipped"
+        step_result["execution"]["method"] = "fail_fast"
+        step_result["execution"]["reason"] = reason
+        self.results.append(step_result)
+        self._log(
+            f"[{step_result['index']:02d}] {step_result['section']}: "
+            f"{step_result['action']}"
+        )
+        self._log(f"  -> SKIP: {reason}")
+
+    def _cleanup(self) -> None:
+        """Release per-run device state (hierarchy server, device prep)."""
+        self.adb.close_hierarchy_server()
+        try:
+            self.adb.restore_ime()
+        except ADBError as e:
+            print(f"WARNING: Could not restore the input method: {e}")
+        if self.prep is None or not self.restore_device:
+            return
+        try:
+            self.prep.restore()
+        except ADBError as e:
+            print(
+                f"WARNING: Could not restore device settings ({e}); "
+                f"they will be restored on the next --device-prep run"
+            )
 
+    def _run_steps(self) -> dict:
+        """Execute every step into self.output_dir and write result.json."""
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.results = []
+        self.evidence = EvidenceRecorder(
+            self.adb,
+            self.output_dir,
+            self.evidence_level,
+            self.evidence_context,
+        )
+        self.ai_images = self._new_variant_pool()
+        self._ai_image_queue = []
         self.start_time = datetime.now(timezone.utc).isoformat()
         steps = self.compiled.get("steps", [])
 
-        print(f"Running compiled scenario: {self.compiled.get('source', '?')}")
-        print(f"Steps: {len(steps)}, Device: {self.adb.device_serial or 'default'}")
-        print(f"Output: {self.output_dir}")
-        print()
-
-        for step in steps:
-            self._execute_step(step)
+        self._log(f"Running compiled scenario: {self.compiled.get('source', '?')}")
+        self._log(f"Steps: {len(steps)}, Device: {self.adb.device_serial or 'default'}")
+        self._log(f"Output: {self.output_dir}")
+        self._log("")
+
+        self._last_tree = None
+        self._snapshot_run = {}
+        self._failed_sections = {}
+        points = self._snapshot_points(steps) if self.snapshots else {}
+        with self._span("snapshot_restore"):
+            i = self._restore_snapshot(steps, points) if points else 0
+        with self._span("evidence_start"):
+            self.evidence.start()
+        try:
+            while i < len(steps):
+                start = i
+                reason = self._fail_fast_reason(steps[i])
+                if reason:
+                    self._skip_step(steps[i], reason)
+                    i += 1
+                    continue
+                group = (
+                    self._fusable_run(steps, i) if self.fuse_actions else []
+                )
+                if len(group) > 1:
+                    with self._span(
+                        f"fused {group[0].get('index', 0):02d}-"
+                        f"{group[-1].get('index', 0):02d}",
+                        steps=len(group),
+                    ):
+                        self._execute_fused(group)
+                    i += len(group)
+                else:
+                    with self._span(
+                        f"step {steps[i].get('index', 0):02d}",
+                        section=steps[i].get("section", ""),
+                        action=steps[i].get("original", ""),
+                        strategy=steps[i].get("compiled", {}).get("strategy", ""),
+                    ) as span:
+                        self._execute_step(steps[i])
+                        span["status"] = self.results[-1]["status"]
+                    i += 1
+                self._record_failures(steps[start:i])
+                if points:
+                    with self._span("snapshot_save"):
+                        self._save_snapshots(steps, points, start, i)
+            self._finish_uitree_diff()
+        finally:
+            with self._span("evidence_finish"):
+                self.evidence.finish()
+            with self._span("ai_images_finish"):
+                self._finish_ai_images()
 
         end_time = datetime.now(timezone.utc).isoformat()
         result = self._build_result(end_time)
 
         result_path = os.path.join(self.output_dir, "result.json")
-        with open(result_path, "w", encoding="utf-8") as f:
-            json.dump(result, f, ensure_ascii=False, indent=2)
+        with self._span("write_result"):
+            with open(result_path, "w", encoding="utf-8") as f:
+                json.dump(result, f, ensure_ascii=False, indent=2)
+        return result
+
+    def run(self) -> dict:
+        """Execute all compiled steps."""
+        os.makedirs(self.output_dir, exist_ok=True)
+        try:
+            with self._span("prepare"):
+                self._prepare()
+            result = self._run_steps()
+        finally:
+            with self._span("cleanup"):
+                self._cleanup()
+            self._export_trace()
 
         self._print_summary(result)
         return result
 
+    def set_variable_overrides(self, overrides: dict) -> None:
+        """Replace the variable overrides used by the next run."""
+        self.variable_overrides = dict(overrides)
+        self.variables = self._resolve_variables()
+        # uitree_verify matchers interpolate variables.
+        self._matchers = {}
+        if self.snapshots is not None:
+            self.snapshots.variables = self.variables
+
+    def run_each(self, runs: Iterable[tuple[str, dict]]) -> Iterator[dict]:
+        """Run the scenario once per (output dir, variable overrides).
+
+        The device is prepared once for all runs, as in soak mode. Runs
+        are pulled lazily, so `runs` may be fed by a shared work queue.
+        A run that fails with an ADB or runner error yields a result
+        with an `error` instead of stopping the remaining runs.
+
+        Yields:
+            The result.json dict of each run.
+        """
+        base_dir = self.output_dir
+        try:
+            with self._span("prepare"):
+                self._prepare()
+            for output_dir, overrides in runs:
+                self.output_dir = output_dir
+                self.set_variable_overrides(overrides)
+                try:
+                    yield self._run_steps()
+                except (CompiledRunnerError, ADBError) as e:
+                    yield {
+                        "summary": summarize_steps(self.results),
+                        "steps": self.results,
+                        "error": str(e),
+                        "output_dir": output_dir,
+                    }
+        finally:
+            with self._span("cleanup"):
+                self._cleanup()
+            self.output_dir = base_dir
+
+    def run_loop(
+        self,
+        iterations: int | None = None,
+        duration_sec: float | None = None,
+        keep_last: int = 5,
+    ) -> dict:
+        """Run the scenario repeatedly (soak mode).
+
+        Each iteration writes into `iter_NNNNN/` below the output
+        directory. Evidence of failing iterations is always kept; of the
+        passing ones only the last `keep_last` are. A compact line per
+        iteration is appended to `soak.jsonl` and the final summary,
+        including per-step latency trends, is written to `soak.json`.
+        With tracing, each iteration's trace is written to its directory
+        and dropped from memory, so memory use does not grow with the
+        number of iterations.
+
+        Args:
+            iterations: Number of iterations (None = until duration).
+            duration_sec: Stop starting new iterations after this long.
+            keep_last: Passing iterations whose evidence is retained.
+
+        Returns:
+            Soak summary dict.
+        """
+        from soak import SoakMonitor
+
+        if iterations is None and duration_sec is None:
+            raise CompiledRunnerError("Loop mode needs iterations or a duration")
+
+        base_dir = self.output_dir
+        os.makedirs(base_dir, exist_ok=True)
+        jsonl_path = os.path.join(base_dir, "soak.jsonl")
+        monitor = SoakMonitor()
+        kept: deque[str] = deque()
+        loop_start = time.monotonic()
+        iteration = 0
+
+        print(f"Soak: {self.compiled.get('source', '?')} -> {base_dir}")
+        try:
+            with self._span("prepare"):
+                self._prepare()
+            with open(jsonl_path, "a", encoding="utf-8") as jsonl:
+                while iterations is None or iteration < iterations:
+                    elapsed = time.monotonic() - loop_start
+                    if duration_sec is not None and elapsed >= duration_sec:
+                        break
+                    iteration += 1
+                    self.output_dir = os.path.join(
+                        base_dir, f"iter_{iteration:05d}"
+                    )
+                    iter_start = time.monotonic()
+                    with self._span(f"iteration {iteration}"):
+                        result = self._run_steps()
+                    if self._owns_tracer:
+                        self.tracer.export(
+                            os.path.join(self.output_dir, "trace.json")
+                        )
+                        self.tracer.clear()
+                    duration_ms = int((time.monotonic() - iter_start) * 1000)
+
+                    line = monitor.add(iteration, result, duration_ms)
+                    failed = result["summary"]["failed"] > 0
+                    if not failed:
+                        kept.append(self.output_dir)
+                        while len(kept) > keep_last:
+                            shutil.rmtree(kept.popleft(), ignore_errors=True)
+                    jsonl.write(json.dumps(line, ensure_ascii=False) + "\n")
+                    jsonl.flush()
+
+                    s = result["summary"]
+                    print(
+                        f"iter {iteration:05d}: {s['passed']}/{s['total_steps']} "
+                        f"passed, {s['failed']} failed, "
+                        f"{s['ai_required']} ai_required, "
+                        f"{duration_ms / 1000:.1f}s"
+                        + (" FAIL" if failed else "")
+                    )
+        except KeyboardInterrupt:
+            print("Soak interrupted")
+        finally:
+            with self._span("cleanup"):
+                self._cleanup()
+            self.output_dir = base_dir
+            self._export_trace()
+
+        summary = {
+            "scenario": Path(self.compiled.get("source", "")).stem,
+            "device": {
+                "serial": self.adb.device_serial or "default",
+                "model": self.device_model,
+            },
+            **monitor.describe(),
+            "degrading_steps": [
+                {"index": idx, "trend_ms_per_iteration": round(slope, 3)}
+                for idx, slope in monitor.degrading_steps()
+            ],
+            "output_dir": base_dir,
+        }
+        with open(os.path.join(base_dir, "soak.json"), "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+
+        trend = summary["iteration_latency"]
+        print()
+        print(
+            f"Soak complete: {summary['iterations']} iterations, "
+            f"{summary['failed_iterations']} failed, "
+            f"mean {trend['mean_ms'] / 1000:.1f}s/iteration, "
+            f"trend {trend['trend_ms_per_iteration']:+.1f} ms/iteration"
+        )
+        for item in summary["degrading_steps"][:5]:
+            print(
+                f"  step {item['index']:02d} slowing by "
+                f"{item['trend_ms_per_iteration']:+.1f} ms/iteration"
+            )
+        return summary
+
+    def _log(self, message: str) -> None:
+        """Print per-step progress (suppressed when not verbose)."""
+        if self.verbose:
+            print(message)
+
+    def _span(self, name: str, **args):
+        """Trace span context manager (a no-op when not tracing)."""
+        if self.track is None:
+            return nullcontext(args)
+        return self.track.span(name, **args)
+
+    def _parse(self, xml_content: str) -> ET.Element:
+        """Parse a UITree dump (traced, as it happens several times a step)."""
+        with self._span("parse_uitree", bytes=len(xml_content)):
+            return parse_uitree(xml_content)
+
+    def _export_trace(self) -> None:
+        """Write the trace of this runner's own tracer."""
+        if not self._owns_tracer:
+            return
+        path = self.tracer.export(
+            self.trace_path or os.path.join(self.output_dir, "trace.json")
+        )
+        print(f"Trace: {path} (open in https://ui.perfetto.dev or chrome://tracing)")
+
+    def _load_tuning(self) -> None:
+        """Load wait/timeout overrides learned from run history."""
+        from history import RunHistory
+        from tuning import TuningProfile
+
+        scenario = Path(self.compiled.get("source", "")).stem
+        with RunHistory(self.tuning_db) as history:
+            self.tuning = TuningProfile.from_history(
+                history, scenario, self.device_model
+            )
+        self.adb.timeouts.update(self.tuning.timeouts)
+        print(
+            f"Tuning: {len(self.tuning.wait_history)} steps with history, "
+            f"{len(self.tuning.timeouts)} timeout overrides "
+            f"({self.device_model or 'unknown model'})"
+        )
+
+    def _step_wait(self, step: dict) -> tuple[float, dict | None]:
+        """Return the wait to apply after a step and any tuning override."""
+        wait_sec = step.get("wait", 0)
+        wait_override = (
+            self.tuning.wait_for(step.get("index", 0), wait_sec)
+            if self.tuning
+            else None
+        )
+        if wait_override:
+            wait_sec = wait_override["applied"]
+        return wait_sec, wait_override
+
+    def _new_step_result(
+        self, step: dict, wait_sec: float, wait_override: dict | None
+    ) -> dict:
+        """Create the initial result record for a step."""
+        step_result = {
+            "index": step.get("index", 0),
+            "section": step.get("section", ""),
+            "action_type": step.get("type", ""),
+            "action": step.get("original", ""),
+            "strict": step.get("strict", False),
+            "status": "passed",
+            "execution": {
+                "method": "compiled",
+                "strategy": step.get("compiled", {}).get("strategy", ""),
+                "wait_sec": wait_sec,
+            },
+            "evidence": {},
+        }
+        if wait_override:
+            step_result["execution"]["tuning"] = {"wait": wait_override}
+        return step_result
+
+    def _print_status(self, step_result: dict, label: str) -> None:
+        status_icon = {
+            "passed": "OK",
+            "skipped": "SKIP",
+            "failed": "FAIL",
+            "ai_required": "AI",
+        }.get(step_result["status"], "?")
+        self._log(f"  -> {status_icon} ({label})")
+
     def _execute_step(self, step: dict) -> None:
         """Execute a single compiled step."""
         idx = step.get("index", 0)
@@ -151,79 +924,334 @@ class CompiledRunner:
         original = step.get("original", "")
         compiled = step.get("compiled", {})
         strategy = compiled.get("strategy", "")
-        wait_sec = step.get("wait", 0)
+        wait_sec, wait_override = self._step_wait(step)
 
         prefix = f"[{idx:02d}] {section}"
-        print(f"{prefix}: {original}")
+        self._log(f"{prefix}: {original}")
+        step_start = time.monotonic()
 
-        step_result = {
-            "index": idx,
-            "section": section,
-            "action_type": step_type,
-            "action": original,
-            "strict": step.get("strict", False),
-            "status": "passed",
-            "execution": {"method": "compiled", "strategy": strategy},
-            "evidence": {},
-        }
+        step_result = self._new_step_result(step, wait_sec, wait_override)
+        xml_content = ""
 
         try:
             # Capture before screenshot
-            before_path = os.path.join(
-                self.output_dir, f"step_{idx:02d}_before.png"
-            )
-            self.adb.screenshot(before_path)
-            step_result["evidence"]["screenshot_before"] = os.path.basename(
-                before_path
-            )
+            with self._span("screenshot_before"):
+                self.evidence.screenshot(step_result, "before")
 
             # Capture UITree
-            uitree_path = os.path.join(
-                self.output_dir, f"step_{idx:02d}_uitree.xml"
-            )
-            xml_content = self.adb.save_uitree(uitree_path)
-            step_result["evidence"]["uitree"] = os.path.basename(uitree_path)
+            with self._span("dump_uitree"):
+                xml_content = self.adb.dump_uitree()
+            with self._span("evidence_uitree"):
+                self.evidence.uitree(step_result, xml_content)
+            with self._span("uitree_diff"):
+                self._record_uitree_diff(step_result, xml_content)
 
             # Execute strategy
-            if step_type == "do":
-                self._execute_do(compiled, xml_content, step_result)
-            elif step_type == "then":
-                self._execute_then(compiled, xml_content, step_result)
-            elif step_type == "replay":
-                self._execute_replay(compiled, step_result)
+            with self._span("execute", strategy=strategy):
+                if step_type == "do":
+                    self._execute_do(compiled, xml_content, step_result)
+                elif step_type == "then":
+                    self._execute_then(compiled, xml_content, step_result)
+                elif step_type == "replay":
+                    self._execute_replay(compiled, step_result)
+            if step_result["status"] == "ai_required":
+                with self._span("compact_uitree"):
+                    self._record_compact_uitree(step_result, xml_content)
 
             # Wait if specified
             if wait_sec > 0:
-                self.adb.wait(wait_sec)
+                with self._span("wait", seconds=wait_sec):
+                    self.adb.wait(wait_sec)
 
             # Capture after screenshot
-            after_path = os.path.join(
-                self.output_dir, f"step_{idx:02d}_after.png"
-            )
-            self.adb.screenshot(after_path)
-            step_result["evidence"]["screenshot_after"] = os.path.basename(
-                after_path
-            )
+            with self._span("screenshot_after"):
+                self.evidence.screenshot(step_result, "after")
 
-            status_icon = {
-                "passed": "OK",
-                "skipped": "SKIP",
-                "failed": "FAIL",
-                "ai_required": "AI",
-            }.get(step_result["status"], "?")
-            print(f"  -> {status_icon} ({strategy})")
+            self._print_status(step_result, strategy)
 
         except ADBError as e:
             step_result["status"] = "failed"
             step_result["execution"]["error"] = str(e)
-            print(f"  -> FAIL: {e}")
+            self._log(f"  -> FAIL: {e}")
         except Exception as e:
             step_result["status"] = "failed"
             step_result["execution"]["error"] = str(e)
-            print(f"  -> ERROR: {e}")
+            self._log(f"  -> ERROR: {e}")
 
+        step_result["execution"]["duration_ms"] = int(
+            (time.monotonic() - step_start) * 1000
+        )
+        with self._span("evidence_flush"):
+            self.evidence.finish_step(step_result)
+        if step_result["status"] == "ai_required" and self.ai_images:
+            with self._span("ai_images_queue"):
+                self._queue_ai_images(step_result, compiled, xml_content)
         self.results.append(step_result)
 
+    def _record_compact_uitree(self, step_result: dict, xml_content: str) -> None:
+        """Write the pruned UITree the AI evaluator reads for this step."""
+        compact = compact_uitree(self._parse(xml_content), self.ai_uitree_budget)
+        self.evidence.text(
+            step_result,
+            "uitree_compact",
+            f"step_{step_result['index']:02d}_uitree_compact.txt",
+            compact.text,
+        )
+        raw_bytes = len(xml_content.encode("utf-8"))
+        compact_bytes = len(compact.text.encode("utf-8"))
+        step_result["uitree_compact"] = {
+            "raw_bytes": raw_bytes,
+            "compact_bytes": compact_bytes,
+            "reduction_pct": (
+                round((1 - compact_bytes / raw_bytes) * 100, 1) if raw_bytes else 0
+            ),
+            "nodes": compact.total_nodes,
+            "kept_nodes": compact.kept_nodes,
+            "omitted_nodes": compact.omitted_nodes,
+            "estimated_tokens": compact.estimated_tokens,
+        }
+
+    def _new_variant_pool(self) -> VariantPool | None:
+        """Pool for the AI screenshot variants of this run, if enabled."""
+        if self.ai_image_edge <= 0 or self.evidence_level == "none":
+            return None
+        pool = VariantPool(self.output_dir, self.ai_image_edge, self.ai_image_format)
+        if not pool.available:
+            self._log(
+                "WARNING: Neither Pillow nor ffmpeg is available; "
+                "AI screenshot variants are not written"
+            )
+            return None
+        return pool
+
+    def _ai_crop(
+        self, step_result: dict, compiled: dict, xml_content: str
+    ) -> tuple | None:
+        """Crop box of the region the AI evaluator should focus on.
+
+        The resolved target element, else the compile-time element
+        bounds, else the largest scrollable container of the UITree.
+        """
+        if not self.ai_image_crop or not xml_content:
+            return None
+        try:
+            root = self._parse(xml_content)
+        except ET.ParseError:
+            return None
+        screen_node = root.find("node")
+        if screen_node is None:
+            return None
+        try:
+            _, _, width, height = parse_bounds(screen_node.get("bounds", ""))
+        except ValueError:
+            return None
+        candidates = [
+            ("target_element", (step_result.get("target_element") or {}).get("bounds")),
+            ("element_metadata", (compiled.get("element_metadata") or {}).get("bounds")),
+            ("scroll_container", largest_scroll_container(root)),
+        ]
+        for source, bounds in candidates:
+            box = crop_region(bounds, (width, height)) if bounds else None
+            if box:
+                step_result["ai_image_crop"] = {"source": source, "box": list(box)}
+                return box
+        return None
+
+    def _queue_ai_images(
+        self, step_result: dict, compiled: dict, xml_content: str
+    ) -> None:
+        """Generate the AI screenshot variants of a step in the background.
+
+        Screenshots of `video` evidence only exist once the recording has
+        been processed, so those steps are queued until the run ends.
+        """
+        crop = self._ai_crop(step_result, compiled, xml_content)
+        if self.evidence_level == "video":
+            self._ai_image_queue.append((step_result, crop))
+            return
+        for phase in ("before", "after"):
+            self.ai_images.submit(step_result, f"screenshot_{phase}", crop)
+
+    def _finish_ai_images(self) -> None:
+        """Wait for the AI screenshot variants and reference them."""
+        if not self.ai_images:
+            return
+        for step_result, crop in self._ai_image_queue:
+            for phase in ("before", "after"):
+                self.ai_images.submit(step_result, f"screenshot_{phase}", crop)
+        self._ai_image_queue = []
+        self.ai_images.finish()
+
+    def _record_uitree_diff(self, step_result: dict, xml_content: str) -> None:
+        """Record the previous step's before/after diff from this dump.
+
+        The UITree dumped at the start of a step is the state the
+        previous step left behind, so it doubles as that step's "after"
+        tree without an extra dump.
+        """
+        if not self.uitree_diff:
+            return
+        try:
+            tree = hash_tree(self._parse(xml_content))
+        except ET.ParseError:
+            self._last_tree = None
+            return
+        if self._last_tree is not None:
+            previous, previous_tree = self._last_tree
+            previous["uitree_diff"] = summarize_diff(previous_tree, tree)
+        self._last_tree = (step_result, tree)
+
+    def _finish_uitree_diff(self) -> None:
+        """Dump the final UITree to diff the last dumped step."""
+        if not self.uitree_diff or self._last_tree is None:
+            return
+        try:
+            self._record_uitree_diff(self._last_tree[0], self.adb.dump_uitree())
+        except ADBError as e:
+            self._log(f"WARNING: Final UITree dump failed: {e}")
+        self._last_tree = None
+
+    def _fused_command(self, step: dict) -> list[str] | None:
+        """Device shell command for a fusable step, or None if not fusable.
+
+        Fusable steps are `do` actions that never observe the screen:
+        key events, fixed scrolls, short waits and (with fuse_taps) taps
+        at the element bounds recorded at compile time.
+        """
+        if step.get("type") != "do":
+            return None
+        wait_sec, _ = self._step_wait(step)
+        if wait_sec > self.max_fused_wait:
+            return None
+
+        compiled = step.get("compiled", {})
+        strategy = compiled.get("strategy", "")
+        if strategy == "keyevent":
+            return self.adb.keyevent_command(compiled.get("keycode", 4))
+        if strategy == "scroll_fixed":
+            if compiled.get("direction", "down") not in SCROLL_DIRECTIONS:
+                # Run alone, so only this step fails.
+                return None
+            return self.adb.scroll_command(
+                compiled.get("direction", "down"),
+                compiled.get("distance", 500),
+                compiled.get("duration_ms", 300),
+            )
+        if strategy == "wait":
+            duration = compiled.get("duration_sec", 1)
+            if duration > self.max_fused_wait:
+                return None
+            return ["sleep", str(duration)]
+        if self.fuse_taps and strategy in ("tap_by_text", "tap_by_resource_id"):
+            bounds = (compiled.get("element_metadata") or {}).get("bounds")
+            if bounds:
+                try:
+                    x, y = get_center(bounds)
+                except ValueError:
+                    return None
+                return self.adb.tap_command(x, y)
+        return None
+
+    def _fusable_run(self, steps: list[dict], start: int) -> list[dict]:
+        """Return the run of consecutive fusable steps beginning at start."""
+        group = []
+        for step in steps[start:]:
+            if self._fused_command(step) is None or self._fail_fast_reason(step):
+                break
+            group.append(step)
+        return group
+
+    def _execute_fused(self, group: list[dict]) -> None:
+        """Execute consecutive non-observing steps as one device script.
+
+        Evidence is captured once for the whole group: the before
+        screenshot on the first step and the after screenshot on the
+        last. Per-step timing and status come from device timestamps.
+        """
+        first_idx = group[0].get("index", 0)
+        last_idx = group[-1].get("index", 0)
+        # No UITree is dumped inside a group; a diff would span it.
+        self._last_tree = None
+        results = []
+        commands: list[list[str]] = []
+        owners: list[int] = []
+        for position, step in enumerate(group):
+            wait_sec, wait_override = self._step_wait(step)
+            step_result = self._new_step_result(step, wait_sec, wait_override)
+            step_result["execution"]["fused"] = {
+                "group": [first_idx, last_idx],
+                "position": position + 1,
+                "size": len(group),
+            }
+            compiled = step.get("compiled", {})
+            if compiled.get("strategy", "").startswith("tap_by_"):
+                bounds = compiled["element_metadata"]["bounds"]
+                step_result["target_element"] = {
+                    "bounds": bounds,
+                    "center": list(get_center(bounds)),
+                    "source": "element_metadata",
+                }
+            results.append(step_result)
+            commands.append(self._fused_command(step))
+            owners.append(position)
+            if wait_sec > 0:
+                commands.append(["sleep", str(wait_sec)])
+                owners.append(position)
+
+        group_start = time.monotonic()
+
+        try:
+            self.evidence.screenshot(results[0], "before")
+
+            records = self.adb.run_script(commands)
+
+            spans: dict[int, list[int | None]] = {}
+            for owner, record in zip(owners, records):
+                step_result = results[owner]
+                span = spans.setdefault(owner, [None, None])
+                if span[0] is None:
+                    span[0] = record["start_ns"]
+                span[1] = record["end_ns"]
+                if not record["executed"]:
+                    step_result["status"] = "failed"
+                    step_result["execution"]["error"] = (
+                        "Not executed: fused script stopped early"
+                    )
+                elif record["returncode"] != 0:
+                    step_result["status"] = "failed"
+                    step_result["execution"]["error"] = (
+                        f"Command exited with {record['returncode']}"
+                    )
+
+            host_ms = int((time.monotonic() - group_start) * 1000)
+            for owner, step_result in enumerate(results):
+                start_ns, end_ns = spans.get(owner, [None, None])
+                if start_ns is not None and end_ns is not None:
+                    duration_ms = (end_ns - start_ns) // 1_000_000
+                else:
+                    duration_ms = host_ms // len(results)
+                step_result["execution"]["duration_ms"] = duration_ms
+
+            self.evidence.screenshot(results[-1], "after")
+        except ADBError as e:
+            host_ms = int((time.monotonic() - group_start) * 1000)
+            for step_result in results:
+                step_result["status"] = "failed"
+                step_result["execution"]["error"] = str(e)
+                step_result["execution"].setdefault(
+                    "duration_ms", host_ms // len(results)
+                )
+
+        for step_result in results:
+            self._log(
+                f"[{step_result['index']:02d}] {step_result['section']}: "
+                f"{step_result['action']}"
+            )
+            label = f"{step_result['execution']['strategy']}, fused"
+            self._print_status(step_result, label)
+            self.evidence.finish_step(step_result)
+            self.results.append(step_result)
+
     def _execute_do(
         self, compiled: dict, xml_content: str, step_result: dict
     ) -> None:
@@ -232,7 +1260,7 @@ class CompiledRunner:
 
         if strategy == "app_launch":
             package = self._interpolate(compiled["package"])
-            self.adb.launch_app(package)
+            step_result["launch"] = self.adb.launch_app(package)
 
         elif strategy == "app_stop":
             package = self._interpolate(compiled["package"])
@@ -241,13 +1269,13 @@ class CompiledRunner:
         elif strategy == "app_restart":
             package = self._interpolate(compiled["package"])
             self.adb.stop_app(package)
-            self.adb.wait(1)
-            self.adb.launch_app(package)
+            step_result["launch"] = self.adb.launch_app(package)
 
         elif strategy == "tap_by_text":
-            root = parse_uitree(xml_content)
+            root = self._parse(xml_content)
             search_text = self._interpolate(compiled.get("search_text", ""))
-            elem = resolve_element(root, compiled)
+            with self._span("resolve"):
+                elem = resolve_element(root, compiled)
             if elem:
                 self.adb.tap(elem.center_x, elem.center_y)
                 step_result["target_element"] = {
@@ -263,8 +1291,9 @@ class CompiledRunner:
                 )
 
         elif strategy == "tap_by_resource_id":
-            root = parse_uitree(xml_content)
-            elem = resolve_element(root, compiled)
+            root = self._parse(xml_content)
+            with self._span("resolve"):
+                elem = resolve_element(root, compiled)
             if elem:
                 self.adb.tap(elem.center_x, elem.center_y)
                 step_result["target_element"] = {
@@ -281,27 +1310,30 @@ class CompiledRunner:
                 )
 
         elif strategy == "text_input":
-            root = parse_uitree(xml_content)
+            root = self._parse(xml_content)
             input_text = self._interpolate(compiled.get("input_text", ""))
             field_hint = self._interpolate(compiled.get("field_hint", ""))
 
             # Try to find the EditText
             metadata = compiled.get("element_metadata")
             elem = None
-            if metadata and metadata.get("resource_id"):
-                from utils.uitree_parser import find_by_resource_id
-                elem = find_by_resource_id(root, metadata["resource_id"])
-            if not elem:
-                elem = find_edit_text(root, field_hint)
+            with self._span("resolve"):
+                if metadata and metadata.get("resource_id"):
+                    from utils.uitree_parser import find_by_resource_id
+                    elem = find_by_resource_id(root, metadata["resource_id"])
+                if not elem:
+                    elem = find_edit_text(root, field_hint)
 
             if elem:
+                # Switch IME before focusing so the field binds to it
+                if self.adb.text_input_method(input_text) == "ime":
+                    self.adb.activate_ime()
                 self.adb.tap(elem.center_x, elem.center_y)
                 self.adb.wait(0.3)
-                # Clear existing text
-                self.adb.keyevent(123)  # MOVE_END
-                for _ in range(100):
-                    self.adb.keyevent(67)  # DEL
-                self.adb.input_text(input_text)
+                self.adb.clear_text()
+                step_result["execution"]["text_input"] = self.adb.input_text(
+                    input_text
+                )
             else:
                 step_result["status"] = "ai_required"
                 step_result["execution"]["error"] = (
@@ -315,7 +1347,7 @@ class CompiledRunner:
             self.adb.scroll(direction, distance, duration_ms)
 
         elif strategy == "scroll_to_find":
-            root = parse_uitree(xml_content)
+            root = self._parse(xml_content)
             search_text = self._interpolate(
                 compiled.get("search_text", "")
             )
@@ -330,7 +1362,7 @@ class CompiledRunner:
                 self.adb.scroll(direction, distance, duration_ms)
                 self.adb.wait(0.5)
                 xml_content = self.adb.dump_uitree()
-                root = parse_uitree(xml_content)
+                root = self._parse(xml_content)
                 found = text_exists(root, search_text)
                 attempts += 1
 
@@ -372,7 +1404,7 @@ class CompiledRunner:
         strategy = compiled.get("strategy", "")
 
         if strategy == "strict_text_match":
-            root = parse_uitree(xml_content)
+            root = self._parse(xml_content)
             search_text = self._interpolate(
                 compiled.get("search_text", "")
             )
@@ -411,48 +1443,19 @@ class CompiledRunner:
                     }
 
         elif strategy == "uitree_verify":
-            root = parse_uitree(xml_content)
-            checks = compiled.get("checks", [])
             fallback_to_ai = compiled.get("fallback_to_ai", False)
-            check_results = []
-            all_passed = True
-
-            for check in checks:
-                check_type = check.get("type", "")
-                check_passed = False
-
-                if check_type == "text_visible":
-                    value = self._interpolate(check.get("value", ""))
-                    match_type = check.get("match_type", "exact")
-                    check_passed = text_exists(root, value, match_type)
-
-                elif check_type == "text_not_visible":
-                    value = self._interpolate(check.get("value", ""))
-                    match_type = check.get("match_type", "exact")
-                    check_passed = not text_exists(root, value, match_type)
-
-                elif check_type == "resource_id_exists":
-                    value = check.get("value", "")
-                    check_passed = resource_id_exists(root, value)
-
-                elif check_type == "class_exists":
-                    value = check.get("value", "")
-                    check_passed = class_exists(root, value)
-
-                elif check_type == "element_count_gte":
-                    selector = check.get("selector", {})
-                    min_count = check.get("min_count", 1)
-                    actual = count_elements(root, selector)
-                    check_passed = actual >= min_count
-
-                check_results.append({
-                    "type": check_type,
-                    "passed": check_passed,
-                    "detail": check,
-                })
-
-                if not check_passed:
-                    all_passed = False
+            try:
+                matcher = self._check_matcher(step_result["index"], compiled)
+            except SelectorError as e:
+                step_result["status"] = "failed"
+                step_result["verification"] = {
+                    "method": "uitree_verify",
+                    "result": "failed",
+                    "reason": f"Invalid check: {e}",
+                }
+                return
+            check_results = matcher.evaluate(self._parse(xml_content))
+            all_passed = all(c["passed"] for c in check_results)
 
             if all_passed:
                 step_result["verification"] = {
@@ -517,7 +1520,7 @@ class CompiledRunner:
             sub_strategy = sub_compiled.get("strategy", "")
 
             xml_content = self.adb.dump_uitree()
-            sub_result = {"status": "passed"}
+            sub_result = {"status": "passed", "execution": {}}
             self._execute_do(sub_compiled, xml_content, sub_result)
 
             replayed.append({
@@ -525,6 +1528,8 @@ class CompiledRunner:
                 "do": sub_step.get("original", ""),
                 "status": sub_result["status"],
             })
+            if "launch" in sub_result:
+                replayed[-1]["launch"] = sub_result["launch"]
 
         step_result["replayed_steps"] = replayed
         if any(r["status"] != "passed" for r in replayed):
@@ -532,15 +1537,7 @@ class CompiledRunner:
 
     def _build_result(self, end_time: str) -> dict:
         """Build the final result.json."""
-        passed = sum(1 for r in self.results if r["status"] == "passed")
-        failed = sum(1 for r in self.results if r["status"] == "failed")
-        skipped = sum(1 for r in self.results if r["status"] == "skipped")
-        ai_required = sum(
-            1 for r in self.results if r["status"] == "ai_required"
-        )
-        total = len(self.results)
-
-        return {
+        result = {
             "scenario": {
                 "name": Path(self.compiled.get("source", "")).stem,
                 "file": self.compiled.get("source", ""),
@@ -549,24 +1546,58 @@ class CompiledRunner:
             },
             "device": {
                 "serial": self.adb.device_serial or "default",
+                "model": self.device_model,
                 "screen_size": f"{self.adb.screen_width}x{self.adb.screen_height}",
             },
             "execution": {
                 "start_time": self.start_time,
                 "end_time": end_time,
                 "mode": "compiled",
+                "evidence_level": self.evidence_level,
+                "fail_fast": self.fail_fast,
+                "uitree_source": (
+                    "hierarchy_server"
+                    if "hierarchy dump" in self.adb.latencies
+                    else "uiautomator"
+                ),
             },
-            "summary": {
-                "total_steps": total,
-                "passed": passed,
-                "failed": failed,
-                "skipped": skipped,
-                "ai_required": ai_required,
-                "pass_rate": round(passed / total * 100, 1) if total > 0 else 0,
-            },
+            "summary": summarize_steps(self.results),
             "steps": self.results,
+            "adb_latency": self.adb.latency_stats(),
             "output_dir": self.output_dir,
         }
+        if self.tuning:
+            result["tuning"] = {
+                **self.tuning.describe(),
+                "source": self.tuning_db,
+                "wait_overrides": sum(
+                    1 for r in self.results
+                    if "tuning" in r["execution"]
+                ),
+            }
+        if self._failed_sections and self.fail_fast != "off":
+            result["fail_fast"] = {
+                "policy": self.fail_fast,
+                "failed_sections": list(self._failed_sections),
+                "skipped_steps": sum(
+                    1 for r in self.results
+                    if r["execution"].get("method") == "fail_fast"
+                ),
+            }
+        if self.snapshots is not None:
+            result["snapshots"] = {
+                "avd": self.snapshots.console.avd_name(),
+                "build": self.snapshots.build,
+                "sections": self.snapshot_after,
+                "invalidated": self.snapshots.invalidated,
+                **self._snapshot_run,
+            }
+        if self.prep is not None:
+            result["device_prep"] = {
+                **self.prep.report,
+                "restore": "on_exit" if self.restore_device else "disabled",
+            }
+        return result
 
     def _print_summary(self, result: dict) -> None:
         """Print execution summary."""
@@ -582,10 +1613,46 @@ class CompiledRunner:
         print(f"Skipped:      {summary['skipped']}")
         print(f"AI Required:  {summary['ai_required']}")
         print(f"Pass Rate:    {summary['pass_rate']}%")
+        if "fail_fast" in result:
+            fail_fast = result["fail_fast"]
+            print(
+                f"Fail-fast:    {fail_fast['skipped_steps']} steps skipped "
+                f"({fail_fast['policy']})"
+            )
         print()
         print(f"Results: {os.path.join(self.output_dir, 'result.json')}")
 
 
+def recompile(compiled_path: str, result_dir: str | None = None) -> None:
+    """Recompile a compiled.json in place from its source YAML."""
+    from compiler import CompilerError, compile_file, describe
+
+    if not os.path.exists(compiled_path):
+        raise CompiledRunnerError(f"Compiled file not found: {compiled_path}")
+    with open(compiled_path, "r", encoding="utf-8") as f:
+        source = json.load(f).get("source", "")
+    if not source:
+        raise CompiledRunnerError(f"No source YAML recorded in {compiled_path}")
+    if not os.path.exists(source):
+        # Fall back to a source path relative to the compiled file.
+        relative = os.path.join(os.path.dirname(compiled_path), source)
+        if not os.path.exists(relative):
+            raise CompiledRunnerError(f"Source YAML not found: {source}")
+        source = relative
+
+    try:
+        outcome = compile_file(source, result_dir, compiled_path)
+    except CompilerError as e:
+        raise CompiledRunnerError(f"Recompile failed: {e}") from e
+    stats = describe(outcome.compiled)
+    rebuilt = ", ".join(outcome.rebuilt) or "none"
+    print(
+        f"Recompiled {source}: {stats['total_steps']} steps, "
+        f"{stats['ai_checkpoints']} AI, rebuilt sections: {rebuilt}"
+        + ("" if outcome.changed else " (unchanged)")
+    )
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(
         description="Execute a compiled uiai scenario"
@@ -611,7 +1678,171 @@ def main() -> None:
         default=[],
         help="Override variable (KEY=VALUE, repeatable)",
     )
+    parser.add_argument(
+        "--recompile",
+        action="store_true",
+        help="Recompile from the source YAML before running",
+    )
+    parser.add_argument(
+        "--result-dir",
+        help="With --recompile, AI run result directory to compile from",
+    )
+    parser.add_argument(
+        "--history-db",
+        help="Ingest result.json into this run history database",
+    )
+    parser.add_argument(
+        "--tune-from",
+        help="Tune waits and ADB timeouts from this run history database",
+    )
+    parser.add_argument(
+        "--fuse-actions",
+        action="store_true",
+        help="Batch consecutive non-observing actions into one device script",
+    )
+    parser.add_argument(
+        "--fuse-taps",
+        action="store_true",
+        help="Also fuse taps at compile-time element bounds",
+    )
+    parser.add_argument(
+        "--hierarchy-server",
+        type=int,
+        nargs="?",
+        const=DEFAULT_DEVICE_PORT,
+        metavar="PORT",
+        help="Dump UITrees via a persistent on-device hierarchy server",
+    )
+    parser.add_argument(
+        "--server-screenshots",
+        action="store_true",
+        help="Also take compressed screenshots via the hierarchy server",
+    )
+    parser.add_argument(
+        "--loop", type=int, help="Soak mode: number of iterations"
+    )
+    parser.add_argument(
+        "--loop-duration",
+        type=float,
+        help="Soak mode: keep iterating for this many seconds",
+    )
+    parser.add_argument(
+        "--keep-last",
+        type=int,
+        default=5,
+        help="Soak mode: passing iterations whose evidence is kept",
+    )
+    parser.add_argument(
+        "--verbose",
+        action="store_true",
+        help="Soak mode: also print per-step progress",
+    )
+    parser.add_argument(
+        "--evidence",
+        choices=EVIDENCE_LEVELS,
+        default="all",
+        help=(
+            "Evidence to write: all, failures (ring buffer), none, "
+            "or video (background screenrecord)"
+        ),
+    )
+    parser.add_argument(
+        "--evidence-context",
+        type=int,
+        default=3,
+        help="With --evidence failures, preceding steps written as context",
+    )
+    parser.add_argument(
+        "--device-prep",
+        nargs="?",
+        const="all",
+        metavar="ITEMS",
+        help=(
+            "Prepare the device before running "
+            "(comma-separated: animations,stay_awake,keyguard; default: all)"
+        ),
+    )
+    parser.add_argument(
+        "--keep-device-prep",
+        action="store_true",
+        help="Do not restore the original device settings after the run",
+    )
+    parser.add_argument(
+        "--text-input",
+        choices=TEXT_INPUT_MODES,
+        default="auto",
+        help=(
+            "Text entry: auto (helper IME broadcast for non-ASCII or long "
+            "text when installed), input (adb input text) or ime"
+        ),
+    )
+    parser.add_argument(
+        "--ai-uitree-budget",
+        type=int,
+        metavar="TOKENS",
+        help="Token budget of the compact UITree for ai_required steps",
+    )
+    parser.add_argument(
+        "--ai-image-edge",
+        type=int,
+        default=1024,
+        metavar="PX",
+        help=(
+            "Long edge of the downscaled screenshot variants for "
+            "ai_required steps (0 disables them)"
+        ),
+    )
+    parser.add_argument(
+        "--ai-image-format",
+        choices=IMAGE_FORMATS,
+        default="jpeg",
+        help="Encoding of the AI screenshot variants",
+    )
+    parser.add_argument(
+        "--ai-image-crop",
+        action="store_true",
+        help=(
+            "Also write AI screenshot variants cropped to the target "
+            "element (or the main scrollable list)"
+        ),
+    )
+    parser.add_argument(
+        "--trace",
+        nargs="?",
+        const="",
+        metavar="PATH",
+        help=(
+            "Write a Chrome trace-event timeline of the run "
+            "(default: <output-dir>/trace.json; soak mode writes one per "
+            "iteration directory)"
+        ),
+    )
+    parser.add_argument(
+        "--fail-fast",
+        choices=FAIL_FAST_POLICIES,
+        help=(
+            "After a failed step: off (run every step), abort, section "
+            "(skip the rest of the section) or dependents (also skip "
+            "sections that depend on it; default: config.fail_fast or off)"
+        ),
+    )
+    parser.add_argument(
+        "--snapshot-after",
+        action="append",
+        default=[],
+        metavar="SECTION",
+        help=(
+            "Emulators only: snapshot the state after this section and "
+            "restore it on later runs (repeatable)"
+        ),
+    )
+    parser.add_argument(
+        "--no-uitree-diff",
+        action="store_true",
+        help="Do not record structural UITree diffs per step",
+    )
     args = parser.parse_args()
+    loop_mode = args.loop is not None or args.loop_duration is not None
 
     var_overrides = {}
     for v in args.variables:
@@ -619,16 +1850,68 @@ def main() -> None:
             key, val = v.split("=", 1)
             var_overrides[key] = val
 
-    runner = CompiledRunner(
-        compiled_path=args.compiled_json,
-        device=args.device,
-        output_dir=args.output_dir,
-        skip_ai=args.skip_ai,
-        variable_overrides=var_overrides,
-    )
+    if args.result_dir and not args.recompile:
+        parser.error("--result-dir requires --recompile")
+    if args.recompile:
+        try:
+            recompile(args.compiled_json, args.result_dir)
+        except CompiledRunnerError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(2)
+
+    try:
+        device_prep = (
+            parse_prep_items(args.device_prep) if args.device_prep else None
+        )
+    except ValueError as e:
+        parser.error(str(e))
+
+    try:
+        runner = CompiledRunner(
+            compiled_path=args.compiled_json,
+            device=args.device,
+            output_dir=args.output_dir,
+            skip_ai=args.skip_ai,
+            variable_overrides=var_overrides,
+            tuning_db=args.tune_from,
+            fuse_actions=args.fuse_actions,
+            fuse_taps=args.fuse_taps,
+            hierarchy_port=args.hierarchy_server,
+            server_screenshots=args.server_screenshots,
+            verbose=args.verbose or not loop_mode,
+            evidence_level=args.evidence,
+            evidence_context=args.evidence_context,
+            uitree_diff=not args.no_uitree_diff,
+            device_prep=device_prep,
+            restore_device=not args.keep_device_prep,
+            text_input=args.text_input,
+            snapshot_after=args.snapshot_after,
+            ai_uitree_budget=args.ai_uitree_budget,
+            ai_image_edge=args.ai_image_edge,
+            ai_image_format=args.ai_image_format,
+            ai_image_crop=args.ai_image_crop,
+            fail_fast=args.fail_fast,
+            trace_path=args.trace,
+        )
+    except CompiledRunnerError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(2)
 
     try:
+        if loop_mode:
+            summary = runner.run_loop(
+                iterations=args.loop,
+                duration_sec=args.loop_duration,
+                keep_last=args.keep_last,
+            )
+            sys.exit(0 if summary["failed_iterations"] == 0 else 1)
         result = runner.run()
+        if args.history_db:
+            from history import RunHistory
+            with RunHistory(args.history_db) as history:
+                history.ingest_result(
+                    os.path.join(runner.output_dir, "result.json")
+                )
         sys.exit(0 if result["summary"]["failed"] == 0 else 1)
     except CompiledRunnerError as e:
         print(f"Error: {e}", file=sys.stderr)
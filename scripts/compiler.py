@@ -0,0 +1,735 @@
+#!/usr/bin/env python3
+"""Deterministic scenario compiler: YAML (+ result.json) to compiled.json.
+
+Implements the classification rules of the scenario-compiler agent
+(see compile-ir-schema.md) without AI inference:
+
+- `do` actions are classified by natural-language patterns, with element
+  metadata taken from `target_element` of the AI run's result.json.
+- `then` assertions with quoted text become `strict_text_match`; others
+  become `uitree_verify` using the UITree captured during the AI run, or
+  `ai_checkpoint` when there is not enough UITree data.
+- `replay` sections are expanded inline.
+- `depends_on` of a section is copied to each of its steps and
+  `config.fail_fast` becomes the default fail-fast policy of the runner.
+
+Every compiled.json records a content hash per section and for the
+variables block. Recompiling without a result.json copies the steps of
+sections whose hash is unchanged and rebuilds only the changed ones
+(plus replay sections covering them). Within rebuilt sections, steps
+without a result.json entry reuse the strategy of the same step
+(section, type and text) from the previous compiled.json when it
+carries more information, keeping element metadata and UITree checks.
+Output is deterministic: recompiling unchanged inputs leaves the file
+untouched (including `compiled_at`).
+
+Usage:
+    python scripts/compiler.py <scenario.yaml> [<scenario.yaml> ...] [options]
+
+Options:
+    --result-dir <path>     Directory with result.json of the AI run
+                            (single scenario only)
+    --results-root <path>   Look up <path>/<scenario name>/result.json
+                            for every scenario
+    --output <path>         Output path (single scenario only; default:
+                            <scenario>.compiled.json)
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+
+import yaml
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from utils.uitree_parser import extract_fingerprint, parse_uitree
+
+IR_VERSION = "1.0"
+
+DIRECTION_MAP = {"上": "up", "下": "down", "左": "left", "右": "right"}
+TAP_KEYWORDS = ("タップ", "押す", "選択", "クリック")
+
+
+class CompilerError(Exception):
+    """Raised when a scenario cannot be compiled."""
+
+
+def _matches(text: str, patterns: list[str]) -> bool:
+    """Check if text matches any of the patterns (substring match)."""
+    return any(p in text for p in patterns)
+
+
+def extract_field_hint(text: str) -> str:
+    """Extract the field description from an input action.
+
+    "メールアドレス欄に「xxx」を入力" -> "メールアドレス"
+    """
+    match = re.match(r"(.+?)(?:欄|フィールド)?[にへ]「", text)
+    return match.group(1).strip() if match else ""
+
+
+def extract_any_text(text: str) -> str:
+    """Best-effort target text of an action without a clear pattern.
+
+    "メニューをタップ" -> "メニュー"
+    """
+    quoted = re.search(r"「(.+?)」", text)
+    if quoted:
+        return quoted.group(1)
+    return re.sub(r"(ボタン|アイコン)?[をの]?(タップ|押す|選択|クリック).*$", "", text)
+
+
+def extract_metadata(step_result: dict | None) -> dict | None:
+    """Extract element metadata from a result.json step."""
+    if not step_result or "target_element" not in step_result:
+        return None
+    te = step_result["target_element"]
+    return {
+        "resource_id": te.get("resource_id", ""),
+        "class": te.get("class", ""),
+        "content_desc": te.get("content_desc", ""),
+        "bounds": te.get("bounds", ""),
+        "parent_hierarchy": te.get("parent_hierarchy", []),
+    }
+
+
+def app_package(scenario: dict) -> str:
+    """Android package of a scenario (`app` string or object form)."""
+    app = scenario.get("app", "")
+    if isinstance(app, dict):
+        return app.get("android", "")
+    return app or ""
+
+
+def classify_action(text: str, step_result: dict | None, package: str) -> dict:
+    """Classify a natural-language `do` action into a compiled strategy.
+
+    Args:
+        text: Original action text (e.g. "アプリを起動").
+        step_result: Step from result.json (with target_element), if any.
+        package: Android package name of the app.
+
+    Returns:
+        Compiled strategy dict.
+    """
+    # 1. App operations
+    if _matches(text, ["アプリを再起動"]):
+        return {"strategy": "app_restart", "package": package}
+    if _matches(text, ["アプリを起動", "アプリを開く"]):
+        return {"strategy": "app_launch", "package": package}
+    if _matches(text, ["アプリを終了", "アプリを停止"]):
+        return {"strategy": "app_stop", "package": package}
+
+    # 2. Text input (before tap: both contain quoted text)
+    input_match = re.search(r"「(.+?)」[をと]入力", text)
+    if input_match:
+        strategy = {
+            "strategy": "text_input",
+            "input_text": input_match.group(1),
+            "field_hint": extract_field_hint(text),
+        }
+        metadata = extract_metadata(step_result)
+        if metadata:
+            strategy["element_metadata"] = metadata
+        return strategy
+
+    # 3. Scroll to find
+    scroll_find = re.search(r"「(.+?)」が見えるまでスクロール", text)
+    if scroll_find:
+        return {
+            "strategy": "scroll_to_find",
+            "search_text": scroll_find.group(1),
+            "direction": "down",
+            "max_scrolls": 10,
+            "distance": 500,
+            "duration_ms": 300,
+        }
+
+    # 4. Fixed scroll
+    scroll_match = re.search(r"(上|下|左|右)に(スクロール|スワイプ)", text)
+    if scroll_match:
+        return {
+            "strategy": "scroll_fixed",
+            "direction": DIRECTION_MAP[scroll_match.group(1)],
+            "distance": 500,
+            "duration_ms": 300,
+        }
+
+    # 5. Tap by quoted text
+    tap_match = re.search(r"「(.+?)」", text)
+    if tap_match and any(kw in text for kw in TAP_KEYWORDS):
+        strategy = {
+            "strategy": "tap_by_text",
+            "search_text": tap_match.group(1),
+            "match_type": "exact",
+        }
+        metadata = extract_metadata(step_result)
+        if metadata:
+            strategy["element_metadata"] = metadata
+        return strategy
+
+    # 6. Back/Home navigation
+    if _matches(text, ["ホームに戻る", "ホーム画面に戻る"]):
+        return {"strategy": "keyevent", "keycode": 3, "key_name": "HOME"}
+    if _matches(text, ["戻るボタンを押す", "前の画面に戻る", "戻る"]):
+        return {"strategy": "keyevent", "keycode": 4, "key_name": "BACK"}
+
+    # 7. Wait
+    wait_match = re.search(r"(\d+)秒待つ", text)
+    if wait_match:
+        return {"strategy": "wait", "duration_sec": int(wait_match.group(1))}
+
+    # 8. Element identified by resource-id during the AI run
+    metadata = extract_metadata(step_result)
+    if metadata and metadata.get("resource_id"):
+        return {
+            "strategy": "tap_by_resource_id",
+            "resource_id": metadata["resource_id"],
+            "fallback_text": extract_any_text(text),
+            "element_metadata": metadata,
+        }
+
+    # 9. Truly ambiguous: AI checkpoint
+    return {"strategy": "ai_checkpoint", "assertion": text}
+
+
+def generate_uitree_checks(
+    step_result: dict | None, result_dir: str | None
+) -> list[dict] | None:
+    """Build uitree_verify checks from the UITree captured in the AI run.
+
+    Returns:
+        At least two checks, or None if the UITree data is insufficient.
+    """
+    if not step_result or not result_dir:
+        return None
+    uitree_file = step_result.get("evidence", {}).get("uitree", "")
+    if not uitree_file:
+        return None
+    uitree_path = os.path.join(result_dir, uitree_file)
+    if not os.path.exists(uitree_path):
+        return None
+
+    with open(uitree_path, "r", encoding="utf-8") as f:
+        fingerprint = extract_fingerprint(parse_uitree(f.read()))
+
+    checks = []
+    for text in fingerprint["texts"][:3]:
+        checks.append({"type": "text_visible", "value": text, "match_type": "exact"})
+    for rid in fingerprint["resource_ids"][:2]:
+        checks.append({"type": "resource_id_exists", "value": rid})
+    for cls in fingerprint["classes"][:2]:
+        checks.append({"type": "class_exists", "value": cls})
+    return checks if len(checks) >= 2 else None
+
+
+def classify_then(
+    text: str,
+    strict: bool,
+    verify: str | None,
+    step_result: dict | None,
+    result_dir: str | None,
+) -> dict:
+    """Classify a `then` assertion into a compiled strategy.
+
+    Args:
+        text: Original assertion text.
+        strict: Whether strict mode is enabled.
+        verify: Verification override ('uitree', 'ai', 'screenshot' or None).
+        step_result: Step from result.json (with evidence paths), if any.
+        result_dir: Directory containing result.json and UITree XMLs.
+
+    Returns:
+        Compiled strategy dict.
+    """
+    if verify == "ai":
+        return {"strategy": "ai_checkpoint", "assertion": text}
+    if verify == "screenshot":
+        return {"strategy": "screenshot_only", "assertion": text}
+
+    quoted = re.search(r"「(.+?)」", text)
+    if quoted:
+        return {
+            "strategy": "strict_text_match",
+            "search_text": quoted.group(1),
+            "match_type": "contains" if "含まれ" in text else "exact",
+            "negate": "ないこと" in text,
+        }
+
+    checks = generate_uitree_checks(step_result, result_dir)
+    if checks:
+        return {
+            "strategy": "uitree_verify",
+            "assertion": text,
+            "fallback_to_ai": False,
+            "checks": checks,
+        }
+
+    if strict:
+        return {
+            "strategy": "ai_checkpoint",
+            "assertion": text,
+            "hint": "strict mode requested but no quoted text available",
+        }
+    return {"strategy": "ai_checkpoint", "assertion": text}
+
+
+def source_hash(path: str) -> str:
+    with open(path, "rb") as f:
+        return "sha256:" + hashlib.sha256(f.read()).hexdigest()
+
+
+def _content_hash(value) -> str:
+    """Hash of parsed YAML content (insensitive to comments and layout)."""
+    data = json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return "sha256:" + hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def section_hashes(scenario: dict) -> dict[str, str]:
+    """Content hash per section id.
+
+    `app` and `config` are part of every section's hash: they change how
+    all steps compile (package names, strict/verify defaults).
+    """
+    context = {"app": scenario.get("app"), "config": scenario.get("config") or {}}
+    return {
+        section.get("id", ""): _content_hash([context, section])
+        for section in scenario.get("steps") or []
+    }
+
+
+def variables_hash(scenario: dict) -> str:
+    """Content hash of the variables block."""
+    return _content_hash(scenario.get("variables") or {})
+
+
+def stale_sections(scenario: dict, compiled: dict) -> dict | None:
+    """Compare a scenario with the section hashes of its compiled.json.
+
+    Returns:
+        {changed, added, removed, reordered, dependents,
+        variables_changed}, where `reordered` tells whether the sections
+        kept from the compiled file are in a different order, and
+        `dependents` are unchanged replay sections whose range covers a
+        changed or added section or now covers other sections; or None if
+        the compiled file predates section hashes.
+    """
+    previous = compiled.get("section_hashes")
+    if previous is None:
+        return None
+    current = section_hashes(scenario)
+    changed = [s for s in current if s in previous and previous[s] != current[s]]
+    added = [s for s in current if s not in previous]
+    removed = [s for s in previous if s not in current]
+
+    ids = list(current)
+    previous_ids = compiled.get("section_order") or list(previous)
+    reordered = (
+        [s for s in ids if s in previous]
+        != [s for s in previous_ids if s in current]
+    )
+
+    def covered(order: list[str], start, end) -> list[str]:
+        if start not in order or end not in order:
+            return []
+        return order[order.index(start):order.index(end) + 1]
+
+    dirty = set(changed) | set(added)
+    dependents = []
+    for section in scenario.get("steps") or []:
+        replay = section.get("replay")
+        section_id = section.get("id", "")
+        if not replay or section_id in dirty:
+            continue
+        start, end = replay.get("from"), replay.get("to")
+        now = covered(ids, start, end)
+        if dirty.intersection(now) or now != covered(previous_ids, start, end):
+            dependents.append(section_id)
+    return {
+        "changed": changed,
+        "added": added,
+        "removed": removed,
+        "reordered": reordered,
+        "dependents": dependents,
+        "variables_changed": compiled.get("variables_hash") != variables_hash(scenario),
+    }
+
+
+def reusable_sections(
+    scenario: dict, previous: dict | None, result: dict | None = None
+) -> set[str]:
+    """Sections whose compiled steps can be copied from `previous`.
+
+    Nothing is reused when compiling from a fresh AI run (`result`): its
+    step indexes describe the current YAML as a whole.
+    """
+    if result is not None or not previous:
+        return set()
+    stale = stale_sections(scenario, previous)
+    if stale is None:
+        return set()
+    dirty = set(stale["changed"]) | set(stale["added"]) | set(stale["dependents"])
+    return set(section_hashes(scenario)) - dirty
+
+
+# Strategies that can only be derived from an AI run's result.json.
+RESULT_DERIVED = ("uitree_verify", "tap_by_resource_id")
+
+# Strategy fields that come from a result.json rather than the YAML.
+RESULT_FIELDS = ("element_metadata",)
+
+# Fields naming the target element; result fields are only carried over
+# while these still agree.
+TARGET_FIELDS = ("search_text", "field_hint", "resource_id")
+
+
+def _reuse(fresh: dict, previous: dict | None, overridden: bool) -> dict:
+    """Prefer a previous compilation of the same step when it knows more.
+
+    Without a result.json entry, a step classifies to the same strategy
+    minus element metadata, or degrades to `ai_checkpoint` where the
+    previous compilation had UITree-derived data. The fresh
+    classification is kept and only result-derived fields of the
+    previous one are carried over, so edited literals (package, texts)
+    take effect. Explicit `verify` overrides always win.
+    """
+    if previous is None:
+        return fresh
+    if previous["strategy"] == fresh["strategy"]:
+        if any(previous.get(f) != fresh.get(f) for f in TARGET_FIELDS):
+            return fresh
+        merged = dict(fresh)
+        for field in RESULT_FIELDS:
+            if field in previous and field not in merged:
+                merged[field] = previous[field]
+        return merged
+    if (
+        fresh["strategy"] == "ai_checkpoint"
+        and previous["strategy"] in RESULT_DERIVED
+        and not overridden
+    ):
+        return previous
+    return fresh
+
+
+def _expand_replay(
+    replay: dict, sections: list[dict], compiled_sections: dict[str, list[dict]]
+) -> list[dict]:
+    """Expand a replay range into the `do` steps it re-executes."""
+    ids = [s.get("id") for s in sections]
+    start, end = replay.get("from"), replay.get("to")
+    if start not in ids or end not in ids:
+        raise CompilerError(f"Unknown replay section: {start} -> {end}")
+    i, j = ids.index(start), ids.index(end)
+    if i > j:
+        raise CompilerError(f"Replay range is reversed: {start} -> {end}")
+    expanded = []
+    for section_id in ids[i:j + 1]:
+        if section_id not in compiled_sections:
+            raise CompilerError(
+                f"Replay of {section_id} must come after the section"
+            )
+        for step in compiled_sections[section_id]:
+            if step["type"] == "replay":
+                expanded.extend(step["compiled"]["expanded_steps"])
+            elif step["type"] == "do":
+                expanded.append({
+                    "section": section_id,
+                    "type": "do",
+                    "original": step["original"],
+                    "compiled": step["compiled"],
+                })
+    return expanded
+
+
+def _depends_on(section: dict, earlier: list[str]) -> list[str]:
+    """Validated `depends_on` of a section (a section id or a list)."""
+    depends_on = section.get("depends_on") or []
+    if isinstance(depends_on, str):
+        depends_on = [depends_on]
+    for dependency in depends_on:
+        if dependency not in earlier:
+            raise CompilerError(
+                f"Section {section.get('id', '')} depends on "
+                f"{dependency!r}, which is not an earlier section"
+            )
+    return list(depends_on)
+
+
+def compile_scenario(
+    scenario: dict,
+    scenario_path: str,
+    result: dict | None = None,
+    result_dir: str | None = None,
+    previous: dict | None = None,
+) -> dict:
+    """Compile a parsed scenario into the compiled IR.
+
+    Args:
+        scenario: Parsed scenario YAML.
+        scenario_path: Path of the YAML (recorded as `source`).
+        result: Parsed result.json of the AI run, if available.
+        result_dir: Directory of that result.json (for UITree evidence).
+        previous: Previous compiled.json. Sections whose hash is
+            unchanged are copied from it; other steps without a
+            result.json entry reuse its strategies where they know more.
+
+    Returns:
+        compiled.json dict.
+    """
+    if not isinstance(scenario, dict) or "steps" not in scenario:
+        raise CompilerError(f"Not a scenario (no steps): {scenario_path}")
+    config = scenario.get("config") or {}
+    global_strict = config.get("strict", False)
+    global_verify = config.get("verify")
+    package = app_package(scenario)
+
+    result_steps = {s["index"]: s for s in (result or {}).get("steps", [])}
+    reusable: dict[tuple, dict] = {}
+    previous_sections: dict[str, list[dict]] = {}
+    for step in (previous or {}).get("steps", []):
+        key = (step.get("section"), step.get("type"), step.get("original"))
+        reusable.setdefault(key, step["compiled"])
+        previous_sections.setdefault(step.get("section"), []).append(step)
+    unchanged = reusable_sections(scenario, previous, result)
+
+    compiled = {
+        "version": IR_VERSION,
+        "compiled_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "source": scenario_path,
+        "source_hash": source_hash(scenario_path),
+        "section_hashes": section_hashes(scenario),
+        "section_order": [s.get("id", "") for s in scenario["steps"]],
+        "variables_hash": variables_hash(scenario),
+        "platform": "android",
+        "app": scenario.get("app", {}),
+        "device": {},
+        "variables": scenario.get("variables") or {},
+        "steps": [],
+    }
+    if config.get("fail_fast"):
+        compiled["fail_fast"] = config["fail_fast"]
+    device = (result or {}).get("device") or (previous or {}).get("device") or {}
+    if device.get("screen_size"):
+        compiled["device"]["screen_size"] = device["screen_size"]
+
+    sections = scenario["steps"]
+    compiled_sections: dict[str, list[dict]] = {}
+    index = 0
+    for section in sections:
+        section_id = section.get("id", "")
+        section_steps: list[dict] = []
+        depends_on = _depends_on(section, list(compiled_sections))
+
+        if section_id in unchanged and "replay" not in section:
+            for step in previous_sections.get(section_id, []):
+                index += 1
+                section_steps.append({**step, "index": index})
+            compiled_sections[section_id] = section_steps
+            compiled["steps"].extend(section_steps)
+            continue
+
+        if "replay" in section:
+            index += 1
+            replay = section["replay"]
+            section_steps.append({
+                "index": index,
+                "section": section_id,
+                "type": "replay",
+                "original": f"replay: {replay.get('from')} -> {replay.get('to')}",
+                "replay_source": {
+                    "from": replay.get("from"),
+                    "to": replay.get("to"),
+                },
+                "compiled": {
+                    "strategy": "replay",
+                    "expanded_steps": _expand_replay(
+                        replay, sections, compiled_sections
+                    ),
+                },
+            })
+            if depends_on:
+                section_steps[-1]["depends_on"] = depends_on
+
+        for action in section.get("actions") or []:
+            index += 1
+            step_result = result_steps.get(index)
+            strict = action.get("strict", global_strict)
+            verify = None
+
+            if "do" in action:
+                step = {
+                    "index": index,
+                    "section": section_id,
+                    "type": "do",
+                    "original": action["do"],
+                }
+                strategy = classify_action(action["do"], step_result, package)
+                if action.get("wait"):
+                    step["wait"] = action["wait"]
+                if strict:
+                    step["strict"] = strict
+            elif "then" in action:
+                step = {
+                    "index": index,
+                    "section": section_id,
+                    "type": "then",
+                    "original": action["then"],
+                    "strict": strict,
+                }
+                verify = action.get("verify", global_verify)
+                strategy = classify_then(
+                    action["then"], strict, verify, step_result, result_dir
+                )
+            else:
+                raise CompilerError(
+                    f"Action without do/then in section {section_id}: {action}"
+                )
+            if depends_on:
+                step["depends_on"] = depends_on
+            if step_result is None:
+                previous_strategy = reusable.get(
+                    (section_id, step["type"], step["original"])
+                )
+                strategy = _reuse(
+                    strategy,
+                    previous_strategy,
+                    verify is not None,
+                )
+            step["compiled"] = strategy
+            section_steps.append(step)
+
+        compiled_sections[section_id] = section_steps
+        compiled["steps"].extend(section_steps)
+
+    return compiled
+
+
+def load_result(result_dir: str) -> dict | None:
+    path = os.path.join(result_dir, "result.json")
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_scenario(scenario_path: str) -> dict:
+    with open(scenario_path, "r", encoding="utf-8") as f:
+        try:
+            return yaml.safe_load(f)
+        except yaml.YAMLError as e:
+            raise CompilerError(f"Invalid YAML in {scenario_path}: {e}") from e
+
+
+@dataclass
+class CompileOutcome:
+    """Result of compiling a scenario file.
+
+    Attributes:
+        compiled: The compiled.json dict.
+        output_path: Where it was written.
+        changed: Whether the file content changed.
+        rebuilt: Section ids compiled afresh (the rest were copied from
+            the previous compiled.json).
+    """
+
+    compiled: dict
+    output_path: str
+    changed: bool
+    rebuilt: list[str] = field(default_factory=list)
+
+
+def compile_file(
+    scenario_path: str,
+    result_dir: str | None = None,
+    output_path: str | None = None,
+) -> CompileOutcome:
+    """Compile a scenario file and write its compiled.json.
+
+    Recompiling over an existing compiled.json without a result.json
+    only rebuilds the sections whose hashes changed.
+    """
+    scenario = load_scenario(scenario_path)
+
+    output_path = output_path or f"{scenario_path}.compiled.json"
+    previous = None
+    if os.path.exists(output_path):
+        with open(output_path, "r", encoding="utf-8") as f:
+            previous = json.load(f)
+
+    result = load_result(result_dir) if result_dir else None
+    if result_dir and result is None:
+        raise CompilerError(f"result.json not found in {result_dir}")
+
+    compiled = compile_scenario(
+        scenario, scenario_path, result, result_dir, previous
+    )
+    unchanged = reusable_sections(scenario, previous, result)
+    rebuilt = [s for s in compiled["section_hashes"] if s not in unchanged]
+    if previous and {**previous, "compiled_at": ""} == {
+        **compiled, "compiled_at": ""
+    }:
+        return CompileOutcome(previous, output_path, False, rebuilt)
+
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(compiled, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+    return CompileOutcome(compiled, output_path, True, rebuilt)
+
+
+def describe(compiled: dict) -> dict:
+    """Count fully compiled steps versus AI checkpoints."""
+    steps = compiled["steps"]
+    ai = sum(1 for s in steps if s["compiled"]["strategy"] == "ai_checkpoint")
+    return {"total_steps": len(steps), "compiled": len(steps) - ai, "ai_checkpoints": ai}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compile uiai scenarios into compiled.json IR"
+    )
+    parser.add_argument("scenarios", nargs="+", help="Scenario YAML files")
+    parser.add_argument("--result-dir", help="Directory with result.json")
+    parser.add_argument(
+        "--results-root",
+        help="Directory with <scenario name>/result.json per scenario",
+    )
+    parser.add_argument("--output", "-o", help="Output compiled.json path")
+    args = parser.parse_args()
+
+    if len(args.scenarios) > 1 and (args.result_dir or args.output):
+        parser.error("--result-dir and --output need a single scenario")
+
+    failed = 0
+    for scenario_path in args.scenarios:
+        result_dir = args.result_dir
+        if args.results_root:
+            candidate = os.path.join(args.results_root, Path(scenario_path).stem)
+            if os.path.exists(os.path.join(candidate, "result.json")):
+                result_dir = candidate
+        try:
+            outcome = compile_file(scenario_path, result_dir, args.output)
+        except (CompilerError, OSError) as e:
+            print(f"Error: {scenario_path}: {e}", file=sys.stderr)
+            failed += 1
+            continue
+        stats = describe(outcome.compiled)
+        sections = len(outcome.compiled["section_hashes"])
+        print(
+            f"{outcome.output_path}: {stats['total_steps']} steps, "
+            f"{stats['compiled']} compiled, {stats['ai_checkpoints']} AI, "
+            f"{len(outcome.rebuilt)}/{sections} sections rebuilt"
+            + ("" if outcome.changed else " (unchanged)")
+        )
+    sys.exit(2 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,475 @@
+#!/usr/bin/env python3
+"""Data-driven runs of a compiled scenario over variable datasets.
+
+Runs the same compiled scenario once per dataset row, with the row's
+values as variable overrides. The compiled scenario is loaded once and
+shared by every run. Rows are pulled from a shared queue by worker
+slots: `--workers-per-device` slots on each device. Every slot prepares
+its device once and then runs row after row, as in soak mode.
+
+Datasets are CSV files with a header row of variable names, or JSONL
+files with one object of variable values per line. Each row writes its
+own `rows/<row id>/result.json`. The aggregate `dataset.json` lists the
+failed rows and their failed steps.
+
+A row that errors or fails every step on a device that no longer
+answers is put back on the queue for the other slots (once per row).
+After DEVICE_FAILURE_LIMIT such rows in a row, the slot stops.
+
+Usage:
+    python scripts/dataset_runner.py <compiled.json> <dataset.csv|.jsonl> [options]
+
+Options:
+    --devices <a,b,...>   Device serials (default: all connected devices)
+    --workers-per-device <n>
+                          Concurrent rows per device (default: 1; more
+                          only helps flows that tolerate sharing a device)
+    --output-dir <path>   Output directory (default: .adb-test/datasets/...)
+    --id-column <name>    Variable naming each row's result directory
+                          (default: the row number)
+    --variables KEY=VAL   Override variable for every row (repeatable;
+                          dataset values take precedence)
+    --skip-ai             Skip AI checkpoint steps (mark as skipped)
+    --evidence <level>    Evidence to write: all (default), failures, none
+    --fail-fast <policy>  off, abort, section or dependents (see
+                          compiled_runner.py)
+"""
+
+import argparse
+import csv
+import json
+import os
+import queue
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from backends.adb_backend import ADBBackend, ADBError
+from compiled_runner import (
+    FAIL_FAST_POLICIES,
+    CompiledRunner,
+    CompiledRunnerError,
+)
+from evidence import EVIDENCE_LEVELS
+
+DATASET_FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+
+# Consecutive device-level row failures after which a slot stops.
+DEVICE_FAILURE_LIMIT = 2
+
+
+class DatasetError(Exception):
+    """Raised when a dataset cannot be loaded."""
+
+
+@dataclass
+class DatasetRow:
+    """One variable set of a dataset."""
+
+    number: int
+    row_id: str
+    variables: dict[str, str] = field(default_factory=dict)
+
+
+def _row_id(value: str, number: int) -> str:
+    """File-system safe row id (falls back to the row number)."""
+    safe = re.sub(r"[^\w.-]+", "_", value).strip("._")
+    return safe or f"row_{number:05d}"
+
+
+def load_dataset(path: str, id_column: str | None = None) -> list[DatasetRow]:
+    """Load the variable sets of a CSV or JSONL dataset.
+
+    Args:
+        path: Dataset file; the format follows the extension.
+        id_column: Variable whose value names each row.
+
+    Returns:
+        Rows in file order, numbered from 1.
+    """
+    fmt = DATASET_FORMATS.get(os.path.splitext(path)[1].lower())
+    if fmt is None:
+        raise DatasetError(
+            f"Unknown dataset format: {path} "
+            f"(use {', '.join(DATASET_FORMATS)})"
+        )
+    if not os.path.exists(path):
+        raise DatasetError(f"Dataset not found: {path}")
+
+    records: list[dict] = []
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        if fmt == "csv":
+            reader = csv.DictReader(f)
+            if not reader.fieldnames:
+                raise DatasetError(f"CSV dataset has no header row: {path}")
+            for record in reader:
+                if None in record:
+                    raise DatasetError(
+                        f"{path}:{reader.line_num}: more values than columns"
+                    )
+                records.append(record)
+        else:
+            for line_num, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    raise DatasetError(f"{path}:{line_num}: {e}") from e
+                if not isinstance(record, dict):
+                    raise DatasetError(f"{path}:{line_num}: not a JSON object")
+                records.append(record)
+
+    rows = []
+    seen: set[str] = set()
+    for number, record in enumerate(records, 1):
+        variables = {
+            str(k): "" if v is None else str(v) for k, v in record.items()
+        }
+        if id_column and id_column not in variables:
+            raise DatasetError(f"Row {number} has no {id_column!r} value")
+        row_id = _row_id(variables[id_column], number) if id_column else ""
+        if not row_id or row_id in seen:
+            row_id = f"row_{number:05d}" + (f"_{row_id}" if row_id else "")
+        seen.add(row_id)
+        rows.append(DatasetRow(number, row_id, variables))
+    return rows
+
+
+class DatasetRunner:
+    """Runs a compiled scenario over dataset rows on several devices."""
+
+    def __init__(
+        self,
+        compiled_path: str,
+        rows: list[DatasetRow],
+        devices: list[str],
+        workers_per_device: int = 1,
+        output_dir: str | None = None,
+        variable_overrides: dict | None = None,
+        id_column: str | None = None,
+        **runner_kwargs,
+    ):
+        if not devices:
+            raise CompiledRunnerError("No ADB devices available")
+        if workers_per_device < 1:
+            raise CompiledRunnerError("--workers-per-device must be at least 1")
+        self.compiled_path = compiled_path
+        self.rows = rows
+        self.devices = devices
+        self.workers_per_device = workers_per_device
+        self.variable_overrides = variable_overrides or {}
+        self.id_column = id_column
+        self.runner_kwargs = runner_kwargs
+
+        with open(compiled_path, "r", encoding="utf-8") as f:
+            self.compiled = json.load(f)
+
+        ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+        source = Path(self.compiled.get("source", "compiled")).stem
+        self.output_dir = output_dir or f".adb-test/datasets/{ts}/{source}"
+        self._queue: queue.Queue[DatasetRow] = queue.Queue()
+        self._row_dirs = {
+            os.path.join(self.output_dir, "rows", row.row_id): row for row in rows
+        }
+        self._lock = threading.Lock()
+        self._done = 0
+        # Row numbers put back on the queue after a device failure.
+        self._requeued: set[int] = set()
+
+    def unknown_variables(self) -> list[str]:
+        """Dataset columns the compiled scenario does not define."""
+        known = set(self.compiled.get("variables") or {}) | {self.id_column}
+        columns = {name for row in self.rows for name in row.variables}
+        return sorted(columns - known)
+
+    def run(self) -> dict:
+        """Run every row and write the aggregate dataset.json."""
+        os.makedirs(self.output_dir, exist_ok=True)
+        start_time = datetime.now(timezone.utc).isoformat()
+        for row in self.rows:
+            self._queue.put(row)
+
+        slots = [
+            (device, worker)
+            for device in self.devices
+            for worker in range(1, self.workers_per_device + 1)
+        ]
+        print(
+            f"Dataset: {len(self.rows)} rows of "
+            f"{self.compiled.get('source', '?')} on {len(self.devices)} "
+            f"device(s), {len(slots)} worker(s)"
+        )
+        unknown = self.unknown_variables()
+        if unknown:
+            print(f"WARNING: Variables not used by the scenario: {', '.join(unknown)}")
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=len(slots)) as pool:
+            slot_results = list(pool.map(lambda s: self._run_slot(*s), slots))
+        rows = sorted(
+            (row for results in slot_results for row in results),
+            key=lambda r: r["row"],
+        )
+
+        summary = self._summarize(rows, start_time, time.monotonic() - started)
+        with open(
+            os.path.join(self.output_dir, "dataset.json"), "w", encoding="utf-8"
+        ) as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        self._print_summary(summary)
+        return summary
+
+    def _pull(self) -> Iterator[tuple[str, dict]]:
+        """Runs for one worker slot, taken from the shared row queue."""
+        while True:
+            try:
+                row = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            yield (
+                os.path.join(self.output_dir, "rows", row.row_id),
+                {**self.variable_overrides, **row.variables},
+            )
+
+    def _run_slot(self, device: str, worker: int) -> list[dict]:
+        """Run queued rows on one device until the queue is empty."""
+        runner = CompiledRunner(
+            compiled_path=self.compiled_path,
+            device=device,
+            output_dir=self.output_dir,
+            compiled=self.compiled,
+            verbose=False,
+            **self.runner_kwargs,
+        )
+        rows = []
+        device_failures = 0
+        try:
+            for result in runner.run_each(self._pull()):
+                row = self._row_dirs[result["output_dir"]]
+                if not self._device_failed(runner, result):
+                    device_failures = 0
+                elif self._requeue(row):
+                    device_failures += 1
+                    print(
+                        f"Worker {device}#{worker}: device not responding, "
+                        f"row {row.number} ({row.row_id}) requeued"
+                    )
+                    if device_failures >= DEVICE_FAILURE_LIMIT:
+                        print(f"Worker {device}#{worker} stopped: device lost")
+                        break
+                    continue
+                rows.append(self._row_record(row, device, worker, result))
+        except (CompiledRunnerError, ADBError) as e:
+            # Device setup failed; the queued rows go to other workers.
+            print(f"Worker {device}#{worker} stopped: {e}")
+        except Exception as e:
+            # Keep the other slots' rows and write dataset.json anyway.
+            print(f"Worker {device}#{worker} crashed: {type(e).__name__}: {e}")
+        return rows
+
+    @staticmethod
+    def _device_failed(runner: CompiledRunner, result: dict) -> bool:
+        """Whether a row failed because its device went away."""
+        summary = result["summary"]
+        if not result.get("error") and (
+            summary["passed"] > 0 or summary["failed"] == 0
+        ):
+            return False
+        try:
+            return not runner.adb.check_connection()
+        except ADBError:
+            return True
+
+    def _requeue(self, row: DatasetRow) -> bool:
+        """Put a row back for other slots; False if it was requeued before."""
+        with self._lock:
+            if row.number in self._requeued:
+                return False
+            self._requeued.add(row.number)
+        self._queue.put(row)
+        return True
+
+    def _row_record(
+        self, row: DatasetRow, device: str, worker: int, result: dict
+    ) -> dict:
+        summary = result["summary"]
+        failed = bool(result.get("error")) or summary["failed"] > 0
+        record = {
+            "row": row.number,
+            "id": row.row_id,
+            "status": "failed" if failed else "passed",
+            "device": device,
+            "worker": worker,
+            "summary": summary,
+            "output_dir": os.path.relpath(
+                result.get("output_dir", ""), self.output_dir
+            ),
+        }
+        if result.get("error"):
+            record["error"] = result["error"]
+        failed_steps = [
+            {
+                "index": step["index"],
+                "section": step["section"],
+                "action": step["action"],
+                "error": (
+                    step["execution"].get("error")
+                    or step.get("verification", {}).get("reason", "")
+                ),
+            }
+            for step in result.get("steps", [])
+            if step["status"] == "failed"
+        ]
+        if failed_steps:
+            record["failed_steps"] = failed_steps
+        with self._lock:
+            self._done += 1
+            print(
+                f"[{self._done}/{len(self.rows)}] row {row.number} ({row.row_id}) "
+                f"on {device}: {record['status'].upper()} "
+                f"{summary['passed']}/{summary['total_steps']} passed"
+            )
+        return record
+
+    def _summarize(self, rows: list[dict], start_time: str, elapsed: float) -> dict:
+        done = {r["row"] for r in rows}
+        failed = [r for r in rows if r["status"] == "failed"]
+        return {
+            "scenario": Path(self.compiled.get("source", "")).stem,
+            "compiled_from": self.compiled_path,
+            "execution": {
+                "start_time": start_time,
+                "end_time": datetime.now(timezone.utc).isoformat(),
+                "duration_sec": round(elapsed, 1),
+                "devices": self.devices,
+                "workers_per_device": self.workers_per_device,
+            },
+            "summary": {
+                "total_rows": len(self.rows),
+                "passed": len(rows) - len(failed),
+                "failed": len(failed),
+                "not_run": len(self.rows) - len(rows),
+            },
+            "failed_rows": [
+                {"row": r["row"], "id": r["id"], "output_dir": r["output_dir"]}
+                for r in failed
+            ],
+            "not_run_rows": [
+                row.number for row in self.rows if row.number not in done
+            ],
+            "rows": rows,
+            "output_dir": self.output_dir,
+        }
+
+    def _print_summary(self, summary: dict) -> None:
+        s = summary["summary"]
+        print()
+        print("=" * 50)
+        print("Dataset Execution Complete")
+        print("=" * 50)
+        print()
+        print(f"Rows:     {s['total_rows']}")
+        print(f"Passed:   {s['passed']}")
+        print(f"Failed:   {s['failed']}")
+        if s["not_run"]:
+            print(f"Not run:  {s['not_run']}")
+        for r in summary["failed_rows"]:
+            print(f"  FAIL row {r['row']} ({r['id']}): {r['output_dir']}")
+        print()
+        print(f"Results: {os.path.join(self.output_dir, 'dataset.json')}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Run a compiled uiai scenario over a dataset of variables"
+    )
+    parser.add_argument("compiled_json", help="Path to compiled.json")
+    parser.add_argument("dataset", help="CSV (with header) or JSONL dataset")
+    parser.add_argument(
+        "--devices", help="Comma-separated device serials (default: all)"
+    )
+    parser.add_argument(
+        "--workers-per-device",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Concurrent rows per device (default: 1)",
+    )
+    parser.add_argument("--output-dir", "-o", help="Output directory")
+    parser.add_argument(
+        "--id-column", help="Variable naming each row's result directory"
+    )
+    parser.add_argument(
+        "--variables",
+        "-v",
+        action="append",
+        default=[],
+        help="Override variable for every row (KEY=VALUE, repeatable)",
+    )
+    parser.add_argument(
+        "--skip-ai", action="store_true", help="Skip AI checkpoint steps"
+    )
+    parser.add_argument(
+        "--evidence",
+        choices=EVIDENCE_LEVELS,
+        default="all",
+        help="Evidence to write per row",
+    )
+    parser.add_argument(
+        "--fail-fast",
+        choices=FAIL_FAST_POLICIES,
+        help="Fail-fast policy of every row (default: config.fail_fast or off)",
+    )
+    args = parser.parse_args()
+
+    var_overrides = {}
+    for v in args.variables:
+        if "=" in v:
+            key, val = v.split("=", 1)
+            var_overrides[key] = val
+
+    try:
+        rows = load_dataset(args.dataset, args.id_column)
+        if not rows:
+            raise DatasetError(f"Dataset has no rows: {args.dataset}")
+        devices = (
+            [d for d in args.devices.split(",") if d]
+            if args.devices
+            else ADBBackend.list_devices()
+        )
+        runner = DatasetRunner(
+            compiled_path=args.compiled_json,
+            rows=rows,
+            devices=devices,
+            workers_per_device=args.workers_per_device,
+            output_dir=args.output_dir,
+            variable_overrides=var_overrides,
+            id_column=args.id_column,
+            skip_ai=args.skip_ai,
+            evidence_level=args.evidence,
+            fail_fast=args.fail_fast,
+        )
+        summary = runner.run()
+        sys.exit(0 if summary["summary"]["failed"] == 0 else 1)
+    except DatasetError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(2)
+    except CompiledRunnerError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(2)
+    except ADBError as e:
+        print(f"ADB Error: {e}", file=sys.stderr)
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
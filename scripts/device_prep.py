@@ -0,0 +1,171 @@
+"""Device performance preparation with automatic restore.
+
+Before a run the device can be put into a test-friendly state:
+
+- `animations`: window, transition and animator duration scales set to 0
+- `stay_awake`: screen stays on while plugged in (USB, AC, wireless)
+- `keyguard`: screen woken and the (non-secure) keyguard dismissed
+
+Original setting values are read and applied with parallel adb calls.
+They are written to a state file before anything is changed, so a run
+that crashes (or is killed) before restoring leaves the originals
+behind; the next preparation of the same device restores from that file
+instead of mistaking the prepared values for the originals.
+"""
+
+import atexit
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from backends.adb_backend import ADBBackend
+
+PREP_ITEMS = ("animations", "stay_awake", "keyguard")
+
+# (namespace, key, prepared value) per item
+PREP_SETTINGS = {
+    "animations": [
+        ("global", "window_animation_scale", "0"),
+        ("global", "transition_animation_scale", "0"),
+        ("global", "animator_duration_scale", "0"),
+    ],
+    "stay_awake": [
+        ("global", "stay_on_while_plugged_in", "7"),
+    ],
+}
+
+DEFAULT_STATE_DIR = ".adb-test/device_prep"
+
+
+def parse_prep_items(value: str) -> list[str]:
+    """Parse a comma-separated item list ('all' = every item)."""
+    if value == "all":
+        return list(PREP_ITEMS)
+    items = [item.strip() for item in value.split(",") if item.strip()]
+    for item in items:
+        if item not in PREP_ITEMS:
+            raise ValueError(
+                f"Unknown device prep item: {item} "
+                f"(choose from {', '.join(PREP_ITEMS)})"
+            )
+    return items
+
+
+class DevicePrep:
+    """Applies a device prep profile and restores the original settings.
+
+    Unless `restore_on_exit` is False, settings not restored by `restore`
+    are restored at interpreter exit; otherwise they stay prepared until
+    the next preparation of the device.
+    """
+
+    def __init__(
+        self,
+        adb: ADBBackend,
+        items: list[str] | tuple[str, ...] = PREP_ITEMS,
+        state_dir: str = DEFAULT_STATE_DIR,
+        restore_on_exit: bool = True,
+    ):
+        self.adb = adb
+        self.items = list(items)
+        serial = adb.device_serial or "default"
+        self.state_path = os.path.join(state_dir, f"{serial}.json")
+        self.original: dict[str, str | None] = {}
+        self.report: dict = {}
+        self.restore_on_exit = restore_on_exit
+        self._applied = False
+
+    def _settings(self) -> list[tuple[str, str, str]]:
+        return [s for item in self.items for s in PREP_SETTINGS.get(item, [])]
+
+    def _load_state(self) -> dict[str, str | None] | None:
+        if not os.path.exists(self.state_path):
+            return None
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                return json.load(f)["original"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _save_state(self) -> None:
+        os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+        with open(self.state_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"device": self.adb.device_serial, "original": self.original},
+                f,
+                indent=2,
+            )
+
+    def apply(self) -> dict:
+        """Record original settings, then apply the profile in parallel.
+
+        Returns:
+            Report for result.json.
+        """
+        started = time.monotonic()
+        settings = self._settings()
+        recovered = self._load_state() or {}
+
+        def read(setting: tuple[str, str, str]) -> tuple[str, str | None]:
+            namespace, key, _ = setting
+            name = f"{namespace}/{key}"
+            if name in recovered:
+                return name, recovered[name]
+            return name, self.adb.get_setting(namespace, key)
+
+        with ThreadPoolExecutor(max_workers=max(1, len(settings))) as pool:
+            self.original = dict(pool.map(read, settings))
+        # Keep recovered originals of items not prepared this time.
+        self.original = {**recovered, **self.original}
+        self._save_state()
+        self._applied = True
+        if self.restore_on_exit:
+            atexit.register(self.restore)
+
+        self._put_profile(settings)
+
+        self.report = {
+            "items": self.items,
+            "applied": {f"{ns}/{key}": value for ns, key, value in settings},
+            "original": dict(self.original),
+            "recovered_from_previous_run": bool(recovered),
+            "duration_ms": int((time.monotonic() - started) * 1000),
+        }
+        return self.report
+
+    def _put_profile(self, settings: list[tuple[str, str, str]]) -> None:
+        tasks = [
+            (lambda s=s: self.adb.put_setting(s[0], s[1], s[2]))
+            for s in settings
+        ]
+        if "keyguard" in self.items:
+            tasks.append(self.adb.dismiss_keyguard)
+        with ThreadPoolExecutor(max_workers=max(1, len(tasks))) as pool:
+            for future in [pool.submit(task) for task in tasks]:
+                future.result()
+
+    def reapply(self) -> None:
+        """Put the prepared settings again (e.g. after a snapshot restore).
+
+        The originals recorded by `apply` and the report are kept.
+        """
+        if self._applied:
+            self._put_profile(self._settings())
+
+    def restore(self) -> None:
+        """Put the original settings back (in parallel) and drop the state file."""
+        if not self._applied:
+            return
+        self._applied = False
+        atexit.unregister(self.restore)
+
+        def put(item: tuple[str, str | None]) -> None:
+            namespace, key = item[0].split("/", 1)
+            self.adb.put_setting(namespace, key, item[1])
+
+        with ThreadPoolExecutor(max_workers=max(1, len(self.original))) as pool:
+            list(pool.map(put, self.original.items()))
+        if os.path.exists(self.state_path):
+            os.remove(self.state_path)
+        self.report["restored"] = True
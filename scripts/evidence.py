@@ -0,0 +1,174 @@
+"""Step evidence recording for the compiled runner.
+
+Evidence levels:
+
+- `all`: every step writes its screenshots and UITree (default).
+- `failures`: screenshots and UITrees are kept in a bounded in-memory
+  ring buffer and only written when a step ends `failed` or
+  `ai_required`, together with the preceding `context_steps` steps.
+- `none`: no screenshots are taken and no UITree is written.
+- `video`: `screenrecord` runs in the background for the whole scenario
+  instead of per-step screencaps. Steps only record timestamps; before
+  and after frames are extracted from the recording on the host, in
+  parallel, when the run finishes. UITrees are written as with `all`.
+
+Steps that end `ai_required` also get `step_XX_uitree_compact.txt`, a
+pruned UITree for the AI evaluator.
+
+Evidence file names (`step_XX_before.png`, `step_XX_uitree.xml`, ...)
+and the `evidence` keys of step results are the same for every level;
+a key is only present once its file exists.
+"""
+
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field
+
+from backends.adb_backend import ADBBackend
+from backends.screenrecord import ScreenRecorder, extract_frames
+
+EVIDENCE_LEVELS = ("all", "failures", "none", "video")
+
+FLUSH_STATUSES = ("failed", "ai_required")
+
+
+@dataclass
+class _BufferedStep:
+    step_result: dict
+    # (evidence key, file name, content)
+    items: list[tuple[str, str, bytes | str]] = field(default_factory=list)
+
+
+class EvidenceRecorder:
+    """Captures step evidence according to an evidence level."""
+
+    def __init__(
+        self,
+        adb: ADBBackend,
+        output_dir: str,
+        level: str = "all",
+        context_steps: int = 3,
+    ):
+        if level not in EVIDENCE_LEVELS:
+            raise ValueError(
+                f"Unknown evidence level: {level} "
+                f"(choose from {', '.join(EVIDENCE_LEVELS)})"
+            )
+        self.adb = adb
+        self.output_dir = output_dir
+        self.level = level
+        self._buffer: deque[_BufferedStep] = deque(maxlen=context_steps + 1)
+        self.flushed_steps = 0
+        self.recorder: ScreenRecorder | None = None
+        # (step result, phase, host monotonic time) for video frames
+        self._marks: list[tuple[dict, str, float]] = []
+
+    def start(self) -> None:
+        """Begin a run (starts background recording for `video`)."""
+        if self.level == "video":
+            self.recorder = ScreenRecorder(self.adb)
+            self.recorder.start()
+
+    def finish(self) -> None:
+        """End a run: stop recording and extract step frames."""
+        if self.recorder is None:
+            return
+        self.recorder.stop()
+        segments = self.recorder.pull(os.path.join(self.output_dir, "video"))
+
+        requests = []
+        targets = []
+        for step_result, phase, timestamp in self._marks:
+            located = self.recorder.locate(timestamp)
+            if located is None or not located[0].local_path:
+                continue
+            segment, offset = located
+            name = f"step_{step_result['index']:02d}_{phase}.png"
+            requests.append(
+                (segment.local_path, offset, os.path.join(self.output_dir, name))
+            )
+            targets.append((step_result, phase, name, segment, offset))
+            video = step_result["evidence"].setdefault("video", {})
+            video["file"] = os.path.relpath(segment.local_path, self.output_dir)
+            video[f"{phase}_sec"] = round(offset, 3)
+
+        for ok, (step_result, phase, name, _, _) in zip(
+            extract_frames(requests), targets
+        ):
+            if ok:
+                step_result["evidence"][f"screenshot_{phase}"] = name
+        print(
+            f"Video evidence: {len(segments)} segment(s), "
+            f"{sum(1 for s in segments if s.local_path)} pulled"
+        )
+        self.recorder = None
+        self._marks = []
+
+    def _entry(self, step_result: dict) -> _BufferedStep:
+        if not self._buffer or self._buffer[-1].step_result is not step_result:
+            self._buffer.append(_BufferedStep(step_result))
+        return self._buffer[-1]
+
+    def screenshot(self, step_result: dict, phase: str) -> None:
+        """Capture the `before` or `after` screenshot of a step."""
+        if self.level == "none":
+            return
+        if self.level == "video":
+            self._marks.append((step_result, phase, time.monotonic()))
+            return
+        key = f"screenshot_{phase}"
+        name = f"step_{step_result['index']:02d}_{phase}.png"
+        if self.level == "all":
+            path = self.adb.screenshot(os.path.join(self.output_dir, name))
+            step_result["evidence"][key] = os.path.basename(path)
+            return
+        data, ext = self.adb.screenshot_bytes()
+        name = os.path.splitext(name)[0] + ext
+        self._entry(step_result).items.append((key, name, data))
+
+    def uitree(self, step_result: dict, xml_content: str) -> None:
+        """Record the UITree XML a step was evaluated against."""
+        self.text(
+            step_result,
+            "uitree",
+            f"step_{step_result['index']:02d}_uitree.xml",
+            xml_content,
+        )
+
+    def text(self, step_result: dict, key: str, name: str, content: str) -> None:
+        """Record a text evidence file (written like UITrees)."""
+        if self.level == "none":
+            return
+        if self.level in ("all", "video"):
+            self._write(name, content)
+            step_result["evidence"][key] = name
+            return
+        self._entry(step_result).items.append((key, name, content))
+
+    def finish_step(self, step_result: dict) -> None:
+        """Flush buffered evidence if the step failed or needs AI."""
+        if self.level != "failures":
+            return
+        if step_result["status"] in FLUSH_STATUSES:
+            self._entry(step_result)
+            self.flush()
+
+    def flush(self) -> None:
+        """Write every buffered step to disk and empty the buffer."""
+        while self._buffer:
+            entry = self._buffer.popleft()
+            for key, name, content in entry.items:
+                self._write(name, content)
+                entry.step_result["evidence"][key] = name
+            self.flushed_steps += 1
+
+    def _write(self, name: str, content: bytes | str) -> None:
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, name)
+        if isinstance(content, bytes):
+            with open(path, "wb") as f:
+                f.write(content)
+        else:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(content)
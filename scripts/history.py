@@ -0,0 +1,536 @@
+#!/usr/bin/env python3
+"""Indexed run history for uiai.
+
+Loads `result.json` files from result directories into a local SQLite
+database so that step status, strategy and timing can be queried without
+walking the filesystem.
+
+Usage:
+    python scripts/history.py ingest <path>... [options]
+    python scripts/history.py query [filters] [options]
+    python scripts/history.py summary [filters] --by <column>
+
+Options:
+    --db <path>           Database path (default: .adb-test/history.db)
+    --watch <sec>         (ingest) Keep polling for new results every N seconds
+    --scenario <name>     Filter by scenario name
+    --device <serial>     Filter by device serial
+    --section <id>        Filter by section ID
+    --step <index>        Filter by step index
+    --status <status>     Filter by step status
+    --strategy <name>     Filter by compiled strategy
+    --since <when>        Only runs started after ISO8601 time or age (7d, 12h)
+    --limit <n>           Maximum rows to print (query)
+    --json                Print rows as JSON lines
+"""
+
+import argparse
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+DEFAULT_DB_PATH = ".adb-test/history.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    result_path TEXT NOT NULL UNIQUE,
+    result_mtime_ns INTEGER NOT NULL,
+    result_size INTEGER NOT NULL,
+    scenario TEXT NOT NULL,
+    scenario_file TEXT,
+    device_serial TEXT,
+    device_model TEXT,
+    mode TEXT,
+    start_time TEXT,
+    end_time TEXT,
+    total_steps INTEGER,
+    passed INTEGER,
+    failed INTEGER,
+    skipped INTEGER,
+    ai_required INTEGER,
+    ingested_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS steps (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    step_index INTEGER NOT NULL,
+    section TEXT,
+    action_type TEXT,
+    action TEXT,
+    status TEXT,
+    strategy TEXT,
+    duration_ms INTEGER,
+    wait_sec REAL,
+    error TEXT,
+    PRIMARY KEY (run_id, step_index)
+);
+
+CREATE TABLE IF NOT EXISTS adb_latency (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    command TEXT NOT NULL,
+    count INTEGER,
+    p50_ms REAL,
+    p95_ms REAL,
+    p99_ms REAL,
+    max_ms REAL,
+    PRIMARY KEY (run_id, command)
+);
+
+CREATE INDEX IF NOT EXISTS idx_runs_scenario ON runs(scenario, start_time);
+CREATE INDEX IF NOT EXISTS idx_runs_device ON runs(device_serial, start_time);
+CREATE INDEX IF NOT EXISTS idx_runs_start ON runs(start_time);
+CREATE INDEX IF NOT EXISTS idx_runs_model ON runs(device_model, start_time);
+CREATE INDEX IF NOT EXISTS idx_steps_step ON steps(step_index, section);
+CREATE INDEX IF NOT EXISTS idx_steps_status ON steps(status);
+CREATE INDEX IF NOT EXISTS idx_steps_strategy ON steps(strategy, status);
+"""
+
+# Columns accepted by `summary --by`, mapped to their SQL expression.
+GROUP_COLUMNS = {
+    "scenario": "r.scenario",
+    "device": "r.device_serial",
+    "section": "s.section",
+    "step": "s.step_index",
+    "status": "s.status",
+    "strategy": "s.strategy",
+    "day": "substr(r.start_time, 1, 10)",
+}
+
+
+class HistoryError(Exception):
+    """Raised when the run history database cannot be used."""
+
+
+def parse_since(value: str) -> str:
+    """Convert an age ('7d', '12h', '30m') or ISO8601 string to ISO8601.
+
+    Args:
+        value: Relative age or absolute timestamp.
+
+    Returns:
+        ISO8601 timestamp in UTC.
+    """
+    match = re.fullmatch(r"(\d+)([dhm])", value.strip())
+    if match:
+        amount = int(match.group(1))
+        unit = {"d": "days", "h": "hours", "m": "minutes"}[match.group(2)]
+        since = datetime.now(timezone.utc) - timedelta(**{unit: amount})
+        return since.isoformat()
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError as e:
+        raise HistoryError(f"Invalid --since value: {value}") from e
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc).isoformat()
+
+
+class RunHistory:
+    """SQLite index over result.json files."""
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(db_path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self) -> "RunHistory":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def ingest_result(self, result_path: str, force: bool = False) -> bool:
+        """Ingest a single result.json.
+
+        Already ingested files are skipped unless their size or mtime
+        changed (or `force` is set), in which case they are replaced.
+
+        Args:
+            result_path: Path to result.json (or its directory).
+            force: Re-ingest even if unchanged.
+
+        Returns:
+            True if the file was (re)ingested.
+        """
+        if os.path.isdir(result_path):
+            result_path = os.path.join(result_path, "result.json")
+        path = os.path.abspath(result_path)
+        stat = os.stat(path)
+
+        row = self.conn.execute(
+            "SELECT id, result_mtime_ns, result_size FROM runs "
+            "WHERE result_path = ?",
+            (path,),
+        ).fetchone()
+        if (
+            row
+            and not force
+            and row["result_mtime_ns"] == stat.st_mtime_ns
+            and row["result_size"] == stat.st_size
+        ):
+            return False
+
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                result = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"WARNING: Skipping unreadable result {path}: {e}")
+            return False
+
+        with self.conn:
+            if row:
+                self.conn.execute("DELETE FROM runs WHERE id = ?", (row["id"],))
+            run_id = self._insert_run(path, stat, result)
+            self._insert_steps(run_id, result.get("steps", []))
+            self._insert_latency(run_id, result.get("adb_latency", {}))
+        return True
+
+    def ingest_tree(self, root: str, force: bool = False) -> int:
+        """Ingest every result.json below a directory.
+
+        Args:
+            root: Directory to scan (or a single result.json).
+            force: Re-ingest even if unchanged.
+
+        Returns:
+            Number of files (re)ingested.
+        """
+        if os.path.isfile(root):
+            return int(self.ingest_result(root, force))
+
+        count = 0
+        for dirpath, _, filenames in os.walk(root):
+            if "result.json" in filenames:
+                if self.ingest_result(
+                    os.path.join(dirpath, "result.json"), force
+                ):
+                    count += 1
+        return count
+
+    def _insert_run(
+        self, path: str, stat: os.stat_result, result: dict
+    ) -> int:
+        scenario = result.get("scenario", {})
+        device = result.get("device", {})
+        execution = result.get("execution", {})
+        summary = result.get("summary", {})
+        cursor = self.conn.execute(
+            "INSERT INTO runs (result_path, result_mtime_ns, result_size, "
+            "scenario, scenario_file, device_serial, device_model, mode, "
+            "start_time, end_time, total_steps, passed, failed, skipped, "
+            "ai_required, ingested_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                path,
+                stat.st_mtime_ns,
+                stat.st_size,
+                scenario.get("name") or Path(path).parent.name,
+                scenario.get("file", ""),
+                device.get("serial", ""),
+                device.get("model", ""),
+                execution.get("mode", ""),
+                _normalize_time(execution.get("start_time", "")),
+                _normalize_time(execution.get("end_time", "")),
+                summary.get("total_steps"),
+                summary.get("passed"),
+                summary.get("failed"),
+                summary.get("skipped"),
+                summary.get("ai_required"),
+                datetime.now(timezone.utc).isoformat(),
+            ),
+        )
+        return cursor.lastrowid
+
+    def _insert_steps(self, run_id: int, steps: list[dict]) -> None:
+        rows = []
+        for step in steps:
+            execution = step.get("execution", {})
+            error = execution.get("error") or execution.get("reason")
+            rows.append((
+                run_id,
+                step.get("index", 0),
+                step.get("section", ""),
+                step.get("action_type", ""),
+                step.get("action", ""),
+                step.get("status", ""),
+                execution.get("strategy") or execution.get("method", ""),
+                execution.get("duration_ms"),
+                execution.get("wait_sec"),
+                error,
+            ))
+        # Result files may repeat an index (e.g. AI runs); keep the last.
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO steps (run_id, step_index, section, "
+            "action_type, action, status, strategy, duration_ms, wait_sec, "
+            "error) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+
+    def _insert_latency(self, run_id: int, latency: dict) -> None:
+        self.conn.executemany(
+            "INSERT INTO adb_latency (run_id, command, count, p50_ms, "
+            "p95_ms, p99_ms, max_ms) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    run_id,
+                    command,
+                    stats.get("count"),
+                    stats.get("p50_ms"),
+                    stats.get("p95_ms"),
+                    stats.get("p99_ms"),
+                    stats.get("max_ms"),
+                )
+                for command, stats in latency.items()
+            ],
+        )
+
+    def recent_step_history(
+        self, scenario: str, device_model: str, runs: int = 20
+    ) -> list[dict]:
+        """Return step rows of the most recent runs of a scenario.
+
+        Args:
+            scenario: Scenario name.
+            device_model: Device model; runs on other models are ignored.
+            runs: Number of most recent runs to include.
+
+        Returns:
+            Row dicts ordered newest run first, then by step index.
+        """
+        sql = (
+            "SELECT r.id AS run_id, r.start_time, s.step_index, s.status, "
+            "s.strategy, s.duration_ms, s.wait_sec "
+            "FROM steps s JOIN ("
+            "  SELECT id, start_time FROM runs "
+            "  WHERE scenario = ? AND device_model = ? "
+            "  ORDER BY start_time DESC LIMIT ?"
+            ") r ON r.id = s.run_id "
+            "ORDER BY r.start_time DESC, s.step_index"
+        )
+        return [
+            dict(row)
+            for row in self.conn.execute(sql, (scenario, device_model, runs))
+        ]
+
+    def latency_history(
+        self, device_model: str, runs: int = 50, scenario: str | None = None
+    ) -> dict[str, list[float]]:
+        """Return per-command p99 latencies of recent runs on a model.
+
+        Args:
+            device_model: Device model name.
+            runs: Number of most recent runs to include.
+            scenario: Only include runs of this scenario.
+
+        Returns:
+            Dict of command kind -> list of per-run p99 latencies (ms).
+        """
+        where = "device_model = ?"
+        params: list = [device_model]
+        if scenario is not None:
+            where += " AND scenario = ?"
+            params.append(scenario)
+        sql = (
+            "SELECT l.command, l.p99_ms FROM adb_latency l JOIN ("
+            f"  SELECT id FROM runs WHERE {where} "
+            "  ORDER BY start_time DESC LIMIT ?"
+            ") r ON r.id = l.run_id"
+        )
+        history: dict[str, list[float]] = {}
+        for row in self.conn.execute(sql, (*params, runs)):
+            if row["p99_ms"] is not None:
+                history.setdefault(row["command"], []).append(row["p99_ms"])
+        return history
+
+    def _where(self, filters: dict) -> tuple[str, list]:
+        clauses = []
+        params: list = []
+        column_map = {
+            "scenario": "r.scenario",
+            "device": "r.device_serial",
+            "section": "s.section",
+            "step": "s.step_index",
+            "status": "s.status",
+            "strategy": "s.strategy",
+        }
+        for key, column in column_map.items():
+            value = filters.get(key)
+            if value is not None and value != "":
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if filters.get("since"):
+            clauses.append("r.start_time >= ?")
+            params.append(parse_since(filters["since"]))
+        where = " WHERE " + " AND ".join(clauses) if clauses else ""
+        return where, params
+
+    def query_steps(self, limit: int | None = None, **filters) -> list[dict]:
+        """Query step rows joined with their run.
+
+        Args:
+            limit: Maximum number of rows.
+            **filters: scenario, device, section, step, status, strategy,
+                since.
+
+        Returns:
+            List of row dicts, newest run first.
+        """
+        where, params = self._where(filters)
+        sql = (
+            "SELECT r.start_time, r.scenario, r.device_serial, "
+            "s.step_index, s.section, s.action_type, s.action, s.status, "
+            "s.strategy, s.duration_ms, s.wait_sec, s.error, r.result_path "
+            "FROM steps s JOIN runs r ON r.id = s.run_id"
+            f"{where} ORDER BY r.start_time DESC, s.step_index"
+        )
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [dict(row) for row in self.conn.execute(sql, params)]
+
+    def summarize(self, by: str, **filters) -> list[dict]:
+        """Aggregate step counts and durations grouped by a column.
+
+        Args:
+            by: One of GROUP_COLUMNS.
+            **filters: Same filters as query_steps().
+
+        Returns:
+            List of dicts with the group key, counts and mean duration.
+        """
+        if by not in GROUP_COLUMNS:
+            raise HistoryError(
+                f"Unknown group column: {by} "
+                f"(choose from {', '.join(GROUP_COLUMNS)})"
+            )
+        column = GROUP_COLUMNS[by]
+        where, params = self._where(filters)
+        sql = (
+            f"SELECT {column} AS key, COUNT(*) AS steps, "
+            "SUM(s.status = 'passed') AS passed, "
+            "SUM(s.status = 'failed') AS failed, "
+            "SUM(s.status = 'skipped') AS skipped, "
+            "SUM(s.status = 'ai_required') AS ai_required, "
+            "ROUND(AVG(s.duration_ms)) AS avg_duration_ms "
+            "FROM steps s JOIN runs r ON r.id = s.run_id"
+            f"{where} GROUP BY key ORDER BY steps DESC"
+        )
+        return [dict(row) for row in self.conn.execute(sql, params)]
+
+
+def _normalize_time(value: str) -> str:
+    """Normalize an ISO8601 timestamp to UTC so string ordering works."""
+    if not value:
+        return ""
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return value
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc).isoformat()
+
+
+def _print_rows(rows: list[dict], as_json: bool) -> None:
+    if as_json:
+        for row in rows:
+            print(json.dumps(row, ensure_ascii=False))
+        return
+    if not rows:
+        print("No matching rows.")
+        return
+    columns = [c for c in rows[0] if c != "result_path"]
+    print("\t".join(columns))
+    for row in rows:
+        print("\t".join("" if row[c] is None else str(row[c]) for c in columns))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="uiai run history index")
+    parser.add_argument(
+        "--db", default=DEFAULT_DB_PATH, help="Database path"
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    ingest = sub.add_parser("ingest", help="Ingest result directories")
+    ingest.add_argument(
+        "paths", nargs="+", help="Result directories or result.json files"
+    )
+    ingest.add_argument(
+        "--force", action="store_true", help="Re-ingest unchanged files"
+    )
+    ingest.add_argument(
+        "--watch",
+        type=float,
+        default=0,
+        help="Keep polling for new results every N seconds",
+    )
+
+    for name in ("query", "summary"):
+        p = sub.add_parser(name)
+        p.add_argument("--scenario")
+        p.add_argument("--device")
+        p.add_argument("--section")
+        p.add_argument("--step", type=int)
+        p.add_argument("--status")
+        p.add_argument("--strategy")
+        p.add_argument("--since")
+        p.add_argument("--json", action="store_true")
+        if name == "query":
+            p.add_argument("--limit", type=int, default=100)
+        else:
+            p.add_argument(
+                "--by", default="strategy", choices=sorted(GROUP_COLUMNS)
+            )
+
+    args = parser.parse_args()
+
+    try:
+        with RunHistory(args.db) as history:
+            if args.command == "ingest":
+                while True:
+                    count = sum(
+                        history.ingest_tree(p, args.force) for p in args.paths
+                    )
+                    print(f"Ingested {count} result(s) into {args.db}")
+                    if not args.watch:
+                        break
+                    time.sleep(args.watch)
+                return
+
+            filters = {
+                "scenario": args.scenario,
+                "device": args.device,
+                "section": args.section,
+                "step": args.step,
+                "status": args.status,
+                "strategy": args.strategy,
+                "since": args.since,
+            }
+            if args.command == "query":
+                rows = history.query_steps(limit=args.limit, **filters)
+            else:
+                rows = history.summarize(args.by, **filters)
+            _print_rows(rows, args.json)
+    except HistoryError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(2)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,483 @@
+#!/usr/bin/env python3
+"""Static HTML report for uiai result directories.
+
+Scans result directories for `result.json` files and writes:
+
+- `index.html`: suite page with one row per run (status counts, pass
+  rate, failing steps), small enough to load quickly for large suites.
+- `runs/<run>.html`: one page per run with a row per step. Screenshot
+  thumbnails load lazily; each links to a downscaled preview and the
+  full-resolution original.
+
+Thumbnails and previews are JPEGs generated in a process pool (with
+Pillow, or ffmpeg when Pillow is not installed; without either, pages
+reference the originals). Generation is incremental: runs whose
+result.json is unchanged (size and mtime) keep their page, and images
+whose derivatives are newer than the original are not processed again.
+
+Usage:
+    python scripts/report.py <path>... [options]
+
+Options:
+    --output <dir>        Report directory (default: .adb-test/report)
+    --workers <n>         Image worker processes (default: CPU count)
+    --thumb-width <px>    Thumbnail width (default: 240)
+    --preview-width <px>  Preview width (default: 720)
+    --force               Regenerate every page and image
+"""
+
+import argparse
+import hashlib
+import html
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent))
+
+from utils.image_variants import image_backend
+
+DEFAULT_REPORT_DIR = ".adb-test/report"
+MANIFEST = "manifest.json"
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp")
+STATUSES = ("passed", "failed", "skipped", "ai_required")
+
+STYLE = """
+body { font-family: system-ui, sans-serif; margin: 1.5rem; color: #222; }
+table { border-collapse: collapse; width: 100%; }
+th, td { border-bottom: 1px solid #ddd; padding: .35rem .5rem;
+         text-align: left; vertical-align: top; }
+th { background: #f4f4f4; position: sticky; top: 0; }
+tbody tr { content-visibility: auto; contain-intrinsic-size: auto 120px; }
+.passed { color: #1a7f37; } .failed { color: #cf222e; font-weight: 600; }
+.skipped { color: #6e7781; } .ai_required { color: #9a6700; }
+.thumbs a { display: inline-block; margin-right: .4rem; text-align: center;
+            font-size: .75rem; color: #555; }
+.thumbs img { display: block; width: 120px; border: 1px solid #ccc; }
+.muted { color: #6e7781; font-size: .85rem; }
+"""
+
+
+class ReportError(Exception):
+    """Raised when no results can be reported."""
+
+
+def _resize(job: tuple[str, str, list[tuple[str, int]]]) -> int:
+    """Write downscaled JPEGs of one image (runs in a worker process).
+
+    The source is decoded once; outputs are produced largest first, each
+    from the previous one.
+
+    Returns:
+        Number of outputs written.
+    """
+    backend, src, outputs = job
+    outputs = sorted(outputs, key=lambda o: -o[1])
+    written = 0
+    try:
+        if backend == "pillow":
+            from PIL import Image
+
+            with Image.open(src) as img:
+                img = img.convert("RGB")
+                for dst, width in outputs:
+                    img.thumbnail((width, width * 4), reducing_gap=2.0)
+                    img.save(dst + ".tmp", "JPEG", quality=80)
+                    os.replace(dst + ".tmp", dst)
+                    written += 1
+            return written
+        for dst, width in outputs:
+            proc = subprocess.run(
+                [
+                    "ffmpeg", "-v", "error", "-y", "-i", src,
+                    "-vf", f"scale='min({width},iw)':-2", "-q:v", "5",
+                    "-f", "mjpeg", dst + ".tmp",
+                ],
+                capture_output=True,
+            )
+            if proc.returncode != 0:
+                break
+            os.replace(dst + ".tmp", dst)
+            written += 1
+    except (OSError, ValueError):
+        pass
+    for dst, _ in outputs:
+        if os.path.exists(dst + ".tmp"):
+            os.remove(dst + ".tmp")
+    return written
+
+
+def find_results(paths: list[str]) -> list[str]:
+    """Absolute paths of every result.json below the given paths."""
+    found = []
+    for path in paths:
+        if os.path.isfile(path):
+            found.append(os.path.abspath(path))
+            continue
+        for dirpath, dirnames, filenames in os.walk(path):
+            dirnames.sort()
+            if "result.json" in filenames:
+                found.append(os.path.abspath(os.path.join(dirpath, "result.json")))
+    return sorted(set(found))
+
+
+def run_id(result_path: str, result: dict) -> str:
+    """Stable page name for a run: scenario name plus a path hash."""
+    name = result.get("scenario", {}).get("name") or "run"
+    name = "".join(c if c.isalnum() or c in "-_" else "_" for c in name)
+    digest = hashlib.blake2b(result_path.encode("utf-8"), digest_size=4)
+    return f"{name}-{digest.hexdigest()}"
+
+
+def _images(step: dict) -> list[tuple[str, str]]:
+    """(evidence key, file name) of the image evidence of a step.
+
+    AI screenshot variants (`ai_*` keys) duplicate the screenshots and
+    are left out.
+    """
+    return [
+        (key, value)
+        for key, value in step.get("evidence", {}).items()
+        if isinstance(value, str)
+        and value.lower().endswith(IMAGE_EXTENSIONS)
+        and not key.startswith("ai_")
+    ]
+
+
+class ReportBuilder:
+    """Builds and incrementally updates a static HTML report."""
+
+    def __init__(
+        self,
+        output_dir: str = DEFAULT_REPORT_DIR,
+        workers: int | None = None,
+        thumb_width: int = 240,
+        preview_width: int = 720,
+        force: bool = False,
+    ):
+        self.output_dir = output_dir
+        self.workers = workers
+        self.widths = {"thumb": thumb_width, "preview": preview_width}
+        self.force = force
+        self.backend = image_backend()
+        self.manifest_path = os.path.join(output_dir, MANIFEST)
+        self.manifest: dict[str, dict] = {}
+        if not force and os.path.exists(self.manifest_path):
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                self.manifest = json.load(f).get("runs", {})
+
+    def build(self, paths: list[str]) -> dict:
+        """Update the report for every result.json below `paths`.
+
+        Returns:
+            Stats: runs, pages_written, images_processed, duration_ms.
+        """
+        started = time.monotonic()
+        result_paths = find_results(paths)
+        if not result_paths and not self.manifest:
+            raise ReportError(f"No result.json found in: {', '.join(paths)}")
+
+        os.makedirs(os.path.join(self.output_dir, "runs"), exist_ok=True)
+        changed = []
+        for path in result_paths:
+            stat = os.stat(path)
+            entry = self.manifest.get(path)
+            if (
+                entry
+                and entry["mtime_ns"] == stat.st_mtime_ns
+                and entry["size"] == stat.st_size
+                and os.path.exists(os.path.join(self.output_dir, entry["page"]))
+            ):
+                continue
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    result = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"WARNING: Skipping unreadable result {path}: {e}")
+                continue
+            changed.append((path, stat, result))
+
+        jobs = []
+        for path, _, result in changed:
+            jobs.extend(self._image_jobs(path, result))
+        processed = self._process_images(jobs)
+
+        for path, stat, result in changed:
+            self.manifest[path] = self._write_run_page(path, stat, result)
+        # Runs whose results were deleted drop out of the suite page.
+        for path in list(self.manifest):
+            if not os.path.exists(path):
+                del self.manifest[path]
+
+        self._write_index()
+        with open(self.manifest_path, "w", encoding="utf-8") as f:
+            json.dump({"runs": self.manifest}, f, ensure_ascii=False, indent=2)
+        return {
+            "runs": len(self.manifest),
+            "pages_written": len(changed),
+            "images_processed": processed,
+            "duration_ms": int((time.monotonic() - started) * 1000),
+        }
+
+    def _derived(self, rid: str, name: str, kind: str) -> str:
+        return os.path.join(
+            self.output_dir, "media", rid, f"{Path(name).stem}.{kind}.jpg"
+        )
+
+    def _image_jobs(self, result_path: str, result: dict) -> list[tuple]:
+        if self.backend is None:
+            return []
+        rid = run_id(result_path, result)
+        result_dir = os.path.dirname(result_path)
+        jobs = []
+        for step in result.get("steps", []):
+            for _, name in _images(step):
+                src = os.path.join(result_dir, name)
+                if not os.path.exists(src):
+                    continue
+                mtime = os.path.getmtime(src)
+                outputs = [
+                    (self._derived(rid, name, kind), width)
+                    for kind, width in self.widths.items()
+                ]
+                stale = [
+                    (dst, width) for dst, width in outputs
+                    if self.force
+                    or not os.path.exists(dst)
+                    or os.path.getmtime(dst) < mtime
+                ]
+                if stale:
+                    jobs.append((self.backend, src, stale))
+        return jobs
+
+    def _process_images(self, jobs: list[tuple]) -> int:
+        """Resize images in a process pool; returns the number of sources."""
+        if not jobs:
+            return 0
+        expected = 0
+        for _, _, outputs in jobs:
+            expected += len(outputs)
+            for dst, _ in outputs:
+                os.makedirs(os.path.dirname(dst), exist_ok=True)
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            written = sum(pool.map(_resize, jobs, chunksize=4))
+        if written < expected:
+            print(f"WARNING: {expected - written} image(s) could not be resized")
+        return len(jobs)
+
+    def _media_link(self, rid: str, result_dir: str, name: str) -> tuple[str, str, str]:
+        """(thumbnail, preview, full) URLs relative to the run page."""
+        runs_dir = os.path.join(self.output_dir, "runs")
+        full = os.path.relpath(os.path.join(result_dir, name), runs_dir)
+        urls = []
+        for kind in ("thumb", "preview"):
+            derived = self._derived(rid, name, kind)
+            urls.append(
+                os.path.relpath(derived, runs_dir)
+                if os.path.exists(derived)
+                else full
+            )
+        return urls[0], urls[1], full
+
+    def _step_row(self, rid: str, result_dir: str, step: dict) -> str:
+        esc = html.escape
+        execution = step.get("execution", {})
+        verification = step.get("verification", {})
+        status = step.get("status", "")
+
+        thumbs = []
+        for key, name in _images(step):
+            thumb, preview, full = self._media_link(rid, result_dir, name)
+            label = key.replace("screenshot_", "")
+            thumbs.append(
+                f'<a href="{esc(preview)}" title="{esc(name)}">'
+                f'<img loading="lazy" decoding="async" src="{esc(thumb)}" alt="{esc(label)}">'
+                f'{esc(label)}</a> <a class="muted" href="{esc(full)}">full</a>'
+            )
+        links = []
+        evidence = step.get("evidence", {})
+        if evidence.get("uitree"):
+            uitree = os.path.relpath(
+                os.path.join(result_dir, evidence["uitree"]),
+                os.path.join(self.output_dir, "runs"),
+            )
+            links.append(f'<a href="{esc(uitree)}">uitree</a>')
+        video = evidence.get("video")
+        if isinstance(video, dict) and video.get("file"):
+            src = os.path.relpath(
+                os.path.join(result_dir, video["file"]),
+                os.path.join(self.output_dir, "runs"),
+            )
+            links.append(
+                f'<a href="{esc(src)}#t={video.get("before_sec", 0)}">video</a>'
+            )
+        if "uitree_diff" in step:
+            diff = step["uitree_diff"]
+            links.append(
+                "unchanged" if diff.get("unchanged") else
+                f"diff +{diff.get('added', 0)} -{diff.get('removed', 0)} "
+                f"~{diff.get('changed', 0)}"
+            )
+
+        reason = verification.get("reason") or step.get("error", "")
+        return (
+            f'<tr id="step-{step.get("index")}">'
+            f"<td>{step.get('index')}</td>"
+            f"<td>{esc(str(step.get('section', '')))}</td>"
+            f"<td>{esc(str(step.get('action_type', '')))}: {esc(str(step.get('action', '')))}"
+            f'<div class="muted">{esc(str(reason))}</div></td>'
+            f'<td class="{esc(status)}">{esc(status)}</td>'
+            f"<td>{esc(str(execution.get('strategy', '')))}</td>"
+            f"<td>{execution.get('duration_ms', '')}</td>"
+            f'<td class="thumbs">{"".join(thumbs)}'
+            f'<div class="muted">{" · ".join(links)}</div></td>'
+            "</tr>"
+        )
+
+    def _write_run_page(self, result_path: str, stat: os.stat_result, result: dict) -> dict:
+        esc = html.escape
+        rid = run_id(result_path, result)
+        result_dir = os.path.dirname(result_path)
+        steps = result.get("steps", [])
+        summary = result.get("summary", {})
+        scenario = result.get("scenario", {})
+        device = result.get("device", {})
+        execution = result.get("execution", {})
+
+        rows = "\n".join(self._step_row(rid, result_dir, s) for s in steps)
+        counts = " · ".join(
+            f'<span class="{s}">{s}: {summary.get(s, 0)}</span>' for s in STATUSES
+        )
+        page = f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8">
+<title>{esc(scenario.get('name', rid))}</title>
+<style>{STYLE}</style></head><body>
+<p><a href="../index.html">&larr; All runs</a></p>
+<h1>{esc(scenario.get('name', rid))}</h1>
+<p class="muted">{esc(scenario.get('file', ''))} · device {esc(str(device.get('serial', '')))}
+{esc(str(device.get('model', '')))} · {esc(str(execution.get('start_time', '')))}
+· {esc(result_dir)}</p>
+<p>{counts} · pass rate {summary.get('pass_rate', 0)}%</p>
+<table><thead><tr><th>#</th><th>Section</th><th>Step</th><th>Status</th>
+<th>Strategy</th><th>ms</th><th>Evidence</th></tr></thead>
+<tbody>
+{rows}
+</tbody></table>
+</body></html>
+"""
+        page_path = os.path.join("runs", f"{rid}.html")
+        with open(os.path.join(self.output_dir, page_path), "w", encoding="utf-8") as f:
+            f.write(page)
+
+        return {
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "page": page_path,
+            "scenario": scenario.get("name", ""),
+            "device": device.get("serial", ""),
+            "start_time": execution.get("start_time", ""),
+            "summary": {k: summary.get(k, 0) for k in (*STATUSES, "total_steps", "pass_rate")},
+            "failures": [
+                s.get("index") for s in steps if s.get("status") == "failed"
+            ][:20],
+        }
+
+    def _write_index(self) -> None:
+        esc = html.escape
+        runs = sorted(
+            self.manifest.values(),
+            key=lambda r: (r.get("start_time") or "", r["page"]),
+            reverse=True,
+        )
+        totals = {s: sum(r["summary"].get(s, 0) for r in runs) for s in STATUSES}
+        rows = []
+        for run in runs:
+            s = run["summary"]
+            failures = ", ".join(
+                f'<a href="{esc(run["page"])}#step-{i}">{i}</a>' for i in run["failures"]
+            )
+            state = "failed" if s.get("failed") else "passed"
+            rows.append(
+                f'<tr><td><a href="{esc(run["page"])}">{esc(run["scenario"])}</a></td>'
+                f"<td>{esc(str(run['device']))}</td>"
+                f"<td>{esc(str(run['start_time']))}</td>"
+                f'<td class="{state}">{s.get("passed", 0)}/{s.get("total_steps", 0)}'
+                f" ({s.get('pass_rate', 0)}%)</td>"
+                f"<td>{s.get('failed', 0)}</td><td>{s.get('ai_required', 0)}</td>"
+                f"<td>{failures}</td></tr>"
+            )
+        counts = " · ".join(
+            f'<span class="{s}">{s}: {totals[s]}</span>' for s in STATUSES
+        )
+        page = f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>uiai report</title>
+<style>{STYLE}</style></head><body>
+<h1>uiai report</h1>
+<p>{len(runs)} runs · {counts}</p>
+<table><thead><tr><th>Scenario</th><th>Device</th><th>Started</th><th>Passed</th>
+<th>Failed</th><th>AI</th><th>Failed steps</th></tr></thead>
+<tbody>
+{chr(10).join(rows)}
+</tbody></table>
+</body></html>
+"""
+        with open(os.path.join(self.output_dir, "index.html"), "w", encoding="utf-8") as f:
+            f.write(page)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Build a static HTML report from uiai result directories"
+    )
+    parser.add_argument(
+        "paths", nargs="+", help="Result directories or result.json files"
+    )
+    parser.add_argument(
+        "--output", "-o", default=DEFAULT_REPORT_DIR, help="Report directory"
+    )
+    parser.add_argument(
+        "--workers", type=int, help="Image worker processes (default: CPU count)"
+    )
+    parser.add_argument(
+        "--thumb-width", type=int, default=240, help="Thumbnail width in pixels"
+    )
+    parser.add_argument(
+        "--preview-width", type=int, default=720, help="Preview width in pixels"
+    )
+    parser.add_argument(
+        "--force", action="store_true", help="Regenerate every page and image"
+    )
+    args = parser.parse_args()
+
+    builder = ReportBuilder(
+        output_dir=args.output,
+        workers=args.workers,
+        thumb_width=args.thumb_width,
+        preview_width=args.preview_width,
+        force=args.force,
+    )
+    if builder.backend is None:
+        print(
+            "WARNING: Neither Pillow nor ffmpeg is available; "
+            "the report links full-size screenshots"
+        )
+    try:
+        stats = builder.build(args.paths)
+    except ReportError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(2)
+    print(
+        f"Report: {os.path.join(args.output, 'index.html')} "
+        f"({stats['runs']} runs, {stats['pages_written']} pages written, "
+        f"{stats['images_processed']} images processed, {stats['duration_ms']}ms)"
+    )
+
+
+if __name__ == "__main__":
+    main()
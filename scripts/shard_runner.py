@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+"""Section-level sharding of a compiled scenario across devices.
+
+Splits a compiled scenario at section boundaries, runs each shard on its
+own device and merges the shard results back into one result.json in
+step order. Every shard except the first starts with a synthetic
+`replay` step that re-runs the `do` actions of all preceding sections to
+reach its starting state.
+
+Usage:
+    python scripts/shard_runner.py <compiled.json> [options]
+
+Options:
+    --devices <a,b,...>   Device serials (default: all connected devices)
+    --shards <n>          Number of shards (default: number of devices)
+    --output-dir <path>   Output directory for merged results
+    --skip-ai             Skip AI checkpoint steps (mark as skipped)
+    --variables KEY=VAL   Override variables (repeatable)
+    --fail-fast <policy>  off, abort, section or dependents (see
+                          compiled_runner.py; applies within each shard)
+    --trace               Write a Chrome trace-event timeline with one track
+                          per device to <output-dir>/trace.json
+    --snapshots           Emulators only: snapshot each shard's setup state
+                          and restore it instead of replaying on later runs
+"""
+
+import argparse
+import copy
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from backends.adb_backend import ADBBackend, ADBError
+from compiled_runner import (
+    FAIL_FAST_POLICIES,
+    CompiledRunner,
+    CompiledRunnerError,
+    summarize_steps,
+)
+from utils.trace import Tracer
+
+# Index of the synthetic prerequisite replay step at the head of a shard.
+SETUP_INDEX = 0
+
+# Relative cost of a replayed step versus a fully executed step
+# (replayed steps skip screenshots, UITree evidence and assertions).
+REPLAY_WEIGHT = 0.5
+
+
+def split_sections(steps: list[dict]) -> list[tuple[str, list[dict]]]:
+    """Group compiled steps into consecutive (section, steps) runs."""
+    sections: list[tuple[str, list[dict]]] = []
+    for step in steps:
+        section = step.get("section", "")
+        if sections and sections[-1][0] == section:
+            sections[-1][1].append(step)
+        else:
+            sections.append((section, [step]))
+    return sections
+
+
+def _replayable(steps: list[dict]) -> list[dict]:
+    """Collect the `do` actions of steps as replay expanded_steps."""
+    expanded = []
+    for step in steps:
+        if step.get("type") == "do":
+            expanded.append({
+                "section": step.get("section", ""),
+                "type": "do",
+                "original": step.get("original", ""),
+                "compiled": step.get("compiled", {}),
+            })
+        elif step.get("type") == "replay":
+            expanded.extend(
+                step.get("compiled", {}).get("expanded_steps", [])
+            )
+    return expanded
+
+
+def _partition(weights: list[int], replay_costs: list[float], k: int) -> list[int]:
+    """Choose contiguous section cut points minimizing the slowest shard.
+
+    Args:
+        weights: Step count per section.
+        replay_costs: Cost of replaying the prefix before each section.
+        k: Number of shards.
+
+    Returns:
+        Start section index of each shard.
+    """
+    n = len(weights)
+    k = max(1, min(k, n))
+    prefix = [0]
+    for w in weights:
+        prefix.append(prefix[-1] + w)
+
+    def cost(i: int, j: int) -> float:
+        return prefix[j] - prefix[i] + replay_costs[i]
+
+    inf = float("inf")
+    # best[s][j]: minimal max cost covering sections [0, j) with s shards
+    best = [[inf] * (n + 1) for _ in range(k + 1)]
+    cut = [[0] * (n + 1) for _ in range(k + 1)]
+    best[0][0] = 0
+    for s in range(1, k + 1):
+        for j in range(s, n + 1):
+            for i in range(s - 1, j):
+                value = max(best[s - 1][i], cost(i, j))
+                if value < best[s][j]:
+                    best[s][j] = value
+                    cut[s][j] = i
+
+    starts = []
+    j = n
+    for s in range(k, 0, -1):
+        i = cut[s][j]
+        starts.append(i)
+        j = i
+    return sorted(starts)
+
+
+def plan_shards(compiled: dict, shard_count: int) -> list[dict]:
+    """Split a compiled scenario into per-shard compiled scenarios.
+
+    Args:
+        compiled: Parsed compiled.json.
+        shard_count: Desired number of shards (capped at section count).
+
+    Returns:
+        List of compiled dicts, one per shard, in scenario order.
+    """
+    sections = split_sections(compiled.get("steps", []))
+    if not sections:
+        return []
+
+    replay_costs = []
+    replayed = 0
+    for _, steps in sections:
+        replay_costs.append(replayed * REPLAY_WEIGHT)
+        replayed += len(_replayable(steps))
+
+    starts = _partition(
+        [len(steps) for _, steps in sections], replay_costs, shard_count
+    )
+    bounds = list(zip(starts, starts[1:] + [len(sections)]))
+
+    shards = []
+    for number, (start, end) in enumerate(bounds, 1):
+        shard = {k: v for k, v in compiled.items() if k != "steps"}
+        shard_steps = [
+            step for _, steps in sections[start:end] for step in steps
+        ]
+        shard_steps = copy.deepcopy(shard_steps)
+        prior = [step for _, steps in sections[:start] for step in steps]
+        if prior:
+            first, last = sections[0][0], sections[start - 1][0]
+            shard_steps.insert(0, {
+                "index": SETUP_INDEX,
+                "section": last,
+                "type": "replay",
+                "original": f"shard setup: replay {first} -> {last}",
+                "replay_source": {"from": first, "to": last},
+                # The shard's own sections start from the state it sets up.
+                "leads_to": sections[start][0],
+                "compiled": {
+                    "strategy": "replay",
+                    "expanded_steps": _replayable(prior),
+                },
+            })
+        shard["steps"] = shard_steps
+        shard["shard"] = {
+            "number": number,
+            "sections": [name for name, _ in sections[start:end]],
+        }
+        shards.append(shard)
+    return shards
+
+
+class ShardedRunner:
+    """Runs the shards of one compiled scenario on several devices."""
+
+    def __init__(
+        self,
+        compiled_path: str,
+        devices: list[str],
+        shard_count: int | None = None,
+        output_dir: str | None = None,
+        snapshots: bool = False,
+        trace: bool = False,
+        **runner_kwargs,
+    ):
+        if not devices:
+            raise CompiledRunnerError("No ADB devices available for sharding")
+        self.compiled_path = compiled_path
+        self.devices = devices
+        self.snapshots = snapshots
+        self.runner_kwargs = runner_kwargs
+        self.tracer = Tracer() if trace else None
+
+        with open(compiled_path, "r", encoding="utf-8") as f:
+            self.compiled = json.load(f)
+
+        self.shards = plan_shards(
+            self.compiled, min(shard_count or len(devices), len(devices))
+        )
+        if not output_dir:
+            ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+            source = Path(self.compiled.get("source", "compiled")).stem
+            output_dir = f".adb-test/results/{ts}/{source}"
+        self.output_dir = output_dir
+
+    def run(self) -> dict:
+        """Run all shards in parallel and merge their results."""
+        os.makedirs(self.output_dir, exist_ok=True)
+        start_time = datetime.now(timezone.utc).isoformat()
+
+        print(f"Sharding: {self.compiled.get('source', '?')}")
+        for shard, device in zip(self.shards, self.devices):
+            sections = shard["shard"]["sections"]
+            print(
+                f"  shard {shard['shard']['number']} on {device}: "
+                f"{sections[0]} .. {sections[-1]} "
+                f"({len(shard['steps'])} steps)"
+            )
+        print()
+
+        with ThreadPoolExecutor(max_workers=len(self.shards)) as pool:
+            shard_results = list(
+                pool.map(self._run_shard, self.shards, self.devices)
+            )
+
+        result = self._merge(shard_results, start_time)
+        if self.tracer is not None:
+            result["trace"] = self.tracer.export(
+                os.path.join(self.output_dir, "trace.json")
+            )
+        result_path = os.path.join(self.output_dir, "result.json")
+        with open(result_path, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+        self._print_summary(result)
+        return result
+
+    def _run_shard(self, shard: dict, device: str) -> dict:
+        number = shard["shard"]["number"]
+        shard_dir = os.path.join(self.output_dir, f"shard_{number:02d}")
+        started = time.monotonic()
+        kwargs = dict(self.runner_kwargs)
+        setup = shard["steps"][0] if shard["steps"] else {}
+        if self.snapshots and setup.get("index") == SETUP_INDEX:
+            # The setup replay ends in the state after its last section.
+            kwargs["snapshot_after"] = [
+                *kwargs.get("snapshot_after", []), setup["section"]
+            ]
+        runner = CompiledRunner(
+            compiled_path=self.compiled_path,
+            device=device,
+            output_dir=shard_dir,
+            compiled=shard,
+            tracer=self.tracer,
+            **kwargs,
+        )
+        try:
+            if self.tracer is not None:
+                with self.tracer.track(device).span(
+                    f"shard {number}", sections=shard["shard"]["sections"]
+                ):
+                    result = runner.run()
+            else:
+                result = runner.run()
+        except (CompiledRunnerError, ADBError) as e:
+            print(f"Shard {number} ({device}) aborted: {e}")
+            result = {"steps": runner.results, "error": str(e)}
+        result["shard"] = {
+            **shard["shard"],
+            "device": device,
+            "output_dir": shard_dir,
+            "duration_ms": int((time.monotonic() - started) * 1000),
+        }
+        return result
+
+    def _merge(self, shard_results: list[dict], start_time: str) -> dict:
+        """Merge shard results into a single result in step order."""
+        steps = []
+        shards = []
+        for shard_result in shard_results:
+            info = dict(shard_result["shard"])
+            rel_dir = os.path.relpath(info["output_dir"], self.output_dir)
+            setup_status = None
+            for step in shard_result.get("steps", []):
+                if step["index"] == SETUP_INDEX:
+                    setup_status = step["status"]
+                    info["setup_replayed_steps"] = len(
+                        step.get("replayed_steps", [])
+                    )
+                    if step["execution"].get("method") == "snapshot":
+                        info["setup_snapshot"] = step["execution"]["snapshot"]
+                    continue
+                step = dict(step)
+                evidence = {}
+                for key, name in step.get("evidence", {}).items():
+                    if key == "video":
+                        name = {**name, "file": os.path.join(rel_dir, name["file"])}
+                    else:
+                        name = os.path.join(rel_dir, name)
+                    evidence[key] = name
+                step["evidence"] = evidence
+                step["shard"] = info["number"]
+                steps.append(step)
+            info["setup_status"] = setup_status
+            if "error" in shard_result:
+                info["error"] = shard_result["error"]
+            shards.append(info)
+        steps.sort(key=lambda s: s["index"])
+
+        return {
+            "scenario": {
+                "name": Path(self.compiled.get("source", "")).stem,
+                "file": self.compiled.get("source", ""),
+                "compiled": True,
+                "compiled_from": self.compiled_path,
+            },
+            "device": {
+                "serial": ",".join(s["device"] for s in shards),
+            },
+            "execution": {
+                "start_time": start_time,
+                "end_time": datetime.now(timezone.utc).isoformat(),
+                "mode": "compiled_sharded",
+            },
+            "summary": summarize_steps(steps),
+            "sharding": {"shards": shards},
+            "steps": steps,
+            "output_dir": self.output_dir,
+        }
+
+    def _print_summary(self, result: dict) -> None:
+        summary = result["summary"]
+        print()
+        print("=" * 50)
+        print("Sharded Execution Complete")
+        print("=" * 50)
+        print()
+        for shard in result["sharding"]["shards"]:
+            print(
+                f"Shard {shard['number']} ({shard['device']}): "
+                f"{shard['duration_ms'] / 1000:.1f}s, "
+                f"setup {shard['setup_status'] or '-'}"
+                + (
+                    f" (snapshot {shard['setup_snapshot']})"
+                    if "setup_snapshot" in shard else ""
+                )
+            )
+        print()
+        print(f"Total Steps:  {summary['total_steps']}")
+        print(f"Passed:       {summary['passed']}")
+        print(f"Failed:       {summary['failed']}")
+        print(f"Skipped:      {summary['skipped']}")
+        print(f"AI Required:  {summary['ai_required']}")
+        print(f"Pass Rate:    {summary['pass_rate']}%")
+        print()
+        if "trace" in result:
+            print(f"Trace:        {result['trace']}")
+        print(f"Results: {os.path.join(self.output_dir, 'result.json')}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Execute a compiled uiai scenario sharded across devices"
+    )
+    parser.add_argument("compiled_json", help="Path to compiled.json")
+    parser.add_argument(
+        "--devices", help="Comma-separated device serials (default: all)"
+    )
+    parser.add_argument("--shards", type=int, help="Number of shards")
+    parser.add_argument("--output-dir", "-o", help="Output directory")
+    parser.add_argument(
+        "--skip-ai", action="store_true", help="Skip AI checkpoint steps"
+    )
+    parser.add_argument(
+        "--variables",
+        "-v",
+        action="append",
+        default=[],
+        help="Override variable (KEY=VALUE, repeatable)",
+    )
+    parser.add_argument(
+        "--fail-fast",
+        choices=FAIL_FAST_POLICIES,
+        help="Fail-fast policy within each shard (default: config.fail_fast or off)",
+    )
+    parser.add_argument(
+        "--trace",
+        action="store_true",
+        help="Write a Chrome trace-event timeline (one track per device)",
+    )
+    parser.add_argument(
+        "--snapshots",
+        action="store_true",
+        help="Emulators only: snapshot shard setup states and restore them",
+    )
+    args = parser.parse_args()
+
+    var_overrides = {}
+    for v in args.variables:
+        if "=" in v:
+            key, val = v.split("=", 1)
+            var_overrides[key] = val
+
+    try:
+        devices = (
+            [d for d in args.devices.split(",") if d]
+            if args.devices
+            else ADBBackend.list_devices()
+        )
+        runner = ShardedRunner(
+            compiled_path=args.compiled_json,
+            devices=devices,
+            shard_count=args.shards,
+            output_dir=args.output_dir,
+            skip_ai=args.skip_ai,
+            variable_overrides=var_overrides,
+            snapshots=args.snapshots,
+            fail_fast=args.fail_fast,
+            trace=args.trace,
+        )
+        result = runner.run()
+        sys.exit(0 if result["summary"]["failed"] == 0 else 1)
+    except CompiledRunnerError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(2)
+    except ADBError as e:
+        print(f"ADB Error: {e}", file=sys.stderr)
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Emulator snapshots of app state after setup sections.
+
+A snapshot captures the emulator after the state-changing steps up to
+the end of a section (its `do` actions and replay expansions). It is
+identified by a state key: a hash of those steps, the resolved
+variables, the app package and the installed app build. Runs that reach
+the same state (later scenarios, soak iterations, shard setups that
+replay the same sections) restore the snapshot instead of executing the
+steps again.
+
+The snapshots are indexed per AVD in `.adb-test/snapshots/<avd>.json`.
+When the installed build of the app changes, snapshots taken with the
+previous build are deleted from the emulator and the index.
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+
+from backends.adb_backend import ADBBackend
+from backends.emulator_console import EmulatorConsole
+
+DEFAULT_INDEX_DIR = ".adb-test/snapshots"
+SNAPSHOT_PREFIX = "uiai-"
+
+
+def state_steps(steps: list[dict]) -> list[dict]:
+    """The state-changing actions of compiled steps, replays expanded."""
+    actions = []
+    for step in steps:
+        if step.get("type") == "do":
+            actions.append(step)
+        elif step.get("type") == "replay":
+            actions.extend(step.get("compiled", {}).get("expanded_steps", []))
+    return [
+        {
+            "section": a.get("section", ""),
+            "original": a.get("original", ""),
+            "compiled": a.get("compiled", {}),
+        }
+        for a in actions
+    ]
+
+
+class SnapshotManager:
+    """Saves, finds and restores state snapshots of one emulator."""
+
+    def __init__(
+        self,
+        console: EmulatorConsole,
+        adb: ADBBackend,
+        package: str,
+        variables: dict | None = None,
+        index_dir: str = DEFAULT_INDEX_DIR,
+    ):
+        self.console = console
+        self.adb = adb
+        self.package = package
+        self.variables = variables or {}
+        avd = "".join(
+            c if c.isalnum() or c in "-_." else "_" for c in console.avd_name()
+        ) or "emulator"
+        self.index_path = os.path.join(index_dir, f"{avd}.json")
+        self.index: dict[str, dict] = self._load_index()
+        self._build: str | None = None
+        self.invalidated: list[str] = []
+
+    def _load_index(self) -> dict[str, dict]:
+        if not os.path.exists(self.index_path):
+            return {}
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                return json.load(f)["snapshots"]
+        except (OSError, ValueError, KeyError):
+            return {}
+
+    def _save_index(self) -> None:
+        os.makedirs(os.path.dirname(self.index_path) or ".", exist_ok=True)
+        with open(self.index_path, "w", encoding="utf-8") as f:
+            json.dump({"snapshots": self.index}, f, ensure_ascii=False, indent=2)
+
+    @property
+    def build(self) -> str:
+        """Installed build of the app ("" if not installed)."""
+        if self._build is None:
+            self._build = self.adb.get_package_build(self.package) or ""
+        return self._build
+
+    def state_key(self, steps: list[dict]) -> str:
+        data = json.dumps(
+            [self.package, self.build, self.variables, state_steps(steps)],
+            ensure_ascii=False,
+            sort_keys=True,
+        )
+        return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+    def invalidate_stale(self) -> list[str]:
+        """Delete snapshots of this package taken with another app build.
+
+        Returns:
+            Names of the deleted snapshots.
+        """
+        stale = [
+            name for name, entry in self.index.items()
+            if entry.get("package") == self.package
+            and entry.get("build") != self.build
+        ]
+        for name in stale:
+            self.console.delete_snapshot(name)
+            del self.index[name]
+        if stale:
+            self._save_index()
+            self.invalidated.extend(stale)
+        return stale
+
+    def find(self, steps: list[dict]) -> str | None:
+        """Name of a snapshot of the state after `steps`, if one exists."""
+        name = SNAPSHOT_PREFIX + self.state_key(steps)[:16]
+        if name not in self.index:
+            return None
+        if name not in self.console.list_snapshots():
+            # Deleted outside the runner (e.g. wiped AVD).
+            del self.index[name]
+            self._save_index()
+            return None
+        return name
+
+    def save(self, steps: list[dict], section: str, source: str = "") -> str:
+        """Snapshot the current state as the state after `steps`."""
+        name = SNAPSHOT_PREFIX + self.state_key(steps)[:16]
+        self.console.save_snapshot(name)
+        self.index[name] = {
+            "package": self.package,
+            "build": self.build,
+            "section": section,
+            "source": source,
+            "steps": len(state_steps(steps)),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        }
+        self._save_index()
+        return name
+
+    def restore(self, name: str) -> None:
+        """Load a snapshot and wait for the device to come back."""
+        self.console.load_snapshot(name)
+        self.adb.wait_for_device()
@@ -0,0 +1,150 @@
+"""Constant-memory statistics for soak (loop) runs.
+
+A soak run executes the same compiled scenario for thousands of
+iterations. Nothing here grows with the iteration count: step latencies
+are folded into running sums, from which the mean, standard deviation
+and least-squares trend (milliseconds gained per iteration) are derived.
+"""
+
+import math
+from dataclasses import dataclass, field
+
+# Failing iteration numbers remembered for the final summary (the full
+# list is in soak.jsonl).
+MAX_REPORTED_FAILURES = 100
+
+
+@dataclass
+class RunningTrend:
+    """Running mean/stddev and linear trend of y over iteration x."""
+
+    n: int = 0
+    sum_x: float = 0.0
+    sum_y: float = 0.0
+    sum_xx: float = 0.0
+    sum_xy: float = 0.0
+    sum_yy: float = 0.0
+    min_y: float = math.inf
+    max_y: float = -math.inf
+
+    def add(self, x: float, y: float) -> None:
+        self.n += 1
+        self.sum_x += x
+        self.sum_y += y
+        self.sum_xx += x * x
+        self.sum_xy += x * y
+        self.sum_yy += y * y
+        self.min_y = min(self.min_y, y)
+        self.max_y = max(self.max_y, y)
+
+    @property
+    def mean(self) -> float:
+        return self.sum_y / self.n if self.n else 0.0
+
+    @property
+    def stddev(self) -> float:
+        if self.n < 2:
+            return 0.0
+        variance = (self.sum_yy - self.sum_y * self.sum_y / self.n) / (self.n - 1)
+        return math.sqrt(max(0.0, variance))
+
+    @property
+    def slope(self) -> float:
+        """Least-squares change of y per unit of x."""
+        denom = self.n * self.sum_xx - self.sum_x * self.sum_x
+        if self.n < 2 or denom == 0:
+            return 0.0
+        return (self.n * self.sum_xy - self.sum_x * self.sum_y) / denom
+
+    def describe(self) -> dict:
+        return {
+            "samples": self.n,
+            "mean_ms": round(self.mean, 1),
+            "stddev_ms": round(self.stddev, 1),
+            "min_ms": round(self.min_y, 1) if self.n else None,
+            "max_ms": round(self.max_y, 1) if self.n else None,
+            "trend_ms_per_iteration": round(self.slope, 3),
+        }
+
+
+@dataclass
+class SoakMonitor:
+    """Aggregates per-iteration results of a soak run."""
+
+    iterations: int = 0
+    failed_iterations: int = 0
+    recent_failures: list[int] = field(default_factory=list)
+    status_totals: dict[str, int] = field(default_factory=dict)
+    iteration_trend: RunningTrend = field(default_factory=RunningTrend)
+    step_trends: dict[int, RunningTrend] = field(default_factory=dict)
+
+    def add(self, iteration: int, result: dict, duration_ms: int) -> dict:
+        """Fold one iteration's result in and return its summary line.
+
+        Args:
+            iteration: 1-based iteration number.
+            result: result.json dict of the iteration.
+            duration_ms: Wall time of the iteration.
+
+        Returns:
+            Compact per-iteration summary (one soak.jsonl line).
+        """
+        summary = result["summary"]
+        failed = summary["failed"] > 0
+        self.iterations += 1
+        for key in ("passed", "failed", "skipped", "ai_required"):
+            self.status_totals[key] = self.status_totals.get(key, 0) + summary[key]
+        if failed:
+            self.failed_iterations += 1
+            self.recent_failures.append(iteration)
+            del self.recent_failures[:-MAX_REPORTED_FAILURES]
+
+        self.iteration_trend.add(iteration, duration_ms)
+        step_ms = {}
+        for step in result["steps"]:
+            ms = step["execution"].get("duration_ms")
+            if ms is None:
+                continue
+            step_ms[step["index"]] = ms
+            self.step_trends.setdefault(step["index"], RunningTrend()).add(
+                iteration, ms
+            )
+
+        return {
+            "iteration": iteration,
+            "start_time": result["execution"]["start_time"],
+            "duration_ms": duration_ms,
+            "summary": summary,
+            "failed_steps": [
+                s["index"] for s in result["steps"] if s["status"] == "failed"
+            ],
+            "step_ms": step_ms,
+        }
+
+    def describe(self) -> dict:
+        """Final soak summary with latency trends."""
+        return {
+            "iterations": self.iterations,
+            "failed_iterations": self.failed_iterations,
+            "recent_failed_iterations": list(self.recent_failures),
+            "step_status_totals": dict(self.status_totals),
+            "iteration_latency": self.iteration_trend.describe(),
+            "step_latency": {
+                str(idx): trend.describe()
+                for idx, trend in sorted(self.step_trends.items())
+            },
+        }
+
+    def degrading_steps(self, threshold_pct: float = 0.1) -> list[tuple[int, float]]:
+        """Steps whose latency grows by more than threshold_pct per iteration.
+
+        Returns:
+            (step index, trend ms/iteration) sorted by steepest trend.
+        """
+        flagged = [
+            (idx, trend.slope)
+            for idx, trend in self.step_trends.items()
+            if trend.n >= 10 and trend.mean > 0
+            and trend.slope / trend.mean * 100 > threshold_pct
+        ]
+        return sorted(flagged, key=lambda item: -item[1])
@@ -0,0 +1,182 @@
+"""Adaptive wait and timeout tuning from run history.
+
+Builds per-step wait overrides and per-command ADB timeouts for one
+scenario on one device model from the runs indexed by `history.py`.
+
+Wait tuning judges a step's post-action `wait` by the outcome of the
+following step, which is the one that observes the screen after it:
+
+- Waits whose following step passed in the last `min_samples` runs are
+  shrunk by `shrink_factor`, but never below `grow_factor` times the
+  largest wait that was followed by a failure.
+- A wait whose following step failed in the most recent run is grown by
+  `grow_factor`, capped at `max_wait_factor` times the compiled wait.
+
+Following `ai_checkpoint` steps say nothing about the wait (they end
+`ai_required` whenever AI is skipped) and are ignored.
+
+Timeouts are set to `timeout_factor` times the highest per-run p99
+latency observed for each ADB command kind in runs of the same scenario
+(kinds such as `shell script` or `pull` vary between scenarios), clamped to
+[`min_timeout`, `max_timeout`]. Commands that time out are sampled at
+their timeout, so a timeout that fires grows on the next tuned run.
+"""
+
+from dataclasses import dataclass, field
+
+from history import RunHistory
+
+FAILING_STATUSES = ("failed", "ai_required")
+
+
+@dataclass
+class TuningConfig:
+    """Knobs for adaptive tuning."""
+
+    history_runs: int = 20
+    min_samples: int = 3
+    shrink_factor: float = 0.8
+    grow_factor: float = 1.5
+    min_wait: float = 0.2
+    max_wait_factor: float = 2.0
+    timeout_factor: float = 3.0
+    min_timeout: float = 5.0
+    max_timeout: float = 120.0
+
+
+@dataclass
+class TuningProfile:
+    """Learned overrides for one scenario on one device model."""
+
+    scenario: str
+    device_model: str
+    # step index -> list of (wait_sec, next_step_status), newest first
+    wait_history: dict[int, list[tuple[float, str]]] = field(
+        default_factory=dict
+    )
+    # command kind -> timeout in seconds
+    timeouts: dict[str, float] = field(default_factory=dict)
+    config: TuningConfig = field(default_factory=TuningConfig)
+
+    @classmethod
+    def from_history(
+        cls,
+        history: RunHistory,
+        scenario: str,
+        device_model: str,
+        config: TuningConfig | None = None,
+    ) -> "TuningProfile":
+        """Build a profile from indexed run history.
+
+        Args:
+            history: Open run history database.
+            scenario: Scenario name (result.json `scenario.name`).
+            device_model: Device model to learn from.
+            config: Tuning knobs (defaults if omitted).
+
+        Returns:
+            TuningProfile (empty if there is no matching history).
+        """
+        config = config or TuningConfig()
+        profile = cls(scenario=scenario, device_model=device_model, config=config)
+
+        rows = history.recent_step_history(
+            scenario, device_model, config.history_runs
+        )
+        runs: dict[int, dict[int, dict]] = {}
+        run_order: list[int] = []
+        for row in rows:
+            if row["run_id"] not in runs:
+                runs[row["run_id"]] = {}
+                run_order.append(row["run_id"])
+            runs[row["run_id"]][row["step_index"]] = row
+
+        for run_id in run_order:
+            steps = runs[run_id]
+            for idx, row in steps.items():
+                if not row["wait_sec"]:
+                    continue
+                next_row = steps.get(idx + 1)
+                if (
+                    next_row is None
+                    or next_row["status"] == "skipped"
+                    or next_row["strategy"] == "ai_checkpoint"
+                ):
+                    continue
+                profile.wait_history.setdefault(idx, []).append(
+                    (row["wait_sec"], next_row["status"])
+                )
+
+        for command, p99s in history.latency_history(
+            device_model, config.history_runs, scenario
+        ).items():
+            timeout = max(p99s) / 1000 * config.timeout_factor
+            profile.timeouts[command] = round(
+                min(config.max_timeout, max(config.min_timeout, timeout)), 1
+            )
+        return profile
+
+    def wait_for(self, step_index: int, compiled_wait: float) -> dict | None:
+        """Decide the wait to apply for a step.
+
+        Args:
+            step_index: Compiled step index.
+            compiled_wait: Wait seconds stored in the compiled IR.
+
+        Returns:
+            Override record {original, applied, reason} or None to keep
+            the compiled wait.
+        """
+        if compiled_wait <= 0:
+            return None
+        samples = self.wait_history.get(step_index, [])
+        if not samples:
+            return None
+        cfg = self.config
+        last_wait, last_status = samples[0]
+        cap = compiled_wait * cfg.max_wait_factor
+
+        if last_status in FAILING_STATUSES:
+            applied = min(cap, last_wait * cfg.grow_factor)
+            reason = f"next step {last_status} after {last_wait}s wait"
+        else:
+            recent = samples[: cfg.min_samples]
+            if len(recent) < cfg.min_samples or any(
+                status in FAILING_STATUSES for _, status in recent
+            ):
+                if last_wait == compiled_wait:
+                    return None
+                applied = last_wait
+                reason = "keeping last tuned wait"
+            else:
+                failed_waits = [
+                    w for w, status in samples if status in FAILING_STATUSES
+                ]
+                floor = max(
+                    [cfg.min_wait]
+                    + [w * cfg.grow_factor for w in failed_waits]
+                )
+                applied = max(floor, last_wait * cfg.shrink_factor)
+                applied = min(applied, last_wait)
+                reason = (
+                    f"next step passed in last {len(recent)} runs "
+                    f"(wait >= {round(floor, 2)}s)"
+                )
+
+        applied = round(applied, 2)
+        if applied == compiled_wait:
+            return None
+        return {
+            "original": compiled_wait,
+            "applied": applied,
+            "reason": reason,
+        }
+
+    def describe(self) -> dict:
+        """Summary of the profile for result.json."""
+        return {
+            "device_model": self.device_model,
+            "history_runs": self.config.history_runs,
+            "steps_with_history": len(self.wait_history),
+            "timeouts": dict(sorted(self.timeouts.items())),
+        }
@@ -0,0 +1,215 @@
+"""AI-ready screenshot variants.
+
+Vision evaluation does not need full-resolution `screencap` PNGs. A
+variant is the screenshot downscaled to a maximum long edge and
+re-encoded as JPEG or WebP, optionally cropped to a region of interest
+(the target element, or the list the step works on) first.
+
+Variants are produced in a background process pool with Pillow, or
+ffmpeg when Pillow is not installed (JPEG only).
+"""
+
+import os
+import shutil
+import subprocess
+import xml.etree.ElementTree as ET
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from .uitree_parser import parse_bounds
+
+IMAGE_FORMATS = ("jpeg", "webp")
+FORMAT_EXTENSIONS = {"jpeg": ".jpg", "webp": ".webp"}
+
+# Margin around a crop region, as a fraction of the screen width.
+CROP_MARGIN = 0.04
+# Crops covering more of the screen than this are not worth making.
+MAX_CROP_AREA = 0.8
+
+
+def image_backend() -> str | None:
+    """Return the available image resizer: 'pillow', 'ffmpeg' or None."""
+    try:
+        import PIL.Image  # noqa: F401
+        return "pillow"
+    except ImportError:
+        pass
+    return "ffmpeg" if shutil.which("ffmpeg") else None
+
+
+def crop_region(
+    bounds: str, screen: tuple[int, int]
+) -> tuple[int, int, int, int] | None:
+    """Padded crop box for element bounds, or None if not worth cropping."""
+    try:
+        x1, y1, x2, y2 = parse_bounds(bounds)
+    except ValueError:
+        return None
+    width, height = screen
+    margin = int(width * CROP_MARGIN)
+    box = (
+        max(0, x1 - margin),
+        max(0, y1 - margin),
+        min(width, x2 + margin),
+        min(height, y2 + margin),
+    )
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    if box[2] <= box[0] or box[3] <= box[1] or area > width * height * MAX_CROP_AREA:
+        return None
+    return box
+
+
+def largest_scroll_container(root: ET.Element) -> str | None:
+    """Bounds of the largest scrollable node of a UITree, if any."""
+    best, best_area = None, 0
+    for node in root.iter("node"):
+        if node.get("scrollable") != "true":
+            continue
+        try:
+            x1, y1, x2, y2 = parse_bounds(node.get("bounds", ""))
+        except ValueError:
+            continue
+        area = (x2 - x1) * (y2 - y1)
+        if area > best_area:
+            best, best_area = node.get("bounds"), area
+    return best
+
+
+def make_variant(
+    job: tuple[str, str, str, int, str, tuple[int, int, int, int] | None],
+) -> int:
+    """Write one variant (runs in a worker process).
+
+    Args:
+        job: (backend, source path, output path, long edge, format, crop box)
+
+    Returns:
+        Size of the written file in bytes, 0 on failure.
+    """
+    backend, src, dst, long_edge, fmt, box = job
+    tmp = dst + ".tmp"
+    try:
+        if backend == "pillow":
+            from PIL import Image
+
+            with Image.open(src) as img:
+                img = img.convert("RGB")
+                if box:
+                    img = img.crop(box)
+                img.thumbnail((long_edge, long_edge), reducing_gap=2.0)
+                if fmt == "webp":
+                    img.save(tmp, "WEBP", quality=75, method=4)
+                else:
+                    img.save(tmp, "JPEG", quality=80, optimize=True)
+        else:
+            filters = []
+            if box:
+                x1, y1, x2, y2 = box
+                filters.append(f"crop={x2 - x1}:{y2 - y1}:{x1}:{y1}")
+            filters.append(
+                f"scale='min({long_edge},iw)':'min({long_edge},ih)'"
+                ":force_original_aspect_ratio=decrease"
+            )
+            proc = subprocess.run(
+                [
+                    "ffmpeg", "-v", "error", "-y", "-i", src,
+                    "-vf", ",".join(filters), "-q:v", "4", "-f", "mjpeg", tmp,
+                ],
+                capture_output=True,
+            )
+            if proc.returncode != 0:
+                return 0
+        os.replace(tmp, dst)
+        return os.path.getsize(dst)
+    except (OSError, ValueError):
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        return 0
+
+
+class VariantPool:
+    """Generates screenshot variants in the background.
+
+    `submit` queues the variants of one step; `finish` waits for all of
+    them and records the results in the step results.
+    """
+
+    def __init__(
+        self,
+        output_dir: str,
+        long_edge: int = 1024,
+        fmt: str = "jpeg",
+        workers: int | None = None,
+    ):
+        if fmt not in IMAGE_FORMATS:
+            raise ValueError(
+                f"Unknown image format: {fmt} "
+                f"(choose from {', '.join(IMAGE_FORMATS)})"
+            )
+        self.output_dir = output_dir
+        self.long_edge = long_edge
+        self.backend = image_backend()
+        # ffmpeg builds often lack a WebP encoder.
+        self.format = fmt if self.backend == "pillow" else "jpeg"
+        self.workers = workers
+        self._pool: ProcessPoolExecutor | None = None
+        # (step result, evidence key, file name, source bytes, future)
+        self._pending: list[tuple[dict, str, str, int, Future]] = []
+
+    @property
+    def available(self) -> bool:
+        return self.backend is not None
+
+    def submit(
+        self,
+        step_result: dict,
+        evidence_key: str,
+        crop: tuple[int, int, int, int] | None = None,
+    ) -> None:
+        """Queue variants of one screenshot of a step.
+
+        Writes `<name>.ai.<ext>` (downscaled) and, with a crop box,
+        `<name>.ai_crop.<ext>` (cropped, then downscaled).
+        """
+        name = step_result["evidence"].get(evidence_key)
+        if not self.available or not name:
+            return
+        src = os.path.join(self.output_dir, name)
+        if not os.path.exists(src):
+            return
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        stem = os.path.splitext(name)[0]
+        ext = FORMAT_EXTENSIONS[self.format]
+        variants = [(f"ai_{evidence_key}", f"{stem}.ai{ext}", None)]
+        if crop:
+            variants.append((f"ai_{evidence_key}_crop", f"{stem}.ai_crop{ext}", crop))
+        source_bytes = os.path.getsize(src)
+        for key, variant, box in variants:
+            job = (
+                self.backend,
+                src,
+                os.path.join(self.output_dir, variant),
+                self.long_edge,
+                self.format,
+                box,
+            )
+            future = self._pool.submit(make_variant, job)
+            self._pending.append((step_result, key, variant, source_bytes, future))
+
+    def finish(self) -> None:
+        """Wait for queued variants and reference them in step results."""
+        for step_result, key, variant, source_bytes, future in self._pending:
+            size = future.result()
+            if not size:
+                continue
+            step_result["evidence"][key] = variant
+            info = step_result.setdefault("ai_image", {
+                "long_edge": self.long_edge,
+                "format": self.format,
+            })
+            info.setdefault("bytes", {})[key] = size
+            info.setdefault("source_bytes", {})[key] = source_bytes
+        self._pending = []
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
@@ -0,0 +1,436 @@
+#!/usr/bin/env python3
+"""Keyframe extraction for the video-to-scenario pipeline.
+
+Decoded frames are streamed from ffmpeg through a pipe as small
+grayscale images and scored with NumPy:
+
+- a difference hash (dHash) of a downsampled frame, compared by Hamming
+  distance, and
+- per-region mean differences on a coarse grid, which catch localized
+  changes (dialogs, toasts, keyboard) that barely move a global score.
+
+A keyframe is emitted once per scene change, at the moment the UI has
+settled again (frame-to-frame motion stays below a threshold for
+`settle_sec`), so transition animations are skipped. Near-duplicate
+keyframes are dropped. Long recordings are split into chunks analyzed
+in parallel processes; only the final keyframes are extracted at full
+resolution.
+
+Requires ffmpeg/ffprobe on PATH and NumPy.
+
+Usage:
+    python scripts/utils/keyframe_extractor.py <video> [options]
+
+Options:
+    --output-dir <path>       Output directory (default: .video-to-scenario/<name>)
+    --scene-threshold <f>     Change score that starts a new scene (default: 0.12)
+    --settle-threshold <f>    Motion below which the UI counts as still (default: 0.004)
+    --settle-sec <sec>        Stillness required to call the UI settled (default: 0.4)
+    --dedupe-distance <n>     Max dHash distance of a duplicate keyframe (default: 4)
+    --sample-fps <fps>        Analysis frame rate (default: 10)
+    --chunk-sec <sec>         Chunk length for parallel analysis (default: 60)
+    --workers <n>             Analysis processes (default: CPU count)
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+# Width of the grayscale frames used for analysis (height keeps aspect).
+ANALYSIS_WIDTH = 96
+HASH_SIZE = 8
+# Region grid (columns, rows) for localized change detection.
+REGION_GRID = (4, 6)
+
+
+class KeyframeError(Exception):
+    """Raised when a video cannot be probed or decoded."""
+
+
+@dataclass
+class VideoInfo:
+    duration: float
+    width: int
+    height: int
+    framerate: str
+
+
+@dataclass
+class KeyframeConfig:
+    scene_threshold: float = 0.12
+    settle_threshold: float = 0.004
+    settle_sec: float = 0.4
+    dedupe_distance: int = 4
+    sample_fps: float = 10.0
+    chunk_sec: float = 60.0
+
+
+@dataclass
+class Keyframe:
+    """A keyframe candidate found by the analysis."""
+
+    timestamp: float
+    score: float
+    settled: bool
+    hash: int
+    regions: list[float]
+
+
+def probe(video: str) -> VideoInfo:
+    """Read duration, resolution and frame rate with ffprobe."""
+    result = subprocess.run(
+        [
+            "ffprobe", "-v", "error",
+            "-select_streams", "v:0",
+            "-show_entries", "stream=width,height,r_frame_rate:format=duration",
+            "-of", "json",
+            video,
+        ],
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    if result.returncode != 0:
+        raise KeyframeError(f"ffprobe failed for {video}: {result.stderr.strip()}")
+    data = json.loads(result.stdout)
+    streams = data.get("streams") or []
+    if not streams:
+        raise KeyframeError(f"No video stream in {video}")
+    stream = streams[0]
+    return VideoInfo(
+        duration=float(data.get("format", {}).get("duration", 0.0)),
+        width=int(stream["width"]),
+        height=int(stream["height"]),
+        framerate=stream.get("r_frame_rate", ""),
+    )
+
+
+def analysis_size(info: VideoInfo) -> tuple[int, int]:
+    """Analysis frame (width, height), height rounded to an even number."""
+    height = max(2, round(info.height * ANALYSIS_WIDTH / info.width / 2) * 2)
+    return ANALYSIS_WIDTH, height
+
+
+def iter_frames(
+    video: str,
+    size: tuple[int, int],
+    sample_fps: float,
+    start: float = 0.0,
+    duration: float | None = None,
+):
+    """Stream downsampled grayscale frames from ffmpeg.
+
+    Yields:
+        (timestamp seconds, uint8 array of shape (height, width))
+    """
+    width, height = size
+    cmd = ["ffmpeg", "-v", "error", "-ss", f"{start:.3f}"]
+    if duration is not None:
+        cmd += ["-t", f"{duration:.3f}"]
+    cmd += [
+        "-i", video,
+        "-vf", f"fps={sample_fps},scale={width}:{height}:flags=area,format=gray",
+        "-f", "rawvideo", "-",
+    ]
+    frame_bytes = width * height
+    process = subprocess.Popen(
+        cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+    )
+    try:
+        n = 0
+        while True:
+            buf = process.stdout.read(frame_bytes)
+            if len(buf) < frame_bytes:
+                break
+            frame = np.frombuffer(buf, dtype=np.uint8).reshape(height, width)
+            yield start + n / sample_fps, frame
+            n += 1
+    finally:
+        process.stdout.close()
+        process.kill()
+        process.wait()
+
+
+def _block_means(frame: np.ndarray, cols: int, rows: int) -> np.ndarray:
+    """Mean of each cell of a rows x cols grid over the frame."""
+    h, w = frame.shape
+    ys = np.linspace(0, h, rows + 1).astype(int)[:-1]
+    xs = np.linspace(0, w, cols + 1).astype(int)[:-1]
+    sums = np.add.reduceat(np.add.reduceat(frame.astype(np.float64), ys, 0), xs, 1)
+    counts = np.outer(np.diff(np.append(ys, h)), np.diff(np.append(xs, w)))
+    return sums / counts
+
+
+def dhash(frame: np.ndarray) -> int:
+    """64-bit difference hash of a frame."""
+    small = _block_means(frame, HASH_SIZE + 1, HASH_SIZE)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int(np.packbits(bits).view(">u8")[0])
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def regions(frame: np.ndarray) -> np.ndarray:
+    return _block_means(frame, *REGION_GRID) / 255.0
+
+
+def change_score(
+    hash_a: int, regions_a: np.ndarray, hash_b: int, regions_b: np.ndarray
+) -> float:
+    """Scene-change score in [0, 1]: the larger of hash and region change."""
+    region_change = float(np.abs(regions_a - regions_b).max())
+    return max(hamming(hash_a, hash_b) / (HASH_SIZE * HASH_SIZE), region_change)
+
+
+def analyze_chunk(
+    video: str,
+    size: tuple[int, int],
+    config: KeyframeConfig,
+    start: float,
+    duration: float | None,
+) -> list[Keyframe]:
+    """Find settled keyframes in one chunk of a video.
+
+    The first frame of the chunk is always a candidate; chunk boundaries
+    are reconciled by deduplication when chunks are merged.
+    """
+    settle_frames = max(1, round(config.settle_sec * config.sample_fps))
+    keyframes: list[Keyframe] = []
+    ref_hash = ref_regions = None
+    prev = None
+    pending: Keyframe | None = None  # changed scene, not yet settled
+    still = 0
+
+    for timestamp, frame in iter_frames(
+        video, size, config.sample_fps, start, duration
+    ):
+        frame_hash = dhash(frame)
+        frame_regions = regions(frame)
+        if prev is None:
+            motion = 0.0
+        else:
+            motion = float(
+                np.abs(frame.astype(np.int16) - prev).mean() / 255.0
+            )
+        prev = frame
+        still = still + 1 if motion < config.settle_threshold else 0
+
+        if ref_hash is None:
+            pending = Keyframe(timestamp, 1.0, False, frame_hash, [])
+        else:
+            score = change_score(ref_hash, ref_regions, frame_hash, frame_regions)
+            if score >= config.scene_threshold and (
+                pending is None or score > pending.score
+            ):
+                pending = Keyframe(timestamp, score, False, frame_hash, [])
+
+        if pending is not None and still >= settle_frames:
+            keyframes.append(Keyframe(
+                timestamp, pending.score, True,
+                frame_hash, frame_regions.flatten().tolist(),
+            ))
+            ref_hash, ref_regions = frame_hash, frame_regions
+            pending = None
+        elif pending is not None and ref_hash is None:
+            # Reference for change scores until the first frame settles.
+            ref_hash, ref_regions = frame_hash, frame_regions
+
+    if pending is not None and prev is not None:
+        # The scene changed but never settled before the chunk ended.
+        keyframes.append(Keyframe(
+            timestamp, pending.score, False,
+            frame_hash, frame_regions.flatten().tolist(),
+        ))
+    return keyframes
+
+
+def dedupe(keyframes: list[Keyframe], config: KeyframeConfig) -> list[Keyframe]:
+    """Drop keyframes that are near-duplicates of the previous kept one."""
+    kept: list[Keyframe] = []
+    for keyframe in sorted(keyframes, key=lambda k: k.timestamp):
+        if kept:
+            last = kept[-1]
+            region_change = float(
+                np.abs(np.array(keyframe.regions) - np.array(last.regions)).max()
+            )
+            if (
+                hamming(keyframe.hash, last.hash) <= config.dedupe_distance
+                and region_change < config.scene_threshold
+            ):
+                if keyframe.settled and not last.settled:
+                    kept[-1] = keyframe
+                continue
+        kept.append(keyframe)
+    return kept
+
+
+def find_keyframes(
+    video: str,
+    config: KeyframeConfig | None = None,
+    workers: int | None = None,
+    info: VideoInfo | None = None,
+) -> list[Keyframe]:
+    """Analyze a video (in parallel chunks) and return its keyframes."""
+    config = config or KeyframeConfig()
+    info = info or probe(video)
+    size = analysis_size(info)
+
+    if info.duration <= config.chunk_sec:
+        chunks = [(0.0, None)]
+    else:
+        starts = np.arange(0.0, info.duration, config.chunk_sec)
+        chunks = [(float(s), config.chunk_sec) for s in starts]
+
+    if len(chunks) == 1:
+        found = analyze_chunk(video, size, config, *chunks[0])
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(analyze_chunk, video, size, config, start, length)
+                for start, length in chunks
+            ]
+            found = [k for future in futures for k in future.result()]
+    return dedupe(found, config)
+
+
+def extract_keyframes(
+    video: str,
+    keyframes: list[Keyframe],
+    frames_dir: str,
+    workers: int | None = None,
+) -> list[str]:
+    """Write full-resolution PNGs of the keyframes (frame_0001.png, ...)."""
+    os.makedirs(frames_dir, exist_ok=True)
+
+    def extract(item: tuple[int, Keyframe]) -> str:
+        number, keyframe = item
+        path = os.path.join(frames_dir, f"frame_{number:04d}.png")
+        subprocess.run(
+            [
+                "ffmpeg", "-v", "error",
+                "-ss", f"{keyframe.timestamp:.3f}",
+                "-i", video,
+                "-frames:v", "1",
+                "-y", path,
+            ],
+            capture_output=True,
+            check=True,
+        )
+        return path
+
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        return list(pool.map(extract, enumerate(keyframes, 1)))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Extract settled, deduplicated keyframes from a UI recording"
+    )
+    parser.add_argument("video", help="Input video file")
+    parser.add_argument("--output-dir", "-o", help="Output directory")
+    defaults = KeyframeConfig()
+    parser.add_argument(
+        "--scene-threshold", type=float, default=defaults.scene_threshold,
+        help="Change score that starts a new scene",
+    )
+    parser.add_argument(
+        "--settle-threshold", type=float, default=defaults.settle_threshold,
+        help="Frame-to-frame motion below which the UI counts as still",
+    )
+    parser.add_argument(
+        "--settle-sec", type=float, default=defaults.settle_sec,
+        help="Stillness required to call the UI settled",
+    )
+    parser.add_argument(
+        "--dedupe-distance", type=int, default=defaults.dedupe_distance,
+        help="Max dHash Hamming distance of a duplicate keyframe",
+    )
+    parser.add_argument(
+        "--sample-fps", type=float, default=defaults.sample_fps,
+        help="Analysis frame rate",
+    )
+    parser.add_argument(
+        "--chunk-sec", type=float, default=defaults.chunk_sec,
+        help="Chunk length for parallel analysis",
+    )
+    parser.add_argument("--workers", type=int, help="Analysis processes")
+    args = parser.parse_args()
+
+    for tool in ("ffmpeg", "ffprobe"):
+        if shutil.which(tool) is None:
+            print(f"Error: {tool} not found", file=sys.stderr)
+            sys.exit(2)
+    if not os.path.isfile(args.video):
+        print(f"Error: Video file not found: {args.video}", file=sys.stderr)
+        sys.exit(2)
+
+    config = KeyframeConfig(
+        scene_threshold=args.scene_threshold,
+        settle_threshold=args.settle_threshold,
+        settle_sec=args.settle_sec,
+        dedupe_distance=args.dedupe_distance,
+        sample_fps=args.sample_fps,
+        chunk_sec=args.chunk_sec,
+    )
+    output_dir = args.output_dir or os.path.join(
+        ".video-to-scenario", Path(args.video).stem
+    )
+    frames_dir = os.path.join(output_dir, "frames")
+
+    try:
+        info = probe(args.video)
+        print(f"Duration: {info.duration:.1f}s")
+        print(f"Resolution: {info.width}x{info.height}")
+        keyframes = find_keyframes(args.video, config, args.workers, info)
+        if not keyframes:
+            print("Error: No frames extracted", file=sys.stderr)
+            sys.exit(1)
+        paths = extract_keyframes(args.video, keyframes, frames_dir)
+    except (KeyframeError, subprocess.CalledProcessError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(2)
+
+    with open(
+        os.path.join(output_dir, "timestamps.jsonl"), "w", encoding="utf-8"
+    ) as f:
+        for number, keyframe in enumerate(keyframes, 1):
+            f.write(json.dumps({
+                "frame": number,
+                "timestamp": round(keyframe.timestamp, 3),
+                "score": round(keyframe.score, 3),
+                "settled": keyframe.settled,
+            }) + "\n")
+
+    extraction_info = {
+        "video": args.video,
+        "duration": info.duration,
+        "resolution": f"{info.width}x{info.height}",
+        "framerate": info.framerate,
+        "extractor": "keyframe_extractor",
+        "config": asdict(config),
+        "frame_count": len(paths),
+        "frames_dir": frames_dir,
+        "extracted_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+    }
+    with open(
+        os.path.join(output_dir, "extraction_info.json"), "w", encoding="utf-8"
+    ) as f:
+        json.dump(extraction_info, f, ensure_ascii=False, indent=2)
+
+    print(f"Total frames extracted: {len(paths)}")
+    print(f"Frames: {frames_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,390 @@
+"""Compiled UITree selectors and single-pass check evaluation.
+
+A selector is a dict of predicates that must all hold for a node:
+
+    {"class": "android.widget.Button", "text_regex": "^(OK|Done)$",
+     "clickable": true, "visible": true,
+     "ancestor": {"resource_id": "com.example:id/dialog"}}
+
+String attributes are `class`, `resource_id`, `text`, `content_desc`
+and `package`. Each accepts `<attr>_exact`, `<attr>_contains` and
+`<attr>_regex` (re.search) forms; the bare key is an exact match,
+except `text`, which is a substring match as in the original
+`element_count_gte` selectors.
+
+Boolean attributes (`clickable`, `enabled`, `checked`, `selected`,
+`focused`, `focusable`, `scrollable`, `checkable`, `long_clickable`)
+compare against true/false. Geometry predicates are `visible`
+(non-empty bounds on screen), `min_width`, `min_height` and
+`bounds_within` ([x1, y1, x2, y2]). `ancestor` is a nested selector
+that some ancestor of the node must match.
+
+In the selectors of `element_*` checks, an empty string value means no
+filter, as in the original `count_elements`; an empty selector `{}`
+matches every node.
+
+`CheckMatcher` compiles every check of a `uitree_verify` step into
+selectors and counts all of them in one tree traversal. Selectors that
+are a single exact attribute match are looked up in a per-attribute
+index, so the cost of a node does not grow with the number of such
+checks. The walk stops early once every check is decided.
+"""
+
+import re
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable
+
+STRING_ATTRIBUTES = {
+    "class": "class",
+    "resource_id": "resource-id",
+    "text": "text",
+    "content_desc": "content-desc",
+    "package": "package",
+}
+
+BOOLEAN_ATTRIBUTES = {
+    "clickable": "clickable",
+    "enabled": "enabled",
+    "checked": "checked",
+    "selected": "selected",
+    "focused": "focused",
+    "focusable": "focusable",
+    "scrollable": "scrollable",
+    "checkable": "checkable",
+    "long_clickable": "long-clickable",
+}
+
+_BOUNDS_RE = re.compile(r"\[(-?\d+),(-?\d+)\]\[(-?\d+),(-?\d+)\]")
+
+
+class SelectorError(Exception):
+    """Raised for malformed selectors or checks."""
+
+
+@lru_cache(maxsize=4096)
+def _bounds(value: str) -> tuple[int, int, int, int] | None:
+    match = _BOUNDS_RE.match(value)
+    if not match:
+        return None
+    return tuple(int(g) for g in match.groups())  # type: ignore[return-value]
+
+
+def _string_test(key: str, value) -> tuple[str, Callable[[str], bool]]:
+    for suffix in ("_exact", "_contains", "_regex"):
+        if key.endswith(suffix) and key[: -len(suffix)] in STRING_ATTRIBUTES:
+            attr, mode = STRING_ATTRIBUTES[key[: -len(suffix)]], suffix[1:]
+            break
+    else:
+        attr = STRING_ATTRIBUTES[key]
+        mode = "contains" if key == "text" else "exact"
+    value = str(value)
+    if mode == "exact":
+        return attr, lambda s: s == value
+    if mode == "contains":
+        return attr, lambda s: value in s
+    try:
+        pattern = re.compile(value)
+    except re.error as e:
+        raise SelectorError(f"Invalid regex for {key}: {value!r}: {e}") from e
+    return attr, lambda s: pattern.search(s) is not None
+
+
+def _is_selector_key(key: str) -> bool:
+    base = key
+    for suffix in ("_exact", "_contains", "_regex"):
+        if key.endswith(suffix):
+            base = key[: -len(suffix)]
+    return base in STRING_ATTRIBUTES
+
+
+@dataclass
+class Selector:
+    """A compiled selector.
+
+    Attributes:
+        spec: The source selector dict.
+        tests: (attribute, test) pairs on node attribute strings.
+        geometry: Tests on parsed bounds (x1, y1, x2, y2).
+        ancestor: Compiled ancestor selector, if any.
+        exact: (attribute, value) when the selector is a single exact
+            attribute match (indexable), else None.
+    """
+
+    spec: dict
+    tests: list[tuple[str, Callable[[str], bool]]]
+    geometry: list[Callable[[tuple[int, int, int, int]], bool]]
+    ancestor: "Selector | None" = None
+    exact: tuple[str, str] | None = None
+
+
+def compile_selector(spec: dict) -> Selector:
+    """Compile a selector dict (see module docstring)."""
+    if not isinstance(spec, dict):
+        raise SelectorError(f"Selector must be an object: {spec!r}")
+    tests = []
+    geometry = []
+    ancestor = None
+    for key, value in spec.items():
+        if _is_selector_key(key):
+            tests.append(_string_test(key, value))
+        elif key in BOOLEAN_ATTRIBUTES:
+            expected = "true" if value else "false"
+            tests.append(
+                (BOOLEAN_ATTRIBUTES[key], lambda s, e=expected: s == e)
+            )
+        elif key == "visible":
+            want = bool(value)
+            geometry.append(
+                lambda b, w=want: (b[2] > b[0] and b[3] > b[1]
+                                   and b[2] > 0 and b[3] > 0) == w
+            )
+        elif key == "min_width":
+            geometry.append(lambda b, n=int(value): b[2] - b[0] >= n)
+        elif key == "min_height":
+            geometry.append(lambda b, n=int(value): b[3] - b[1] >= n)
+        elif key == "bounds_within":
+            if len(value) != 4:
+                raise SelectorError(
+                    f"bounds_within needs [x1, y1, x2, y2]: {value!r}"
+                )
+            x1, y1, x2, y2 = (int(v) for v in value)
+            geometry.append(
+                lambda b: b[0] >= x1 and b[1] >= y1 and b[2] <= x2 and b[3] <= y2
+            )
+        elif key == "ancestor":
+            ancestor = compile_selector(value)
+        else:
+            raise SelectorError(f"Unknown selector key: {key}")
+
+    exact = None
+    if len(spec) == 1 and not geometry and ancestor is None:
+        key, value = next(iter(spec.items()))
+        if key in BOOLEAN_ATTRIBUTES:
+            pass
+        elif key.endswith("_exact"):
+            exact = (STRING_ATTRIBUTES[key[:-6]], str(value))
+        elif key in STRING_ATTRIBUTES and key != "text":
+            exact = (STRING_ATTRIBUTES[key], str(value))
+    return Selector(spec, tests, geometry, ancestor, exact)
+
+
+def _text_spec(value: str, match_type: str) -> dict:
+    if match_type not in ("exact", "contains", "regex"):
+        raise SelectorError(f"Unknown match_type: {match_type}")
+    return {f"text_{match_type}": value}
+
+
+def _element_spec(check: dict) -> dict:
+    """The selector of an element_* check, without empty string filters."""
+    spec = check.get("selector") or {}
+    if not isinstance(spec, dict):
+        raise SelectorError(f"Selector must be an object: {spec!r}")
+    return {
+        key: value for key, value in spec.items()
+        if not (_is_selector_key(key) and value in ("", None))
+    }
+
+
+@dataclass
+class _Check:
+    """A check reduced to a selector and a count condition."""
+
+    check: dict
+    selector: int  # index into CheckMatcher.selectors, -1 if unknown type
+    min_count: int = 1
+    max_count: int | None = None
+
+    @property
+    def saturation(self) -> int:
+        """Match count after which further matches cannot change the result."""
+        return self.max_count + 1 if self.max_count is not None else self.min_count
+
+    def passed(self, count: int) -> bool:
+        if self.selector < 0 or count < self.min_count:
+            return False
+        return self.max_count is None or count <= self.max_count
+
+
+class CheckMatcher:
+    """Evaluates all checks of a `uitree_verify` step in one traversal.
+
+    Check types:
+        text_visible / text_not_visible: `value`, `match_type`
+            ('exact', 'contains' or 'regex')
+        resource_id_exists: `value`
+        class_exists: `value`
+        element_exists / element_not_exists: `selector`
+        element_count_gte: `selector`, `min_count`
+        element_count_lte: `selector`, `max_count`
+
+    Values must already be interpolated; build one matcher per step and
+    reuse it for every UITree the step is evaluated against.
+    """
+
+    def __init__(self, checks: list[dict]):
+        self.selectors: list[Selector] = []
+        self.checks: list[_Check] = []
+        self._ids: dict[str, int] = {}
+        for check in checks:
+            self._add_check(check)
+
+        # Ancestor selectors are tracked with counters during the walk.
+        self._ancestors: list[int] = []
+        self._ancestor_of: dict[int, int] = {}
+        i = 0
+        while i < len(self.selectors):
+            ancestor = self.selectors[i].ancestor
+            if ancestor is not None:
+                a = self._selector_id(ancestor.spec)
+                self._ancestor_of[i] = a
+                if a not in self._ancestors:
+                    self._ancestors.append(a)
+            i += 1
+
+        self._index: dict[str, dict[str, list[int]]] = {}
+        self._general: list[int] = []
+        for i, selector in enumerate(self.selectors):
+            if selector.exact is not None:
+                attr, value = selector.exact
+                self._index.setdefault(attr, {}).setdefault(value, []).append(i)
+            else:
+                self._general.append(i)
+
+    def _selector_id(self, spec: dict) -> int:
+        key = repr(sorted(spec.items(), key=lambda kv: kv[0]))
+        if key not in self._ids:
+            self._ids[key] = len(self.selectors)
+            self.selectors.append(compile_selector(spec))
+        return self._ids[key]
+
+    def _add_check(self, check: dict) -> None:
+        check_type = check.get("type", "")
+        value = check.get("value", "")
+        if check_type == "text_visible":
+            spec = _text_spec(value, check.get("match_type", "exact"))
+            self.checks.append(_Check(check, self._selector_id(spec)))
+        elif check_type == "text_not_visible":
+            spec = _text_spec(value, check.get("match_type", "exact"))
+            self.checks.append(
+                _Check(check, self._selector_id(spec), 0, 0)
+            )
+        elif check_type == "resource_id_exists":
+            self.checks.append(
+                _Check(check, self._selector_id({"resource_id": value}))
+            )
+        elif check_type == "class_exists":
+            self.checks.append(
+                _Check(check, self._selector_id({"class": value}))
+            )
+        elif check_type == "element_exists":
+            self.checks.append(
+                _Check(check, self._selector_id(_element_spec(check)))
+            )
+        elif check_type == "element_not_exists":
+            self.checks.append(
+                _Check(check, self._selector_id(_element_spec(check)), 0, 0)
+            )
+        elif check_type == "element_count_gte":
+            self.checks.append(_Check(
+                check,
+                self._selector_id(_element_spec(check)),
+                int(check.get("min_count", 1)),
+            ))
+        elif check_type == "element_count_lte":
+            self.checks.append(_Check(
+                check,
+                self._selector_id(_element_spec(check)),
+                0,
+                int(check.get("max_count", 0)),
+            ))
+        else:
+            self.checks.append(_Check(check, -1))
+
+    def _matches(
+        self, i: int, attrs: dict, active: list[int]
+    ) -> bool:
+        selector = self.selectors[i]
+        for attr, test in selector.tests:
+            if not test(attrs.get(attr, "")):
+                return False
+        if selector.geometry:
+            bounds = _bounds(attrs.get("bounds", ""))
+            if bounds is None:
+                return False
+            for test in selector.geometry:
+                if not test(bounds):
+                    return False
+        ancestor = self._ancestor_of.get(i)
+        if ancestor is not None and not active[ancestor]:
+            return False
+        return True
+
+    def count(self, root: ET.Element) -> list[int]:
+        """Count matches of every selector, stopping once all are decided."""
+        n = len(self.selectors)
+        counts = [0] * n
+        # Number of currently open ancestors matching each selector.
+        active = [0] * n
+        saturation = [0] * n
+        for check in self.checks:
+            if check.selector < 0:
+                continue
+            saturation[check.selector] = max(
+                saturation[check.selector], check.saturation
+            )
+        open_selectors = {i for i in range(n) if saturation[i] > 0}
+        ancestors = self._ancestors
+        general = self._general
+        index = self._index
+
+        def visit(node: ET.Element) -> bool:
+            """Visit a subtree; return False to stop the walk."""
+            entered: list[int] = []
+            if node.tag == "node":
+                attrs = node.attrib
+                hits = [i for i in general if self._matches(i, attrs, active)]
+                for attr, values in index.items():
+                    hits.extend(values.get(attrs.get(attr, ""), ()))
+                for i in hits:
+                    counts[i] += 1
+                    if counts[i] >= saturation[i]:
+                        open_selectors.discard(i)
+                entered = [i for i in ancestors if i in hits]
+                for i in entered:
+                    active[i] += 1
+                if not open_selectors:
+                    return False
+            for child in node:
+                if not visit(child):
+                    return False
+            for i in entered:
+                active[i] -= 1
+            return bool(open_selectors)
+
+        if open_selectors:
+            visit(root)
+        return counts
+
+    def evaluate(self, root: ET.Element) -> list[dict]:
+        """Evaluate every check against a parsed UITree.
+
+        Returns:
+            Per-check results ({type, passed, detail[, count]}) in check
+            order; unknown check types fail. `count` stops increasing once
+            the check is decided.
+        """
+        counts = self.count(root)
+        results = []
+        for check in self.checks:
+            count = counts[check.selector] if check.selector >= 0 else 0
+            result = {
+                "type": check.check.get("type", ""),
+                "passed": check.passed(count),
+                "detail": check.check,
+            }
+            if check.check.get("type", "").startswith("element_count"):
+                result["count"] = count
+            results.append(result)
+        return results
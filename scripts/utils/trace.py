@@ -0,0 +1,170 @@
+"""Timeline tracing in the Chrome trace-event format.
+
+A `Tracer` collects complete ("X") events on tracks, one track per
+device. Spans nest by time on their track, so a step span contains its
+phase spans (screenshot, dump, execute, ...), which in turn contain the
+ADB commands they issued. Spans recorded from other threads than the
+one that created a track (e.g. a pool of parallel adb calls) go to
+"<track> worker N" lanes, so that they never overlap on one row.
+`export` writes JSON that opens in Perfetto (ui.perfetto.dev) or
+`chrome://tracing`.
+
+Usage:
+    tracer = Tracer()
+    track = tracer.track("emulator-5554")
+    with track.span("step 01", section="起動") as args:
+        ...
+        args["status"] = "passed"
+    tracer.export("trace.json")
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+
+class Track:
+    """One timeline row (a device); spans on it nest by time."""
+
+    def __init__(
+        self, tracer: "Tracer", tid: int, name: str, sort_index: int | None = None
+    ):
+        self.tracer = tracer
+        self.tid = tid
+        self.name = name
+        self.sort_index = sort_index if sort_index is not None else tid * 100
+        self._owner = threading.get_ident()
+        # (thread, lane) pairs; a lane is reused once its thread has ended.
+        self._lanes: list[list] = []
+        self._lock = threading.Lock()
+
+    def _lane(self) -> "Track":
+        """This track for its owner thread, else the calling thread's lane."""
+        if threading.get_ident() == self._owner:
+            return self
+        thread = threading.current_thread()
+        with self._lock:
+            for entry in self._lanes:
+                if entry[0] is thread:
+                    return entry[1]
+            for entry in self._lanes:
+                if not entry[0].is_alive():
+                    entry[0] = thread
+                    return entry[1]
+            number = len(self._lanes) + 1
+            lane = self.tracer.track(
+                f"{self.name} worker {number}", self.sort_index + number
+            )
+            self._lanes.append([thread, lane])
+            return lane
+
+    @contextmanager
+    def span(self, name: str, cat: str = "runner", **args) -> Iterator[dict]:
+        """Record the enclosed block as a span.
+
+        Yields the span's args, which the block may extend (e.g. with a
+        status only known at the end). An exception leaving the block is
+        recorded as `error`.
+        """
+        start = time.perf_counter()
+        try:
+            yield args
+        except BaseException as e:
+            args["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            self.complete(name, cat, start, time.perf_counter(), args)
+
+    def complete(
+        self, name: str, cat: str, start: float, end: float, args: dict | None = None
+    ) -> None:
+        """Record a span from `time.perf_counter()` start and end times."""
+        self._lane()._record(name, cat, start, end, args)
+
+    def _record(
+        self, name: str, cat: str, start: float, end: float, args: dict | None
+    ) -> None:
+        event = {
+            "name": name,
+            "cat": cat,
+            "ph": "X",
+            "ts": self.tracer.timestamp(start),
+            "dur": round((end - start) * 1_000_000, 1),
+            "pid": self.tracer.pid,
+            "tid": self.tid,
+        }
+        if args:
+            event["args"] = args
+        self.tracer.add(event)
+
+
+class Tracer:
+    """Collects trace events from any number of tracks (thread-safe)."""
+
+    pid = 1
+
+    def __init__(self, process_name: str = "uiai"):
+        self.process_name = process_name
+        self.events: list[dict] = []
+        self.tracks: dict[str, Track] = {}
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+
+    def timestamp(self, perf_time: float) -> float:
+        """Microseconds since the tracer was created."""
+        return round((perf_time - self._origin) * 1_000_000, 1)
+
+    def add(self, event: dict) -> None:
+        with self._lock:
+            self.events.append(event)
+
+    def clear(self) -> None:
+        """Drop the recorded events (tracks and their names are kept)."""
+        with self._lock:
+            self.events = []
+
+    def track(self, name: str, sort_index: int | None = None) -> Track:
+        """The track of a device (created on first use)."""
+        with self._lock:
+            if name not in self.tracks:
+                self.tracks[name] = Track(
+                    self, len(self.tracks) + 1, name, sort_index
+                )
+            return self.tracks[name]
+
+    def export(self, path: str) -> str:
+        """Write the trace as Chrome trace-event JSON and return its path."""
+        metadata = [{
+            "name": "process_name",
+            "ph": "M",
+            "pid": self.pid,
+            "args": {"name": self.process_name},
+        }]
+        for track in self.tracks.values():
+            metadata.append({
+                "name": "thread_name",
+                "ph": "M",
+                "pid": self.pid,
+                "tid": track.tid,
+                "args": {"name": track.name},
+            })
+            metadata.append({
+                "name": "thread_sort_index",
+                "ph": "M",
+                "pid": self.pid,
+                "tid": track.tid,
+                "args": {"sort_index": track.sort_index},
+            })
+        with self._lock:
+            events = sorted(self.events, key=lambda e: (e["tid"], e["ts"], -e["dur"]))
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"traceEvents": metadata + events, "displayTimeUnit": "ms"},
+                f,
+                ensure_ascii=False,
+            )
+        return path
@@ -0,0 +1,188 @@
+"""Merkle subtree hashing and structural diff of UITrees.
+
+`hash_tree` annotates a parsed UITree bottom-up: every node gets a hash
+of its own attributes and a subtree hash covering its attributes and
+its children's subtree hashes. Two trees (or subtrees) with equal
+subtree hashes are identical, so `diff_trees` only descends into
+subtrees whose hashes differ and runs in time proportional to the size
+of the change rather than the size of the tree.
+"""
+
+import hashlib
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+
+# Changes listed in a diff summary (counts always cover all changes).
+MAX_REPORTED_CHANGES = 50
+
+
+@dataclass
+class HashedNode:
+    """A UITree node with its own and subtree hashes."""
+
+    element: ET.Element
+    path: str
+    own_hash: bytes
+    hash: bytes
+    children: list["HashedNode"] = field(default_factory=list)
+
+    @property
+    def key(self) -> tuple[str, str]:
+        """Identity used to pair changed children: (class, resource-id)."""
+        return (
+            self.element.get("class", self.element.tag),
+            self.element.get("resource-id", ""),
+        )
+
+    def describe(self) -> dict:
+        info = {
+            "path": self.path,
+            "class": self.element.get("class", self.element.tag),
+        }
+        for attr, key in (("resource-id", "resource_id"), ("text", "text")):
+            if self.element.get(attr):
+                info[key] = self.element.get(attr)
+        return info
+
+
+def _digest(*parts: bytes) -> bytes:
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        h.update(part)
+    return h.digest()
+
+
+def hash_tree(root: ET.Element, path: str = "0") -> HashedNode:
+    """Compute own and subtree hashes for every node, bottom-up."""
+    attrs = "\x1f".join(
+        f"{k}={v}" for k, v in sorted(root.attrib.items()) if k != "index"
+    )
+    own_hash = _digest(root.tag.encode("utf-8"), b"\x1e", attrs.encode("utf-8"))
+    children = [
+        hash_tree(child, f"{path}/{i}") for i, child in enumerate(root)
+    ]
+    subtree = _digest(own_hash, *(c.hash for c in children))
+    return HashedNode(root, path, own_hash, subtree, children)
+
+
+def _attribute_changes(a: ET.Element, b: ET.Element) -> dict:
+    changes = {}
+    for attr in sorted(set(a.attrib) | set(b.attrib)):
+        if attr == "index":
+            continue
+        old, new = a.get(attr), b.get(attr)
+        if old != new:
+            changes[attr] = [old, new]
+    return changes
+
+
+def _pair_children(
+    before: list[HashedNode], after: list[HashedNode]
+) -> tuple[list[tuple[HashedNode, HashedNode]], list[HashedNode], list[HashedNode]]:
+    """Pair children: identical subtrees first, then by key in order."""
+    by_hash: dict[bytes, list[HashedNode]] = {}
+    for node in after:
+        by_hash.setdefault(node.hash, []).append(node)
+    used: set[int] = set()
+    remaining_before = []
+    for node in before:
+        candidates = by_hash.get(node.hash)
+        if candidates:
+            used.add(id(candidates.pop(0)))
+        else:
+            remaining_before.append(node)
+    remaining_after = [n for n in after if id(n) not in used]
+
+    by_key: dict[tuple[str, str], list[HashedNode]] = {}
+    for node in remaining_after:
+        by_key.setdefault(node.key, []).append(node)
+    pairs = []
+    removed = []
+    for node in remaining_before:
+        candidates = by_key.get(node.key)
+        if candidates:
+            match = candidates.pop(0)
+            used.add(id(match))
+            pairs.append((node, match))
+        else:
+            removed.append(node)
+    added = [n for n in remaining_after if id(n) not in used]
+    return pairs, removed, added
+
+
+def diff_trees(before: HashedNode, after: HashedNode) -> list[dict]:
+    """List added, removed and changed subtrees between two hashed trees.
+
+    Returns:
+        Changes, parents before their descendants. Each has `op` ('added', 'removed',
+        'changed'), the node `path` (in the after tree, or the before
+        tree for removals), `class` and, when present, `resource_id` and
+        `text`. Changed nodes also carry `attributes` {name: [old, new]};
+        removed nodes carry the after-tree `parent` path.
+    """
+    changes: list[dict] = []
+    stack = [(before, after)]
+    while stack:
+        a, b = stack.pop()
+        if a.hash == b.hash:
+            continue
+        if a.own_hash != b.own_hash:
+            changes.append({
+                "op": "changed",
+                **b.describe(),
+                "attributes": _attribute_changes(a.element, b.element),
+            })
+        pairs, removed, added = _pair_children(a.children, b.children)
+        changes.extend(
+            {"op": "removed", **n.describe(), "parent": b.path} for n in removed
+        )
+        changes.extend({"op": "added", **n.describe()} for n in added)
+        stack.extend(reversed(pairs))
+    return changes
+
+
+def _common_path(paths: list[str]) -> str:
+    parts = [p.split("/") for p in paths]
+    common = []
+    for segment in zip(*parts):
+        if len(set(segment)) != 1:
+            break
+        common.append(segment[0])
+    return "/".join(common)
+
+
+def _chain(node: HashedNode, path: str) -> list[HashedNode]:
+    """Nodes from the root down to `path`."""
+    chain = [node]
+    for segment in path.split("/")[1:]:
+        node = node.children[int(segment)]
+        chain.append(node)
+    return chain
+
+
+def summarize_diff(before: HashedNode, after: HashedNode) -> dict:
+    """Diff two hashed trees into a compact result.json entry.
+
+    `scope` is the deepest node of the after tree containing every
+    change. `scroll_container` is the nearest scrollable node at or
+    above the scope: when present, only that container's content
+    changed (e.g. a list scrolled).
+    """
+    if before.hash == after.hash:
+        return {"unchanged": True, "added": 0, "removed": 0, "changed": 0}
+    changes = diff_trees(before, after)
+    summary = {
+        "unchanged": False,
+        "added": sum(1 for c in changes if c["op"] == "added"),
+        "removed": sum(1 for c in changes if c["op"] == "removed"),
+        "changed": sum(1 for c in changes if c["op"] == "changed"),
+    }
+    paths = [c["parent"] if c["op"] == "removed" else c["path"] for c in changes]
+    chain = _chain(after, _common_path(paths) or after.path)
+    summary["scope"] = chain[-1].describe()
+    for node in reversed(chain):
+        if node.element.get("scrollable") == "true":
+            summary["scroll_container"] = node.describe()
+            break
+    summary["changes"] = changes[:MAX_REPORTED_CHANGES]
+    return summary
@@ -379,3 +379,210 @@ def resolve_element(
                 return _node_to_element(node, root)
 
     return None
+
+
+# Attributes shown in a compact UITree only when they differ from these
+# defaults.
+_FLAG_DEFAULTS = {
+    "clickable": "false",
+    "long-clickable": "false",
+    "checkable": "false",
+    "checked": "false",
+    "scrollable": "false",
+    "selected": "false",
+    "focused": "false",
+    "password": "false",
+    "enabled": "true",
+}
+_INTERACTIVE_FLAGS = ("clickable", "long-clickable", "checkable", "scrollable")
+_MAX_COMPACT_TEXT = 80
+
+
+@dataclass
+class CompactUITree:
+    """Pruned text rendering of a UITree for AI evaluation.
+
+    Attributes:
+        text: One line per kept node, indented by depth.
+        total_nodes: Nodes in the source tree.
+        kept_nodes: Nodes rendered in `text`.
+        omitted_nodes: Kept nodes dropped to fit the token budget.
+        estimated_tokens: Estimated token count of `text`.
+    """
+
+    text: str
+    total_nodes: int
+    kept_nodes: int
+    omitted_nodes: int
+    estimated_tokens: int
+
+
+@dataclass
+class _CompactNode:
+    node: ET.Element
+    children: list["_CompactNode"]
+    interactive: bool
+    labeled: bool
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate: ~4 ASCII characters or 1 other character each."""
+    ascii_chars = sum(1 for c in text if ord(c) < 128)
+    return (ascii_chars + 3) // 4 + len(text) - ascii_chars
+
+
+def _visible(node: ET.Element, screen: tuple[int, int, int, int] | None) -> bool:
+    try:
+        x1, y1, x2, y2 = parse_bounds(node.get("bounds", ""))
+    except ValueError:
+        return False
+    if x2 <= x1 or y2 <= y1:
+        return False
+    if screen is None:
+        return True
+    sx1, sy1, sx2, sy2 = screen
+    return x1 < sx2 and x2 > sx1 and y1 < sy2 and y2 > sy1
+
+
+def _prune(
+    node: ET.Element, screen: tuple[int, int, int, int] | None
+) -> list[_CompactNode]:
+    """Keep visible labeled/interactive nodes and their branching ancestors.
+
+    Containers without content of their own are dropped when they have a
+    single kept descendant (it takes their place) and kept as context
+    when they group several.
+    """
+    children = [
+        kept for child in node if child.tag == "node"
+        for kept in _prune(child, screen)
+    ]
+    visible = _visible(node, screen)
+    interactive = visible and (
+        any(node.get(flag) == "true" for flag in _INTERACTIVE_FLAGS)
+        or node.get("class", "").endswith("EditText")
+    )
+    labeled = visible and bool(
+        node.get("text") or node.get("content-desc")
+        or node.get("checked") == "true" or node.get("selected") == "true"
+    )
+    if interactive or labeled:
+        return [_CompactNode(node, children, interactive, labeled)]
+    if len(children) > 1:
+        return [_CompactNode(node, children, False, False)]
+    return children
+
+
+def _compact_text(value: str) -> str:
+    value = " ".join(value.split())
+    if len(value) > _MAX_COMPACT_TEXT:
+        value = value[:_MAX_COMPACT_TEXT - 1] + "…"
+    return '"' + value.replace('"', '\\"') + '"'
+
+
+def _describe(kept: _CompactNode) -> str:
+    node = kept.node
+    parts = [node.get("class", node.tag).rsplit(".", 1)[-1]]
+    if node.get("text"):
+        parts.append(_compact_text(node.get("text", "")))
+    if node.get("content-desc"):
+        parts.append("desc=" + _compact_text(node.get("content-desc", "")))
+    rid = node.get("resource-id", "")
+    if rid:
+        parts.append("#" + rid.split(":id/", 1)[-1])
+    for attr, default in _FLAG_DEFAULTS.items():
+        if node.get(attr, default) != default:
+            parts.append(attr if default == "false" else "disabled")
+    if kept.interactive:
+        parts.append(node.get("bounds", ""))
+    return " ".join(parts)
+
+
+def compact_uitree(
+    root: ET.Element, max_tokens: int | None = None
+) -> CompactUITree:
+    """Render a pruned, compact UITree for AI consumption.
+
+    Only visible nodes with text, a content description, a checked or
+    selected state, or interaction flags are kept, together with the
+    ancestors that group several of them. Single-child containers are
+    collapsed, class names are shortened to their simple name and
+    default-valued attributes are dropped; bounds are shown for
+    interactive nodes only.
+
+    Args:
+        root: UITree root element.
+        max_tokens: Token budget. When the rendering is larger,
+            interactive nodes are kept first, then labeled nodes, each
+            with its ancestors; grouping containers are only kept as such
+            ancestors. A final line reports how many nodes were omitted.
+
+    Returns:
+        CompactUITree.
+    """
+    nodes = list(root.iter("node"))
+    first = next(iter(nodes), None)
+    screen = None
+    if first is not None:
+        try:
+            screen = parse_bounds(first.get("bounds", ""))
+        except ValueError:
+            screen = None
+
+    # Flatten in document order: (depth, line, priority, parent position).
+    lines: list[tuple[int, str, int, int]] = []
+
+    def flatten(kept: _CompactNode, depth: int, parent: int) -> None:
+        priority = 0 if kept.interactive else 1 if kept.labeled else 2
+        lines.append((depth, _describe(kept), priority, parent))
+        position = len(lines) - 1
+        for child in kept.children:
+            flatten(child, depth + 1, position)
+
+    top = [kept for child in root if child.tag == "node" for kept in _prune(child, screen)]
+    for kept in top:
+        flatten(kept, 0, -1)
+
+    header = ""
+    if first is not None and first.get("package"):
+        header = f"# {first.get('package')}"
+        if screen:
+            header += f" {screen[2]}x{screen[3]}"
+    rendered = ["  " * depth + line for depth, line, _, _ in lines]
+    text = "\n".join(([header] if header else []) + rendered)
+
+    omitted = 0
+    if max_tokens is not None and estimate_tokens(text) > max_tokens:
+        budget = max_tokens - estimate_tokens(header) - 8
+        included: set[int] = set()
+        # Containers are only worth showing around the nodes they group.
+        order = sorted(
+            (i for i in range(len(lines)) if lines[i][2] < 2),
+            key=lambda i: (lines[i][2], i),
+        )
+        for i in order:
+            chain = []
+            j = i
+            while j >= 0 and j not in included:
+                chain.append(j)
+                j = lines[j][3]
+            cost = sum(estimate_tokens(rendered[k]) + 1 for k in chain)
+            if cost > budget:
+                continue
+            budget -= cost
+            included.update(chain)
+        omitted = len(lines) - len(included)
+        kept_lines = [rendered[i] for i in sorted(included)]
+        text = "\n".join(
+            ([header] if header else [])
+            + kept_lines
+            + [f"# ... {omitted} more nodes omitted (token budget {max_tokens})"]
+        )
+
+    return CompactUITree(
+        text=text,
+        total_nodes=len(nodes),
+        kept_nodes=len(lines) - omitted,
+        omitted_nodes=omitted,
+        estimated_tokens=estimate_tokens(text),
+    )